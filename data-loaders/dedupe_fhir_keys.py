@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+
+"""
+One-off migration that makes the fhir tables upsertable on their natural keys.
+
+The batched loaders (load_fhir.py, fhir_parser.py) write with
+INSERT ... ON CONFLICT, which needs a unique index per natural key. Databases
+filled by the old row-at-a-time loaders hold duplicate rows for those keys, so
+the index cannot be created until they are merged. The loaders only check for
+duplicates and stop; merging them is an explicit step:
+
+    python dedupe_fhir_keys.py --dry-run      # report duplicates per table
+    python dedupe_fhir_keys.py                # merge them and create the indexes
+    python dedupe_fhir_keys.py ed_visit       # only the named tables
+
+For every key one row is kept, foreign keys pointing at the other rows are
+re-pointed to it, and only then are the other rows deleted. Each table is
+migrated in its own transaction.
+"""
+
+import argparse
+import logging
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+import psycopg2
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DB_CONFIG = {
+    'dbname': os.getenv('DB_NAME', 'OAP'),
+    'user': os.getenv('DB_USER', 'postgres'),
+    'password': os.getenv('DB_PASSWORD', 'acumenus'),
+    'host': os.getenv('DB_HOST', 'localhost'),
+    'port': os.getenv('DB_PORT', '5432')
+}
+
+
+@dataclass(frozen=True)
+class KeyTarget:
+    """A natural key on a fhir table and the unique index that enforces it."""
+    table: str
+    key_columns: Tuple[str, ...]
+    index_name: str
+    # Rows ranked first by this ordering are kept
+    keep_order: str
+    # Rows outside the key (e.g. NULL ids) are never merged
+    where: str = "TRUE"
+    # Non-destructive statements that add and backfill the key columns
+    prepare: Tuple[str, ...] = ()
+
+    @property
+    def qualified_table(self) -> str:
+        return f"fhir.{self.table}"
+
+    @property
+    def create_index_sql(self) -> str:
+        return (
+            f"CREATE UNIQUE INDEX IF NOT EXISTS {self.index_name}"
+            f" ON {self.qualified_table} ({', '.join(self.key_columns)})"
+        )
+
+
+TARGETS: Dict[str, KeyTarget] = {
+    target.table: target for target in (
+        KeyTarget(
+            table="fhir_resource",
+            key_columns=("resource_type", "fhir_id"),
+            index_name="uq_fhir_resource_type_fhir_id",
+            keep_order="last_updated DESC, id DESC",
+            where="fhir_id IS NOT NULL",
+            prepare=(
+                """
+                ALTER TABLE fhir.fhir_resource
+                    ADD COLUMN IF NOT EXISTS fhir_id varchar(64),
+                    ADD COLUMN IF NOT EXISTS content_hash char(32)
+                """,
+                """
+                UPDATE fhir.fhir_resource
+                SET fhir_id = resource_json->>'id',
+                    content_hash = md5(resource_json::text)
+                WHERE content_hash IS NULL
+                """,
+            ),
+        ),
+        # An Encounter can carry several admissions (the synthetic generators
+        # reuse encounters for readmissions), so admission_time is part of the key
+        KeyTarget(
+            table="patient_admission",
+            key_columns=("encounter_id", "admission_time"),
+            index_name="uq_patient_admission_encounter_time",
+            keep_order="discharge_time DESC NULLS LAST, id DESC",
+            where="encounter_id IS NOT NULL AND admission_time IS NOT NULL",
+            prepare=(
+                # Superseded single-column key, which rejected readmissions
+                "DROP INDEX IF EXISTS fhir.uq_patient_admission_encounter",
+            ),
+        ),
+        KeyTarget(
+            table="ed_visit",
+            key_columns=("admission_id", "arrival_time"),
+            index_name="uq_ed_visit_admission_arrival",
+            keep_order="departure_time DESC NULLS LAST, id DESC",
+            where="admission_id IS NOT NULL AND arrival_time IS NOT NULL",
+        ),
+        KeyTarget(
+            table="icu_monitoring",
+            key_columns=("fhir_observation_id",),
+            index_name="uq_icu_monitoring_observation",
+            keep_order="monitoring_time DESC NULLS LAST, id DESC",
+            where="fhir_observation_id IS NOT NULL",
+        ),
+    )
+}
+
+
+class DuplicateKeysError(RuntimeError):
+    """Raised by the loaders when a unique key cannot be created over existing duplicates."""
+
+    def __init__(self, duplicates: Dict[str, int]):
+        self.duplicates = duplicates
+        details = ", ".join(f"{table}: {count}" for table, count in duplicates.items())
+        super().__init__(
+            f"Duplicate natural keys already stored ({details} rows to merge). "
+            f"Run 'python dedupe_fhir_keys.py --dry-run' to review them and "
+            f"'python dedupe_fhir_keys.py {' '.join(duplicates)}' to merge them, then re-run the load."
+        )
+
+
+def index_exists(conn, target: KeyTarget) -> bool:
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT 1 FROM pg_indexes WHERE schemaname = 'fhir' AND indexname = %s",
+            (target.index_name,)
+        )
+        return cur.fetchone() is not None
+
+
+def prepare_target(conn, target: KeyTarget) -> None:
+    """Run the target's prepare statements in the current transaction."""
+    with conn.cursor() as cur:
+        for sql in target.prepare:
+            cur.execute(sql)
+            if cur.rowcount > 0:
+                logger.info(f"{target.qualified_table}: backfilled key columns for {cur.rowcount} rows")
+
+
+def count_duplicates(conn, target: KeyTarget) -> int:
+    """Number of rows that would be merged away for this key."""
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT COALESCE(sum(n - 1), 0) FROM (
+                SELECT count(*) AS n
+                FROM {target.qualified_table}
+                WHERE {target.where}
+                GROUP BY {', '.join(target.key_columns)}
+                HAVING count(*) > 1
+            ) dup
+        """)
+        return int(cur.fetchone()[0])
+
+
+def ensure_unique_keys(conn, targets: List[KeyTarget]) -> None:
+    """
+    Create the unique index of every target that does not have one yet.
+    Existing duplicates are never deleted here: they are reported with a
+    DuplicateKeysError and nothing is changed.
+    """
+    missing = [target for target in targets if not index_exists(conn, target)]
+    for target in missing:
+        prepare_target(conn, target)
+    conn.commit()
+    duplicates = {}
+    for target in missing:
+        count = count_duplicates(conn, target)
+        if count:
+            duplicates[target.table] = count
+    if duplicates:
+        conn.rollback()
+        raise DuplicateKeysError(duplicates)
+    with conn.cursor() as cur:
+        for target in missing:
+            cur.execute(target.create_index_sql)
+    conn.commit()
+
+
+def referencing_columns(conn, target: KeyTarget) -> List[Tuple[str, str]]:
+    """(table, column) of every single-column foreign key pointing at target.id."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT c.conrelid::regclass::text, a.attname
+            FROM pg_constraint c
+            JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = c.conkey[1]
+            WHERE c.contype = 'f'
+              AND c.confrelid = %s::regclass
+              AND array_length(c.conkey, 1) = 1
+            ORDER BY 1, 2
+        """, (target.qualified_table,))
+        return cur.fetchall()
+
+
+def merge_duplicates(conn, target: KeyTarget, dry_run: bool = False) -> Tuple[int, Dict[str, int]]:
+    """
+    Keep the first row per key (by keep_order), re-point every foreign key at
+    it, delete the other rows and create the unique index, in one transaction.
+    Returns the number of rows removed and the number of references re-pointed
+    per referencing column. A dry run rolls everything back.
+    """
+    repointed = {}
+    try:
+        prepare_target(conn, target)
+        with conn.cursor() as cur:
+            cur.execute(f"""
+                CREATE TEMP TABLE dedupe_map AS
+                SELECT duplicate_id, keeper_id FROM (
+                    SELECT id AS duplicate_id,
+                           first_value(id) OVER w AS keeper_id,
+                           row_number() OVER w AS rn
+                    FROM {target.qualified_table}
+                    WHERE {target.where}
+                    WINDOW w AS (PARTITION BY {', '.join(target.key_columns)} ORDER BY {target.keep_order})
+                ) ranked
+                WHERE rn > 1
+            """)
+            cur.execute("CREATE INDEX ON dedupe_map (duplicate_id)")
+            for table, column in referencing_columns(conn, target):
+                cur.execute(f"""
+                    UPDATE {table} ref SET {column} = m.keeper_id
+                    FROM dedupe_map m
+                    WHERE ref.{column} = m.duplicate_id
+                """)
+                if cur.rowcount:
+                    repointed[f"{table}.{column}"] = cur.rowcount
+            cur.execute(f"""
+                DELETE FROM {target.qualified_table} t
+                USING dedupe_map m
+                WHERE t.id = m.duplicate_id
+            """)
+            removed = cur.rowcount
+            cur.execute("DROP TABLE dedupe_map")
+            cur.execute(target.create_index_sql)
+        if dry_run:
+            conn.rollback()
+        else:
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return removed, repointed
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Merge duplicate rows in the fhir tables and create their unique upsert keys"
+    )
+    parser.add_argument('tables', nargs='*', metavar='TABLE',
+                        help=f"Tables to migrate (default: all of {', '.join(TARGETS)})")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="Report what would be merged and roll back")
+    args = parser.parse_args()
+    unknown = [table for table in args.tables if table not in TARGETS]
+    if unknown:
+        parser.error(f"unknown table(s): {', '.join(unknown)}")
+    return args
+
+
+def main():
+    args = parse_args()
+    targets = [TARGETS[table] for table in (args.tables or TARGETS)]
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        for target in targets:
+            if index_exists(conn, target):
+                logger.info(f"{target.qualified_table}: {target.index_name} already exists, nothing to do")
+                continue
+            removed, repointed = merge_duplicates(conn, target, dry_run=args.dry_run)
+            action = "Would remove" if args.dry_run else "Removed"
+            logger.info(f"{target.qualified_table}: {action} {removed} duplicate rows")
+            for column, count in repointed.items():
+                logger.info(f"  {column}: {count} references re-pointed")
+    except Exception as e:
+        logger.error(f"Migration failed, nothing was changed for the failing table: {e}", exc_info=True)
+        raise SystemExit(1)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Parquet cache for large Excel workbooks.
+
+Each workbook is parsed once with openpyxl, its date columns converted, and
+the result stored as Parquet under a key derived from the file's content hash
+and the read options. Later reads of an unchanged file load the Parquet copy.
+
+Usage:
+    python excel_cache.py list
+    python excel_cache.py clear [WORKBOOK ...]
+"""
+
+import os
+import json
+import glob
+import hashlib
+import logging
+import argparse
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+except ImportError:  # without a Parquet engine the cache is bypassed
+    pyarrow = None
+
+CACHE_DIR = os.getenv('EXCEL_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.excel_cache'))
+# Set EXCEL_CACHE=off to always parse the workbook
+CACHE_ENABLED = os.getenv('EXCEL_CACHE', 'on').lower() not in ('0', 'off', 'false', 'no')
+
+# Bump when the stored representation changes so stale entries are ignored
+CACHE_FORMAT_VERSION = 1
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def file_sha256(path: str) -> str:
+    """Content hash of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_key(content_hash: str, date_columns: Iterable[str], read_kwargs: Dict[str, Any]) -> str:
+    """Cache key for a workbook's content plus the options it was read with."""
+    options = json.dumps({
+        'version': CACHE_FORMAT_VERSION,
+        'date_columns': sorted(col.lower() for col in date_columns),
+        'read_kwargs': read_kwargs,
+    }, sort_keys=True, default=str)
+    return f"{content_hash}-{hashlib.sha256(options.encode()).hexdigest()[:16]}"
+
+
+def normalize_for_parquet(df: pd.DataFrame, date_columns: Iterable[str]) -> pd.DataFrame:
+    """Parse date columns and make mixed-type object columns Parquet-safe strings."""
+    date_columns = {col.lower() for col in date_columns}
+    for col in df.columns:
+        if str(col).lower() in date_columns:
+            df[col] = pd.to_datetime(df[col])
+        elif df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=True).startswith('mixed'):
+            df[col] = df[col].astype('string')
+    df.columns = [str(col) for col in df.columns]
+    return df
+
+
+def read_excel_cached(path: str, date_columns: Iterable[str] = (), **read_kwargs) -> pd.DataFrame:
+    """
+    Read a workbook through the Parquet cache. Date columns (matched
+    case-insensitively) are parsed before caching; other read_kwargs are
+    passed to pd.read_excel and are part of the cache key.
+    """
+    date_columns = list(date_columns)
+    if not CACHE_ENABLED or pyarrow is None:
+        if CACHE_ENABLED:
+            logging.warning("pyarrow is not installed; Excel cache disabled")
+        return normalize_for_parquet(pd.read_excel(path, engine='openpyxl', **read_kwargs), date_columns)
+
+    content_hash = file_sha256(path)
+    key = cache_key(content_hash, date_columns, read_kwargs)
+    parquet_path = os.path.join(CACHE_DIR, f"{key}.parquet")
+    if os.path.exists(parquet_path):
+        logging.info(f"Excel cache hit for {path}")
+        return pd.read_parquet(parquet_path)
+
+    logging.info(f"Excel cache miss for {path}; parsing workbook")
+    df = normalize_for_parquet(pd.read_excel(path, engine='openpyxl', **read_kwargs), date_columns)
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    # Write under a temporary name so a crash never leaves a truncated entry
+    tmp_path = f"{parquet_path}.{os.getpid()}.tmp"
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, parquet_path)
+    with open(os.path.join(CACHE_DIR, f"{key}.json"), 'w') as f:
+        json.dump({
+            'source': os.path.abspath(path),
+            'content_hash': content_hash,
+            'rows': len(df),
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+        }, f, indent=2)
+    return df
+
+
+def list_cache() -> List[Dict[str, Any]]:
+    """Metadata for every cache entry."""
+    entries = []
+    for meta_path in sorted(glob.glob(os.path.join(CACHE_DIR, '*.json'))):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        parquet_path = meta_path[:-len('.json')] + '.parquet'
+        meta['size_bytes'] = os.path.getsize(parquet_path) if os.path.exists(parquet_path) else 0
+        entries.append(meta)
+    return entries
+
+
+def clear_cache(paths: Optional[Iterable[str]] = None) -> int:
+    """
+    Delete cache entries. With paths, only entries for those workbooks (by
+    current content hash or by recorded source path); otherwise everything.
+    Returns the number of entries removed.
+    """
+    if paths:
+        targets = set()
+        for path in paths:
+            targets.add(os.path.abspath(path))
+            if os.path.exists(path):
+                targets.add(file_sha256(path))
+    removed = 0
+    for meta_path in glob.glob(os.path.join(CACHE_DIR, '*.json')):
+        if paths:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta.get('source') not in targets and meta.get('content_hash') not in targets:
+                continue
+        stem = meta_path[:-len('.json')]
+        for entry_path in (stem + '.parquet', meta_path):
+            if os.path.exists(entry_path):
+                os.remove(entry_path)
+        removed += 1
+    return removed
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Manage the Parquet cache of parsed Excel workbooks")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('list', help="Show cached workbooks")
+    clear_parser = subparsers.add_parser('clear', help="Invalidate cache entries")
+    clear_parser.add_argument('paths', nargs='*', help="Workbooks to invalidate (default: all)")
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        for meta in list_cache():
+            print(f"{meta['source']}: {meta['rows']} rows, "
+                  f"{meta['size_bytes'] / 1024 / 1024:.1f} MB, cached {meta['created_at']}")
+    elif args.command == 'clear':
+        removed = clear_cache(args.paths)
+        print(f"Removed {removed} cache entries from {CACHE_DIR}")
+
+
+if __name__ == '__main__':
+    main()
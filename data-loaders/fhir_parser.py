@@ -1,12 +1,18 @@
-python
-Copy
 #!/usr/bin/env python3
 
+import os
+import time
+import argparse
 import psycopg2
 import logging
-from typing import Dict, Any, Optional
+import multiprocessing as mp
+from collections import defaultdict, deque
+from psycopg2.extras import execute_values
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 import json
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+
+from dedupe_fhir_keys import TARGETS, DuplicateKeysError, ensure_unique_keys
 
 # Configure module logger
 logging.basicConfig(level=logging.INFO)
@@ -23,6 +29,19 @@ DB_CONFIG = {
     "password": "mysecretpassword"
 }
 
+# Batched pipeline settings
+CHUNK_SIZE = int(os.getenv("FHIR_PARSER_CHUNK_SIZE", "5000"))
+PARSER_WORKERS = int(os.getenv("FHIR_PARSER_WORKERS", max(1, mp.cpu_count() - 1)))
+# Name under which the incremental high-watermark is stored
+WATERMARK_NAME = "fhir_parser"
+# Incremental runs re-read this far behind the watermark. last_updated is
+# stamped before a loader's transaction commits, and checkpointed or parallel
+# loads commit out of order, so rows can become visible with a timestamp
+# already behind the watermark. Re-reading them is safe: every write upserts.
+WATERMARK_LOOKBACK = timedelta(hours=float(os.getenv("FHIR_PARSER_LOOKBACK_HOURS", "24")))
+# Domain tables whose natural keys the bulk upserts conflict on
+UPSERT_KEY_TABLES = ("patient_admission", "ed_visit", "icu_monitoring")
+
 # -----------------------------------------------------------------------------
 # 2. Helper functions for date/time
 # -----------------------------------------------------------------------------
@@ -188,59 +207,88 @@ def parse_resource(resource_type: str, resource_json: Dict[str, Any]) -> Dict[st
 
 
 # -----------------------------------------------------------------------------
-# 5. Storing Data in the fhir schema
+# 5. Admission lookup for ED visits
 # -----------------------------------------------------------------------------
-def upsert_ed_visit(conn, data: Dict[str, Any]) -> None:
+class AdmissionCache:
     """
-    Insert or update row in fhir.ed_visit table, referencing a patient_admission row (if needed).
-    We'll assume we must have a row in patient_admission first, but that might require logic.
+    In-process index of each patient's most recent active (PENDING/ADMITTED)
+    admission, keyed by patient UUID. Preloaded with one query at the start
+    of a run and updated as admissions are written, so ED encounters can be
+    matched to an admission without a per-resource SELECT.
     """
-    # We need an admission row to reference? In your schema, `ed_visit.admission_id` references
-    # patient_admission(id). So we either create or find an existing admission row for this patient.
-    if not data.get("patient_id"):
-        return
 
-    # Make a simplified approach: see if there's already a patient_admission for this Encounter
-    # We'll make a quick function find_or_create_admission for that
-    admission_id = find_or_create_admission_for_ed(conn, data)
-    if not admission_id:
-        logger.error(f"Cannot create ED visit because no admission_id was found/created.")
-        return
-
-    sql = """
-      INSERT INTO fhir.ed_visit(
-        id, admission_id, arrival_time, departure_time, acuity_level,
-        chief_complaint, status
-      )
-      VALUES (
-        gen_random_uuid(), %s, %s, %s, %s,
-        %s, %s
-      )
-      RETURNING id
-    """
-    with conn.cursor() as cur:
-        cur.execute(sql, (
-            admission_id,
-            data.get("arrival_time"),
-            data.get("departure_time"),
-            data.get("acuity_level"),
-            data.get("chief_complaint"),
-            data.get("status")
-        ))
-        new_id = cur.fetchone()[0]
-        logger.info(f"Inserted ED Visit row with id={new_id}")
-    conn.commit()
+    ACTIVE_STATUSES = ("PENDING", "ADMITTED")
+
+    def __init__(self) -> None:
+        # patient_id -> (admission_id, admission_time)
+        self.admissions: Dict[str, Tuple[str, Optional[datetime]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def preload(self, conn) -> None:
+        """Load the latest active admission of every patient in one query."""
+        sql = """
+          SELECT DISTINCT ON (patient_id) patient_id, id, admission_time
+            FROM fhir.patient_admission
+           WHERE status IN ('PENDING','ADMITTED')
+           ORDER BY patient_id, admission_time DESC
+        """
+        with conn.cursor() as cur:
+            cur.execute(sql)
+            for patient_id, admission_id, admission_time in cur:
+                self.admissions[str(patient_id)] = (admission_id, admission_time)
+        conn.commit()
+        logger.info(f"Preloaded {len(self.admissions)} active admissions into the admission cache.")
+
+    def get(self, patient_id: str) -> Optional[str]:
+        entry = self.admissions.get(str(patient_id))
+        if entry:
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        return None
 
-def find_or_create_admission_for_ed(conn, data: Dict[str, Any]) -> Optional[str]:
+    def record(self, patient_id: str, admission_id: str, admission_time: Optional[datetime], status: str) -> None:
+        """Keep the index current after an admission row is inserted or updated."""
+        key = str(patient_id)
+        current = self.admissions.get(key)
+        if status not in self.ACTIVE_STATUSES:
+            # A discharged/cancelled admission can no longer be matched
+            if current and current[0] == admission_id:
+                del self.admissions[key]
+            return
+        if current is None or current[1] is None or (admission_time is not None and admission_time >= current[1]):
+            self.admissions[key] = (admission_id, admission_time)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+def find_or_create_admission_for_ed(
+    conn,
+    data: Dict[str, Any],
+    commit: bool = True,
+    cache: Optional[AdmissionCache] = None
+) -> Optional[str]:
     """
     Because ed_visit needs an admission row, but FHIR doesn't always specify that concept,
     we can create a minimal 'patient_admission' row if needed.
     We'll look for existing admission by patient + some timeframe, or just create a new row.
+    With a preloaded cache, a cache miss means the patient has no active
+    admission, so the SELECT is skipped entirely.
     """
     patient_uuid = data.get("patient_id")
     if not patient_uuid:
         return None
 
+    if cache is not None:
+        admission_id = cache.get(patient_uuid)
+        if admission_id:
+            return admission_id
+        return create_admission_for_ed(conn, data, commit=commit, cache=cache)
+
     # 1) Try to see if there's an existing row in patient_admission for this patient that is still active
     sql_check = """
       SELECT id
@@ -257,6 +305,18 @@ def find_or_create_admission_for_ed(conn, data: Dict[str, Any]) -> Optional[str]
             return row[0]
 
     # 2) Otherwise, create a brand-new admission row
+    return create_admission_for_ed(conn, data, commit=commit)
+
+def create_admission_for_ed(
+    conn,
+    data: Dict[str, Any],
+    commit: bool = True,
+    cache: Optional[AdmissionCache] = None
+) -> str:
+    """
+    Insert the minimal 'patient_admission' row an ED visit hangs off, and
+    register it in the cache if one is in use.
+    """
     sql_ins = """
       INSERT INTO fhir.patient_admission(
         id, patient_id, encounter_id, admission_time, admission_type,
@@ -266,141 +326,436 @@ def find_or_create_admission_for_ed(conn, data: Dict[str, Any]) -> Optional[str]
         gen_random_uuid(), %s, NULL, %s, 'EMERGENCY',
         'ED', 'ADMITTED'
       )
-      RETURNING id
+      RETURNING id, admission_time
     """
     # We'll guess arrival_time as the admission_time
-    admission_time = data.get("arrival_time")
+    patient_uuid = data.get("patient_id")
     with conn.cursor() as cur:
-        cur.execute(sql_ins, (patient_uuid, admission_time))
-        new_id = cur.fetchone()[0]
+        cur.execute(sql_ins, (patient_uuid, data.get("arrival_time")))
+        new_id, admission_time = cur.fetchone()
         logger.info(f"Created new patient_admission row={new_id} for ED scenario.")
-    conn.commit()
+    if cache is not None:
+        cache.record(patient_uuid, new_id, admission_time, "ADMITTED")
+    if commit:
+        conn.commit()
     return new_id
 
-def upsert_patient_admission(conn, data: Dict[str, Any]) -> None:
+# -----------------------------------------------------------------------------
+# 6. Set-based writers for the batched pipeline
+# -----------------------------------------------------------------------------
+def ensure_upsert_keys(conn) -> None:
     """
-    Insert or update row in fhir.patient_admission for an 'inpatient' encounter.
+    Create the unique indexes the bulk upserts conflict on. The domain tables
+    only carry surrogate UUID keys, so these are created on the first run.
+    Duplicates left by the old row-at-a-time parser are reported and the run
+    stops before anything is written; dedupe_fhir_keys.py merges them.
     """
+    ensure_unique_keys(conn, [TARGETS[table] for table in UPSERT_KEY_TABLES])
+
+
+def dedupe_by_key(rows: List[Dict[str, Any]], key_fields: Tuple[str, ...]) -> List[Dict[str, Any]]:
+    """
+    Keep the last row per key. A single INSERT ... ON CONFLICT DO UPDATE
+    cannot touch the same target row twice, so duplicates within a chunk
+    have to be collapsed first.
+    """
+    unique = {}
+    for row in rows:
+        unique[tuple(row.get(f) for f in key_fields)] = row
+    return list(unique.values())
+
+
+def bulk_upsert_patient_admission(conn, rows: List[Dict[str, Any]], cache: Optional[AdmissionCache] = None) -> int:
+    """
+    Upsert a group of inpatient admissions with one statement, keyed on the
+    FHIR Encounter ID and admission time, and feed the resulting rows back
+    into the cache. Rows missing either key field cannot be upserted and are
+    logged and skipped.
+    """
+    keyed = [r for r in rows if r.get("encounter_id") and r.get("admission_time")]
+    if len(keyed) < len(rows):
+        logger.warning(
+            f"Skipped {len(rows) - len(keyed)} inpatient encounters without an encounter id or start time."
+        )
+    rows = dedupe_by_key(keyed, ("encounter_id", "admission_time"))
+    if not rows:
+        return 0
+
     sql = """
       INSERT INTO fhir.patient_admission(
-        id, patient_id, encounter_id, admission_time, discharge_time,
+        patient_id, encounter_id, admission_time, discharge_time,
         admission_type, admission_source, status
       )
-      VALUES (
-        gen_random_uuid(), %s, %s, %s, %s,
-        %s, %s, %s
+      VALUES %s
+      ON CONFLICT (encounter_id, admission_time) DO UPDATE
+         SET discharge_time = EXCLUDED.discharge_time,
+             admission_type = EXCLUDED.admission_type,
+             admission_source = EXCLUDED.admission_source,
+             status = EXCLUDED.status
+      RETURNING id, patient_id, admission_time, status
+    """
+    values = [(
+        r.get("patient_id"),
+        r.get("encounter_id"),
+        r.get("admission_time"),
+        r.get("discharge_time"),
+        r.get("admission_type"),
+        r.get("admission_source"),
+        r.get("status")
+    ) for r in rows]
+    with conn.cursor() as cur:
+        written = execute_values(cur, sql, values, page_size=len(values), fetch=True)
+    if cache is not None:
+        for admission_id, patient_id, admission_time, status in written:
+            cache.record(patient_id, admission_id, admission_time, status)
+    return len(values)
+
+
+def bulk_upsert_ed_visit(conn, rows: List[Dict[str, Any]], cache: Optional[AdmissionCache] = None) -> int:
+    """
+    Upsert a group of ED visits with one statement, keyed on
+    (admission_id, arrival_time). Each visit still needs an admission row,
+    which is resolved before the insert.
+    """
+    resolved = []
+    for data in rows:
+        if not data.get("patient_id"):
+            continue
+        admission_id = find_or_create_admission_for_ed(conn, data, commit=False, cache=cache)
+        if not admission_id:
+            logger.error("Cannot create ED visit because no admission_id was found/created.")
+            continue
+        resolved.append(dict(data, admission_id=admission_id))
+
+    resolved = dedupe_by_key(resolved, ("admission_id", "arrival_time"))
+    if not resolved:
+        return 0
+
+    sql = """
+      INSERT INTO fhir.ed_visit(
+        admission_id, arrival_time, departure_time, acuity_level,
+        chief_complaint, status
       )
-      RETURNING id
+      VALUES %s
+      ON CONFLICT (admission_id, arrival_time) DO UPDATE
+         SET departure_time = EXCLUDED.departure_time,
+             acuity_level = EXCLUDED.acuity_level,
+             chief_complaint = EXCLUDED.chief_complaint,
+             status = EXCLUDED.status
     """
+    values = [(
+        r["admission_id"],
+        r.get("arrival_time"),
+        r.get("departure_time"),
+        r.get("acuity_level"),
+        r.get("chief_complaint"),
+        r.get("status")
+    ) for r in resolved]
     with conn.cursor() as cur:
-        cur.execute(sql, (
-            data.get("patient_id"),
-            data.get("encounter_id"),
-            data.get("admission_time"),
-            data.get("discharge_time"),
-            data.get("admission_type"),
-            data.get("admission_source"),
-            data.get("status")
-        ))
-        new_id = cur.fetchone()[0]
-        logger.info(f"Inserted patient_admission row id={new_id}")
-    conn.commit()
+        execute_values(cur, sql, values, page_size=len(values))
+    return len(values)
+
 
-def upsert_icu_monitoring(conn, data: Dict[str, Any]) -> None:
+def bulk_upsert_icu_monitoring(conn, rows: List[Dict[str, Any]], cache: Optional[AdmissionCache] = None) -> int:
     """
-    Insert a row in icu_monitoring referencing an admission.
+    Upsert a group of ICU monitoring rows with one statement, keyed on the
+    FHIR Observation ID. Rows without an admission are skipped, as in
+    upsert_icu_monitoring.
     """
-    # We have "admission_id": None in parse_observation. So we might need logic
-    # to locate an existing admission or require an input.
-    # For demonstration, let's skip that and only insert if we can guess an admission.
-    if not data.get("admission_id"):
-        logger.warning("Skipping icu_monitoring insert because admission_id is missing.")
-        return
+    with_admission = [r for r in rows if r.get("admission_id")]
+    skipped = len(rows) - len(with_admission)
+    if skipped:
+        logger.warning(f"Skipping {skipped} icu_monitoring rows because admission_id is missing.")
+
+    with_admission = dedupe_by_key(with_admission, ("fhir_observation_id",))
+    if not with_admission:
+        return 0
 
     sql = """
       INSERT INTO fhir.icu_monitoring(
-        id, admission_id, monitoring_time, vital_signs,
-        fhir_observation_id
+        admission_id, monitoring_time, vital_signs, fhir_observation_id
       )
-      VALUES (
-        gen_random_uuid(), %s, %s, %s::jsonb, %s
-      )
-      RETURNING id
+      VALUES %s
+      ON CONFLICT (fhir_observation_id) DO UPDATE
+         SET admission_id = EXCLUDED.admission_id,
+             monitoring_time = EXCLUDED.monitoring_time,
+             vital_signs = EXCLUDED.vital_signs
     """
+    values = [(
+        r["admission_id"],
+        r["monitoring_time"],
+        json.dumps(r["vital_signs"]),
+        r["fhir_observation_id"]
+    ) for r in with_admission]
     with conn.cursor() as cur:
-        cur.execute(sql, (
-            data["admission_id"],
-            data["monitoring_time"],
-            json.dumps(data["vital_signs"]),  # store as JSONB
-            data["fhir_observation_id"]
-        ))
-        new_id = cur.fetchone()[0]
-        logger.info(f"Inserted icu_monitoring row id={new_id}")
-    conn.commit()
+        execute_values(cur, sql, values, template="(%s, %s, %s::jsonb, %s)", page_size=len(values))
+    return len(values)
+
+
+# Write order matters: ED visits may create admissions and reference them.
+BULK_WRITERS = [
+    ("patient_admission", bulk_upsert_patient_admission),
+    ("ed_visit", bulk_upsert_ed_visit),
+    ("icu_monitoring", bulk_upsert_icu_monitoring),
+]
 
 # -----------------------------------------------------------------------------
-# 6. Master function to store domain data
+# 7. Incremental high-watermark
 # -----------------------------------------------------------------------------
-def store_parsed_data(conn, parsed_data: Dict[str, Any]) -> None:
+def ensure_watermark_table(conn) -> None:
+    """Create the small state table holding the parser's high-watermark."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS fhir.parser_watermark (
+                name varchar(100) PRIMARY KEY,
+                last_updated timestamptz NOT NULL,
+                last_resource_id uuid NOT NULL,
+                updated_at timestamptz NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+    conn.commit()
+
+
+def load_watermark(conn, name: str = WATERMARK_NAME) -> Optional[Tuple[datetime, str]]:
     """
-    Based on the "domain_table" key, call the appropriate upsert function.
+    Return the (last_updated, resource id) of the last committed chunk, or
+    None if the parser has never completed a chunk.
     """
-    if not parsed_data:
-        return
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT last_updated, last_resource_id
+              FROM fhir.parser_watermark
+             WHERE name = %s
+        """, (name,))
+        row = cur.fetchone()
+    conn.commit()
+    return tuple(row) if row else None
 
-    domain_table = parsed_data.get("domain_table")
-    if not domain_table:
-        return  # No recognized table
-
-    if domain_table == "ed_visit":
-        upsert_ed_visit(conn, parsed_data)
-    elif domain_table == "patient_admission":
-        upsert_patient_admission(conn, parsed_data)
-    elif domain_table == "icu_monitoring":
-        upsert_icu_monitoring(conn, parsed_data)
-    else:
-        logger.info(f"No store logic for domain_table={domain_table}. Skipping.")
 
+def save_watermark(conn, watermark: Tuple[datetime, str], name: str = WATERMARK_NAME) -> None:
+    """
+    Record the watermark. Runs inside the chunk's transaction, so it only
+    moves forward together with the domain rows it covers. Chunks re-read
+    from the lookback window never move it backwards.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO fhir.parser_watermark AS w (name, last_updated, last_resource_id, updated_at)
+            VALUES (%s, %s, %s, CURRENT_TIMESTAMP)
+            ON CONFLICT (name) DO UPDATE
+               SET last_updated = EXCLUDED.last_updated,
+                   last_resource_id = EXCLUDED.last_resource_id,
+                   updated_at = EXCLUDED.updated_at
+             WHERE (w.last_updated, w.last_resource_id)
+                   < (EXCLUDED.last_updated, EXCLUDED.last_resource_id)
+        """, (name, watermark[0], watermark[1]))
 
 # -----------------------------------------------------------------------------
-# 7. Main pipeline
+# 8. Batched pipeline
 # -----------------------------------------------------------------------------
-def main():
-    logger.info("Starting comprehensive FHIR parser for custom fhir schema.")
+def iter_resource_chunks(
+    conn,
+    chunk_size: int = CHUNK_SIZE,
+    since: Optional[datetime] = None
+) -> Iterator[List[Tuple]]:
+    """
+    Stream fhir.fhir_resource through a server-side (named) cursor so only
+    one chunk is held in memory at a time. Rows come in (last_updated, id)
+    order; with since only rows updated at or after it are read.
+    """
+    sql = """
+        SELECT id, resource_type, resource_json, last_updated
+          FROM fhir.fhir_resource
+    """
+    params = ()
+    if since:
+        sql += " WHERE last_updated >= %s"
+        params = (since,)
+    sql += " ORDER BY last_updated, id"
+
+    with conn.cursor(name="fhir_parser_reader") as cur:
+        cur.itersize = chunk_size
+        cur.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+
+
+def parse_chunk(rows: List[Tuple]) -> List[Dict[str, Any]]:
+    """
+    Worker function: parse one chunk of (id, resource_type, resource_json,
+    last_updated) rows and return the non-empty parse results.
+    """
+    parsed = []
+    for fhir_id, resource_type, resource_json, _ in rows:
+        if isinstance(resource_json, str):
+            resource_json = json.loads(resource_json)
+        parsed_output = parse_resource(resource_type, resource_json)
+        if parsed_output and parsed_output.get("domain_table"):
+            parsed.append(parsed_output)
+    return parsed
+
+
+def group_by_domain_table(parsed_rows: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Group parse results by their target domain table."""
+    groups = defaultdict(list)
+    for row in parsed_rows:
+        groups[row["domain_table"]].append(row)
+    return groups
+
+
+def store_parsed_chunk(
+    conn,
+    parsed_rows: List[Dict[str, Any]],
+    watermark: Optional[Tuple[datetime, str]] = None,
+    cache: Optional[AdmissionCache] = None
+) -> Dict[str, int]:
+    """
+    Write one parsed chunk with one set-based statement per domain table and
+    commit it, together with the chunk's watermark, as a single transaction.
+    """
+    groups = group_by_domain_table(parsed_rows)
+    written = {}
+    try:
+        for domain_table, writer in BULK_WRITERS:
+            if groups.get(domain_table):
+                written[domain_table] = writer(conn, groups[domain_table], cache=cache)
+        if watermark:
+            save_watermark(conn, watermark)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    unmapped = set(groups) - {name for name, _ in BULK_WRITERS}
+    for domain_table in unmapped:
+        logger.info(f"No store logic for domain_table={domain_table}. Skipping.")
+    return written
+
+
+def chunk_summary(rows: List[Tuple]) -> Tuple[int, Tuple[datetime, str]]:
+    """Return (row count, watermark of the chunk's last row)."""
+    last_id, _, _, last_updated = rows[-1]
+    return len(rows), (last_updated, last_id)
+
+
+def iter_parsed_chunks(
+    chunks: Iterator[List[Tuple]],
+    workers: int
+) -> Iterator[Tuple[Tuple[int, Tuple[datetime, str]], List[Dict[str, Any]]]]:
+    """
+    Parse chunks across a process pool, yielding (chunk_summary, parsed_rows)
+    in input order. At most 2 * workers chunks are in flight so reading from
+    the server-side cursor never runs far ahead of the writer.
+    """
+    if workers <= 1:
+        for rows in chunks:
+            yield chunk_summary(rows), parse_chunk(rows)
+        return
+
+    with mp.Pool(workers) as pool:
+        pending = deque()
+        for rows in chunks:
+            pending.append((chunk_summary(rows), pool.apply_async(parse_chunk, (rows,))))
+            if len(pending) >= workers * 2:
+                summary, result = pending.popleft()
+                yield summary, result.get()
+        while pending:
+            summary, result = pending.popleft()
+            yield summary, result.get()
+
+
+def run_pipeline(
+    chunk_size: int = CHUNK_SIZE,
+    workers: int = PARSER_WORKERS,
+    incremental: bool = False,
+    lookback: timedelta = WATERMARK_LOOKBACK
+) -> None:
+    """
+    Read fhir.fhir_resource in chunks, parse them in parallel, and upsert each
+    chunk's rows per domain table, committing once per chunk.
 
-    # Connect to Postgres
-    conn = psycopg2.connect(**DB_CONFIG)
+    Every committed chunk advances the high-watermark. In incremental mode
+    only resources updated since lookback before the stored watermark are
+    read, so a nightly run (or a restart after a crash) picks up at the last
+    committed chunk, plus any late-committed rows behind it.
+    """
+    # Separate connections: committing on the writer must not close the
+    # reader's server-side cursor.
+    read_conn = psycopg2.connect(**DB_CONFIG)
+    write_conn = psycopg2.connect(**DB_CONFIG)
+    start_time = time.time()
+    total_resources = 0
+    totals = defaultdict(int)
 
     try:
-        with conn.cursor() as cur:
-            # Fetch resources from fhir.fhir_resource
-            # We can limit by resource_type or do them all
-            sql = """
-                SELECT id, resource_type, resource_json
-                  FROM fhir.fhir_resource
-                 ORDER BY last_updated DESC
-            """
-            cur.execute(sql)
-            rows = cur.fetchall()
-            logger.info(f"Fetched {len(rows)} resources from fhir.fhir_resource.")
+        ensure_upsert_keys(write_conn)
+        ensure_watermark_table(write_conn)
+
+        cache = AdmissionCache()
+        cache.preload(write_conn)
+
+        watermark = load_watermark(write_conn) if incremental else None
+        since = None
+        if watermark:
+            since = watermark[0] - lookback
+            logger.info(f"Incremental run from watermark last_updated={watermark[0]} id={watermark[1]}, "
+                        f"re-reading from {since}.")
+        elif incremental:
+            logger.info("No watermark stored yet; processing all resources.")
+
+        chunks = iter_resource_chunks(read_conn, chunk_size, since)
+        for chunk_no, ((count, chunk_watermark), parsed_rows) in enumerate(iter_parsed_chunks(chunks, workers), start=1):
+            written = store_parsed_chunk(write_conn, parsed_rows, chunk_watermark, cache)
+            total_resources += count
+            for domain_table, n in written.items():
+                totals[domain_table] += n
+            logger.info(f"Chunk {chunk_no}: {count} resources read, {sum(written.values())} domain rows written.")
+    finally:
+        read_conn.close()
+        write_conn.close()
+
+    elapsed = time.time() - start_time
+    rate = total_resources / elapsed if elapsed > 0 else 0
+    logger.info(f"Processed {total_resources} resources in {elapsed:.2f}s ({rate:.0f} resources/second).")
+    for domain_table, n in totals.items():
+        logger.info(f"  {domain_table}: {n} rows upserted")
+    logger.info(
+        f"Admission cache: {cache.hits} hits, {cache.misses} misses "
+        f"({cache.hit_rate:.1%} hit rate)."
+    )
 
-        for row in rows:
-            fhir_id, resource_type, resource_json = row
-            # resource_json is a Python dict if psycopg2 is set up with jsonb -> Python,
-            # but sometimes it might be a string. If it's a string, do: resource_json = json.loads(resource_json)
 
-            # 1) Parse the resource
-            parsed_output = parse_resource(resource_type, resource_json)
-            if not parsed_output:
-                continue
+# -----------------------------------------------------------------------------
+# 9. Main pipeline
+# -----------------------------------------------------------------------------
+def parse_args():
+    parser = argparse.ArgumentParser(description="Parse fhir.fhir_resource into the fhir domain tables")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                        help="Resources read and written per chunk")
+    parser.add_argument("--workers", type=int, default=PARSER_WORKERS,
+                        help="Parser processes (1 parses in the main process)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only process resources updated since the last committed chunk")
+    parser.add_argument("--lookback-hours", type=float, default=WATERMARK_LOOKBACK.total_seconds() / 3600,
+                        help="With --incremental, also re-read resources updated this long before the watermark")
+    return parser.parse_args()
+
 
-            # 2) Store the parsed data in the domain table(s)
-            store_parsed_data(conn, parsed_output)
+def main():
+    args = parse_args()
+    logger.info("Starting comprehensive FHIR parser for custom fhir schema.")
 
+    try:
+        run_pipeline(chunk_size=args.chunk_size, workers=args.workers, incremental=args.incremental,
+                     lookback=timedelta(hours=args.lookback_hours))
+    except DuplicateKeysError as e:
+        logger.error(str(e))
     except Exception as e:
         logger.error(f"Error in main parser: {e}", exc_info=True)
     finally:
-        conn.close()
         logger.info("Parser completed.")
 
 
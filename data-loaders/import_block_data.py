@@ -1,10 +1,16 @@
+import io
 import os
+import time
 import logging
+import argparse
+from contextlib import contextmanager
 import pandas as pd
-from sqlalchemy import create_engine, Table, Column, MetaData, Index
+from sqlalchemy import create_engine, text, Table, Column, MetaData, Index
 from sqlalchemy.types import Integer, String, DateTime, Boolean, Text
 from sqlalchemy.dialects.postgresql import NUMERIC
 from datetime import datetime
+from merge_block_schedules import BLOCK_KEY_COLUMNS, iter_block_schedule_sources, merge_block_partitions
+from excel_cache import read_excel_cached
 
 # Configure logging
 logging.basicConfig(
@@ -16,6 +22,32 @@ logging.basicConfig(
     ]
 )
 
+# Natural keys used by the incremental (upsert) loader
+NATURAL_KEYS = {
+    'block_schedule': BLOCK_KEY_COLUMNS,
+    'block_template': ['room_id', 'slot_start_time', 'slot_end_time', 'block_key'],
+}
+# On conflict, a row only replaces one with an older value in this column
+VERSION_COLUMNS = {
+    'block_schedule': 'last_change',
+}
+UPSERT_CHUNK_SIZE = int(os.getenv('UPSERT_CHUNK_SIZE', '50000'))
+
+# Secondary indexes dropped before and rebuilt after a --defer-indexes load.
+# The row_key unique indexes stay in place because ON CONFLICT needs them.
+SECONDARY_INDEXES = {
+    'block_template': {
+        'idx_block_template_schedule_date': 'schedule_date',
+        'idx_block_template_room_id': 'room_id',
+        'idx_block_template_surgeon_id': 'surgeon_id',
+    },
+    'block_schedule': {
+        'idx_block_schedule_snapshot_date': 'snapshot_date',
+        'idx_block_schedule_room_id': 'room_id',
+        'idx_block_schedule_block_key': 'block_key',
+    },
+}
+
 # Database connection configuration
 DB_CONFIG = {
     'host': os.getenv('DB_HOST', 'localhost'),
@@ -63,9 +95,11 @@ def create_tables(engine):
         Column('loc_name', String(100)),
         Column('location_abbr', String(50)),
         Column('pos_type', String(50)),
+        Column('row_key', String(32)),
         Index('idx_block_template_schedule_date', 'schedule_date'),
         Index('idx_block_template_room_id', 'room_id'),
         Index('idx_block_template_surgeon_id', 'surgeon_id'),
+        Index('uq_block_template_row_key', 'row_key', unique=True),
         schema='raw'
     )
 
@@ -96,9 +130,11 @@ def create_tables(engine):
         Column('last_change', DateTime),
         Column('snapshot_number', Integer),
         Column('or_template_audit_id', Integer),
+        Column('row_key', String(32)),
         Index('idx_block_schedule_snapshot_date', 'snapshot_date'),
         Index('idx_block_schedule_room_id', 'room_id'),
         Index('idx_block_schedule_block_key', 'block_key'),
+        Index('uq_block_schedule_row_key', 'row_key', unique=True),
         schema='raw'
     )
 
@@ -109,59 +145,58 @@ def create_tables(engine):
         logging.error(f"Failed to create block_schedule table: {str(e)}")
         raise
 def merge_block_schedules():
-    """Merge the two block schedule Excel files into one dataset."""
+    """Merge the two block schedule Excel files, yielding one deduplicated DataFrame per snapshot month.
+
+    Rows are keyed on block_key, room_id, start_time and snapshot_date; the
+    latest last_change wins.
+    """
     try:
         logging.info("Starting block schedule file merge")
-        
-        # Read both Excel files
-        final_df = pd.read_excel(
-            "Block Schedule Extracts Final - v2 DATA.xlsx",
-            engine='openpyxl'
-        )
-        releases_df = pd.read_excel(
-            "Block Schedule Extracts with First Releases - v2 DATA.xlsx",
-            engine='openpyxl'
-        )
-        
-        # Convert column names to lowercase
-        final_df.columns = final_df.columns.str.lower()
-        releases_df.columns = releases_df.columns.str.lower()
-        
-        # Merge dataframes
-        merged_df = pd.concat([final_df, releases_df], axis=0, ignore_index=True)
-        
-        # Convert datetime columns
-        date_columns = ['snapshot_date', 'start_time', 'end_time', 'first_change', 'last_change']
-        for col in date_columns:
-            if col in merged_df.columns:
-                merged_df[col] = pd.to_datetime(merged_df[col])
-        
-        logging.info(f"Successfully merged {len(final_df)} and {len(releases_df)} rows into {len(merged_df)} rows")
-        return merged_df
+        source_rows = 0
+        merged_rows = 0
+
+        def counted(frames):
+            nonlocal source_rows
+            for df in frames:
+                source_rows += len(df)
+                yield df
+
+        for month, month_df in merge_block_partitions(counted(iter_block_schedule_sources())):
+            merged_rows += len(month_df)
+            logging.info(f"Merged snapshot month {month}: {len(month_df)} rows")
+            yield month_df
+
+        logging.info(f"Successfully merged {source_rows} source rows into {merged_rows} rows")
         
     except Exception as e:
         logging.error(f"Failed to merge block schedule files: {str(e)}")
         raise
 
+def convert_block_schedule_types(df):
+    """Convert datetime and numeric columns of block schedule rows read from CSV."""
+    date_columns = ['snapshot_date', 'start_time', 'end_time', 'first_change', 'last_change']
+    for col in date_columns:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col])
+    
+    numeric_columns = ['slot_length', 'num_of_unique_releases', 'rel_days_before_surgery_date', 'snapshot_number']
+    for col in numeric_columns:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+def iter_merged_csv_chunks(chunk_size=UPSERT_CHUNK_SIZE):
+    """Read the merged block schedules CSV in typed chunks."""
+    for df in pd.read_csv("merged_block_schedules.csv", chunksize=chunk_size):
+        yield convert_block_schedule_types(df)
+
 def import_merged_csv_data(engine):
     """Import data from the merged block schedules CSV file to PostgreSQL."""
     try:
         logging.info("Starting block schedule data import from CSV file")
         
         # Read CSV file
-        df = pd.read_csv("merged_block_schedules.csv")
-        
-        # Convert datetime columns
-        date_columns = ['snapshot_date', 'start_time', 'end_time', 'first_change', 'last_change']
-        for col in date_columns:
-            if col in df.columns:
-                df[col] = pd.to_datetime(df[col])
-        
-        # Convert numeric columns
-        numeric_columns = ['slot_length', 'num_of_unique_releases', 'rel_days_before_surgery_date', 'snapshot_number']
-        for col in numeric_columns:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
+        df = convert_block_schedule_types(pd.read_csv("merged_block_schedules.csv"))
         
         # Import to PostgreSQL
         total_rows = len(df)
@@ -184,24 +219,28 @@ def import_merged_csv_data(engine):
         logging.error(f"Failed to import block schedule data from CSV: {str(e)}")
         raise
 
-def import_block_schedule_data(engine, df):
-    """Import merged block schedule data to PostgreSQL."""
+def import_block_schedule_data(engine, frames):
+    """Import merged block schedule data (a DataFrame or an iterable of DataFrames) to PostgreSQL."""
     try:
         logging.info("Starting block schedule data import")
         
-        total_rows = len(df)
+        if isinstance(frames, pd.DataFrame):
+            frames = [frames]
+        total_rows = 0
         chunk_size = 1000
         
-        for i in range(0, total_rows, chunk_size):
-            chunk = df[i:i + chunk_size]
-            chunk.to_sql(
-                'block_schedule',
-                engine,
-                schema='raw',
-                if_exists='append' if i > 0 else 'replace',
-                index=False
-            )
-            logging.info(f"Imported block schedule rows {i} to {min(i + chunk_size, total_rows)}")
+        for df in frames:
+            for i in range(0, len(df), chunk_size):
+                chunk = df[i:i + chunk_size]
+                chunk.to_sql(
+                    'block_schedule',
+                    engine,
+                    schema='raw',
+                    if_exists='append' if total_rows > 0 else 'replace',
+                    index=False
+                )
+                total_rows += len(chunk)
+                logging.info(f"Imported block schedule rows {total_rows - len(chunk)} to {total_rows}")
         
         logging.info(f"Successfully imported {total_rows} block schedule rows")
         
@@ -209,27 +248,28 @@ def import_block_schedule_data(engine, df):
         logging.error(f"Failed to import block schedule data: {str(e)}")
         raise
 
+def read_template_data():
+    """Read and type the block template workbook."""
+    # Read Excel file (parsed once, then served from the Parquet cache)
+    date_columns = ['schedule_date', 'slot_start_time', 'slot_end_time']
+    df = read_excel_cached(
+        "BLOCK Template Extract - v2 Data.xlsx",
+        date_columns=date_columns
+    )
+    
+    # Convert column names to lowercase
+    df.columns = df.columns.str.lower()
+    
+    # Convert room_id to string type
+    df['room_id'] = df['room_id'].astype(str)
+    return df
+
 def import_template_data(engine):
     """Import data from Excel file to PostgreSQL."""
     try:
         logging.info("Starting data import from Excel file")
         
-        # Read Excel file
-        df = pd.read_excel(
-            "BLOCK Template Extract - v2 Data.xlsx",
-            engine='openpyxl'
-        )
-        
-        # Convert column names to lowercase
-        df.columns = df.columns.str.lower()
-        
-        # Convert datetime columns
-        date_columns = ['schedule_date', 'slot_start_time', 'slot_end_time']
-        for col in date_columns:
-            df[col] = pd.to_datetime(df[col])
-        
-        # Convert room_id to string type
-        df['room_id'] = df['room_id'].astype(str)
+        df = read_template_data()
 
         # Import to PostgreSQL
         total_rows = len(df)
@@ -252,8 +292,283 @@ def import_template_data(engine):
         logging.error(f"Failed to import data: {str(e)}")
         raise
 
+def row_key_sql(key_columns):
+    """SQL expression hashing the natural key; NULLs are distinct from empty strings."""
+    parts = ", ".join(f"coalesce({col}::text, '\\N')" for col in key_columns)
+    return f"md5(concat_ws('|', {parts}))"
+
+def ensure_natural_key(engine, table, dedupe_existing=False):
+    """Add, backfill and uniquely index raw.<table>.row_key on tables created before it existed.
+
+    Rows already in the table that share a natural key block the unique index.
+    They are reported and the load stops, unless dedupe_existing is set, in
+    which case only the row with the latest version column (or the last one
+    written) is kept.
+    """
+    key_expr = row_key_sql(NATURAL_KEYS[table])
+    version = VERSION_COLUMNS.get(table)
+    keep_order = f"{version} DESC NULLS LAST, ctid DESC" if version else "ctid DESC"
+    raw_conn = engine.raw_connection()
+    try:
+        cursor = raw_conn.cursor()
+        cursor.execute(
+            "SELECT 1 FROM pg_indexes WHERE schemaname = 'raw' AND indexname = %s",
+            (f"uq_{table}_row_key",)
+        )
+        if cursor.fetchone():
+            return
+        cursor.execute(f"ALTER TABLE raw.{table} ADD COLUMN IF NOT EXISTS row_key varchar(32)")
+        cursor.execute(f"UPDATE raw.{table} SET row_key = {key_expr} WHERE row_key IS NULL")
+        if cursor.rowcount:
+            logging.info(f"Backfilled row_key for {cursor.rowcount} raw.{table} rows")
+        cursor.execute(f"SELECT count(*) - count(DISTINCT row_key) FROM raw.{table}")
+        duplicates = cursor.fetchone()[0]
+        if duplicates and not dedupe_existing:
+            raise RuntimeError(
+                f"raw.{table} already holds {duplicates} rows that duplicate another row's natural key "
+                f"({', '.join(NATURAL_KEYS[table])}). Re-run with --dedupe-existing to keep only the "
+                f"latest row per key, or clean them up by hand."
+            )
+        if duplicates:
+            cursor.execute(f"""
+                DELETE FROM raw.{table}
+                WHERE ctid IN (
+                    SELECT ctid FROM (
+                        SELECT ctid, row_number() OVER (PARTITION BY row_key ORDER BY {keep_order}) AS rn
+                        FROM raw.{table}
+                    ) ranked
+                    WHERE rn > 1
+                )
+            """)
+            logging.info(f"Removed {cursor.rowcount} duplicate raw.{table} rows")
+        cursor.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS uq_{table}_row_key ON raw.{table} (row_key)")
+        raw_conn.commit()
+    except Exception:
+        raw_conn.rollback()
+        raise
+    finally:
+        raw_conn.close()
+
+def dataframe_to_csv_buffer(df):
+    """Serialize a DataFrame for COPY, writing integral float columns as integers."""
+    df = df.copy()
+    for col in df.columns:
+        if pd.api.types.is_float_dtype(df[col]) and (df[col].dropna() % 1 == 0).all():
+            df[col] = df[col].astype('Int64')
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    return buffer
+
+def upsert_frames(engine, table, frames, dedupe_existing=False):
+    """Merge DataFrames into raw.<table> on its natural key.
+
+    Each chunk is COPYed into a temporary (unlogged) staging table and merged
+    with INSERT ... ON CONFLICT (row_key) DO UPDATE, which only touches rows
+    whose values changed. Each chunk commits on its own. dedupe_existing is
+    passed on to ensure_natural_key.
+
+    Returns:
+        dict: inserted, updated and unchanged row counts
+    """
+    ensure_natural_key(engine, table, dedupe_existing)
+    key_expr = row_key_sql(NATURAL_KEYS[table])
+    version = VERSION_COLUMNS.get(table)
+    stage = f"{table}_stage"
+    counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+
+    raw_conn = engine.raw_connection()
+    try:
+        cursor = raw_conn.cursor()
+        cursor.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS {stage} (LIKE raw.{table}) ON COMMIT DELETE ROWS"
+        )
+        cursor.execute(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_schema = 'raw' AND table_name = %s AND column_name <> 'row_key'",
+            (table,)
+        )
+        table_columns = {row[0] for row in cursor.fetchall()}
+
+        for chunk in frames:
+            if isinstance(chunk, pd.DataFrame) and chunk.empty:
+                continue
+            extra = [col for col in chunk.columns if col not in table_columns]
+            if extra:
+                logging.warning(f"Ignoring columns not in raw.{table}: {extra}")
+            columns = [col for col in chunk.columns if col in table_columns]
+            column_list = ", ".join(columns)
+
+            cursor.copy_expert(
+                f"COPY {stage} ({column_list}) FROM STDIN WITH (FORMAT csv)",
+                dataframe_to_csv_buffer(chunk[columns])
+            )
+            cursor.execute(f"UPDATE {stage} SET row_key = {key_expr}")
+            cursor.execute(f"SELECT count(DISTINCT row_key) FROM {stage}")
+            staged = cursor.fetchone()[0]
+
+            update_set = ", ".join(f"{col} = EXCLUDED.{col}" for col in columns)
+            changed = (
+                f"({', '.join('t.' + col for col in columns)}) IS DISTINCT FROM "
+                f"({', '.join('EXCLUDED.' + col for col in columns)})"
+            )
+            if version and version in columns:
+                changed += (
+                    f" AND (EXCLUDED.{version} IS NULL OR t.{version} IS NULL"
+                    f" OR EXCLUDED.{version} >= t.{version})"
+                )
+            order_by = f"row_key, {version} DESC NULLS LAST" if version and version in columns else "row_key"
+            cursor.execute(f"""
+                INSERT INTO raw.{table} AS t ({column_list}, row_key)
+                SELECT DISTINCT ON (row_key) {column_list}, row_key
+                FROM {stage}
+                ORDER BY {order_by}
+                ON CONFLICT (row_key) DO UPDATE SET {update_set}
+                WHERE {changed}
+                RETURNING (xmax = 0) AS inserted
+            """)
+            inserted = 0
+            written = 0
+            for (was_inserted,) in cursor:
+                written += 1
+                inserted += was_inserted
+            raw_conn.commit()
+
+            counts['inserted'] += inserted
+            counts['updated'] += written - inserted
+            counts['unchanged'] += staged - written
+            logging.info(
+                f"raw.{table}: {inserted} inserted, {written - inserted} updated, "
+                f"{staged - written} unchanged in chunk of {len(chunk)} rows"
+            )
+    except Exception:
+        raw_conn.rollback()
+        raise
+    finally:
+        raw_conn.close()
+
+    logging.info(
+        f"Upserted raw.{table}: {counts['inserted']} inserted, "
+        f"{counts['updated']} updated, {counts['unchanged']} unchanged"
+    )
+    return counts
+
+def chunk_frames(frames, chunk_size=UPSERT_CHUNK_SIZE):
+    """Split each DataFrame into chunks of at most chunk_size rows."""
+    for df in frames:
+        for i in range(0, len(df), chunk_size):
+            yield df[i:i + chunk_size]
+
+@contextmanager
+def timed_phase(timings, table, phase):
+    """Record how long the enclosed block took as (table, phase, seconds)."""
+    start = time.time()
+    try:
+        yield
+    finally:
+        elapsed = time.time() - start
+        timings.append((table, phase, elapsed))
+        logging.info(f"raw.{table} {phase}: {elapsed:.2f}s")
+
+def drop_secondary_indexes(engine, table):
+    """Drop raw.<table>'s secondary indexes ahead of a bulk load."""
+    with engine.begin() as conn:
+        for index_name in SECONDARY_INDEXES[table]:
+            conn.execute(text(f"DROP INDEX IF EXISTS raw.{index_name}"))
+
+def invalid_indexes(cursor, table):
+    """Names of raw.<table>'s indexes left INVALID by an interrupted concurrent build."""
+    cursor.execute("""
+        SELECT c.relname
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = %s::regclass AND NOT i.indisvalid
+    """, (f"raw.{table}",))
+    return {row[0] for row in cursor.fetchall()}
+
+def rebuild_secondary_indexes(engine, table, concurrently=True):
+    """Recreate raw.<table>'s secondary indexes and refresh its statistics.
+
+    CREATE INDEX CONCURRENTLY can't run inside a transaction, so this uses an
+    autocommit connection. A failed concurrent build leaves an INVALID index
+    behind, which IF NOT EXISTS would keep; such indexes (including ones left
+    by an earlier run) are dropped and built again without CONCURRENTLY.
+    """
+    raw_conn = engine.raw_connection()
+    try:
+        raw_conn.autocommit = True
+        cursor = raw_conn.cursor()
+        for index_name in invalid_indexes(cursor, table) & set(SECONDARY_INDEXES[table]):
+            logging.warning(f"Dropping invalid index raw.{index_name} left by an earlier build")
+            cursor.execute(f"DROP INDEX IF EXISTS raw.{index_name}")
+        for index_name, column in SECONDARY_INDEXES[table].items():
+            if concurrently:
+                try:
+                    cursor.execute(
+                        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} ON raw.{table} ({column})"
+                    )
+                    if index_name not in invalid_indexes(cursor, table):
+                        continue
+                    logging.warning(f"Concurrent build of {index_name} left an invalid index, rebuilding")
+                except Exception as e:
+                    logging.warning(f"Concurrent build of {index_name} failed, rebuilding: {str(e)}")
+                cursor.execute(f"DROP INDEX IF EXISTS raw.{index_name}")
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON raw.{table} ({column})")
+    finally:
+        raw_conn.close()
+
+def analyze_table(engine, table):
+    """Refresh planner statistics for raw.<table>."""
+    with engine.begin() as conn:
+        conn.execute(text(f"ANALYZE raw.{table}"))
+
+@contextmanager
+def deferred_indexes(engine, table, timings, enabled=True, concurrently=True):
+    """Wrap a bulk load: drop secondary indexes, load, rebuild them and ANALYZE.
+
+    The indexes are rebuilt even when the load fails, so the table is never
+    left without them. Each phase's duration is appended to timings. With
+    enabled=False only the load itself is timed.
+    """
+    if not enabled:
+        with timed_phase(timings, table, 'load'):
+            yield
+        return
+    with timed_phase(timings, table, 'drop indexes'):
+        drop_secondary_indexes(engine, table)
+    try:
+        with timed_phase(timings, table, 'load'):
+            yield
+    finally:
+        with timed_phase(timings, table, 'rebuild indexes'):
+            rebuild_secondary_indexes(engine, table, concurrently)
+        with timed_phase(timings, table, 'analyze'):
+            analyze_table(engine, table)
+
+def log_phase_timings(timings):
+    """Log the per-table, per-phase load timings."""
+    logging.info("Load phase timings:")
+    for table, phase, elapsed in timings:
+        logging.info(f"  raw.{table:<15} {phase:<16} {elapsed:8.2f}s")
+    logging.info(f"  {'total':<37} {sum(t[2] for t in timings):8.2f}s")
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Import block schedule and template data into the raw schema")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Upsert on natural keys instead of replacing the tables")
+    parser.add_argument('--dedupe-existing', action='store_true',
+                        help="With --incremental, delete rows already in the tables that duplicate "
+                             "a natural key (keeping the latest) instead of stopping")
+    parser.add_argument('--defer-indexes', action='store_true',
+                        help="Drop secondary indexes before loading, then rebuild them and ANALYZE")
+    parser.add_argument('--no-concurrent-index', action='store_true',
+                        help="With --defer-indexes, rebuild indexes without CONCURRENTLY")
+    return parser.parse_args()
+
 def main():
     """Main execution function."""
+    args = parse_args()
     try:
         # Initialize database connection
         engine = get_db_engine()
@@ -266,20 +581,34 @@ def main():
         print("1. Merge Excel files and import")
         print("2. Import from existing merged CSV")
         choice = input("Enter your choice (1 or 2): ")
-        
-        if choice == "1":
-            # Process block schedule files
-            merged_schedule_df = merge_block_schedules()
-            import_block_schedule_data(engine, merged_schedule_df)
-        elif choice == "2":
-            # Import from merged CSV
-            import_merged_csv_data(engine)
-        else:
+        if choice not in ("1", "2"):
             raise ValueError("Invalid choice. Please enter 1 or 2.")
         
+        timings = []
+        concurrently = not args.no_concurrent_index
+        with deferred_indexes(engine, 'block_schedule', timings, args.defer_indexes, concurrently):
+            if choice == "1":
+                # Process block schedule files
+                merged_schedule_df = merge_block_schedules()
+                if args.incremental:
+                    upsert_frames(engine, 'block_schedule', chunk_frames(merged_schedule_df), args.dedupe_existing)
+                else:
+                    import_block_schedule_data(engine, merged_schedule_df)
+            else:
+                # Import from merged CSV
+                if args.incremental:
+                    upsert_frames(engine, 'block_schedule', iter_merged_csv_chunks(), args.dedupe_existing)
+                else:
+                    import_merged_csv_data(engine)
+        
         # Process template data
-        import_template_data(engine)
+        with deferred_indexes(engine, 'block_template', timings, args.defer_indexes, concurrently):
+            if args.incremental:
+                upsert_frames(engine, 'block_template', chunk_frames([read_template_data()]), args.dedupe_existing)
+            else:
+                import_template_data(engine)
         
+        log_phase_timings(timings)
         logging.info("All data imports completed successfully")
     except Exception as e:
         logging.error(f"Import process failed: {str(e)}")
@@ -1,16 +1,29 @@
 import os
+import io
+import csv
+import time
+import argparse
+import resource
+import multiprocessing as mp
+from itertools import chain, islice
 import pandas as pd
 import numpy as np
 from sqlalchemy import create_engine, text, inspect
 from sqlalchemy.exc import SQLAlchemyError
 import logging
 import re
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from enum import Enum
 from dataclasses import dataclass
 from datetime import datetime
 from tqdm import tqdm
 import questionary
+from openpyxl import load_workbook
+
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:  # faster reader is optional; openpyxl is the fallback
+    CalamineWorkbook = None
 
 @dataclass
 class TargetTable:
@@ -90,6 +103,14 @@ DB_USER = os.getenv('DB_USER', 'postgres')
 DB_PASSWORD = os.getenv('DB_PASSWORD', 'acumenus')
 DB_SCHEMA = os.getenv('DB_SCHEMA', 'raw')
 
+# Rows read, converted and COPYed per chunk in streaming mode
+STREAM_CHUNK_SIZE = int(os.getenv('STREAM_CHUNK_SIZE', '50000'))
+# Worker processes (and database connections) used by --manifest batch mode
+BATCH_WORKERS = int(os.getenv('BATCH_WORKERS', str(max(1, mp.cpu_count() - 1))))
+
+# Per-process engine for batch workers, created by init_batch_worker
+worker_engine = None
+
 def clean_table_name(filename: str) -> str:
     """Convert Excel filename to valid PostgreSQL table name."""
     # Remove file extension
@@ -222,12 +243,24 @@ def get_target_table_mapping() -> Dict[str, List[str]]:
 
     return mapping
 
-def validate_and_map_columns(
-    df: pd.DataFrame,
+def clean_column_names(columns: List[Any]) -> List[str]:
+    """Normalize source column names (lowercase, underscores)."""
+    return [
+        re.sub(r'[^a-zA-Z0-9]', '_', str(col).lower()).strip('_')
+        for col in columns
+    ]
+
+def get_column_mapping(
+    source_columns: List[str],
     target: TargetTable
-) -> Tuple[pd.DataFrame, bool]:
-    """Validate and map source columns to target schema."""
-    source_cols = set(df.columns)
+) -> Optional[Dict[str, str]]:
+    """Interactively map source columns to the target schema.
+
+    Returns:
+        Optional[Dict[str, str]]: target column -> source column, or None if
+                                  the user declined to continue
+    """
+    source_cols = set(source_columns)
     target_cols = set(target.schema.keys())
     
     # Find missing required columns
@@ -235,7 +268,7 @@ def validate_and_map_columns(
     if missing:
         print(f"\nMissing required columns: {missing}")
         if not questionary.confirm("Continue with mapping available columns?").ask():
-            return df, False
+            return None
     
     # Interactive column mapping
     col_mapping = {}
@@ -249,9 +282,25 @@ def validate_and_map_columns(
             ).ask()
             if source_col != "Skip this column":
                 col_mapping[target_col] = source_col
-    
-    # Apply mapping and data type conversions
-    mapped_df = pd.DataFrame()
+    return col_mapping
+
+def validate_and_map_columns(
+    df: pd.DataFrame,
+    target: TargetTable
+) -> Tuple[pd.DataFrame, bool]:
+    """Validate and map source columns to target schema."""
+    col_mapping = get_column_mapping(list(df.columns), target)
+    if col_mapping is None:
+        return df, False
+    return apply_column_mapping(df, target, col_mapping), True
+
+def apply_column_mapping(
+    df: pd.DataFrame,
+    target: TargetTable,
+    col_mapping: Dict[str, str]
+) -> pd.DataFrame:
+    """Select mapped columns in target schema order and convert their types."""
+    mapped_df = pd.DataFrame(index=df.index)
     for target_col, pg_type in target.schema.items():
         if target_col in col_mapping:
             source_col = col_mapping[target_col]
@@ -269,7 +318,34 @@ def validate_and_map_columns(
             except Exception as e:
                 logging.warning(f"Could not convert {target_col} to {pg_type}: {e}")
 
-    return mapped_df, True
+    return mapped_df
+
+def prepare_existing_table(engine: Any, schema: str, table_name: str) -> bool:
+    """Ask how to handle an existing target table (and whether to back it up).
+
+    Returns:
+        bool: False if loading should be aborted
+    """
+    inspector = inspect(engine)
+    if table_name not in inspector.get_table_names(schema=schema):
+        return True
+
+    action = questionary.select(
+        "Table already exists. What would you like to do?",
+        choices=[action.value for action in TableAction]
+    ).ask()
+    action = TableAction(action)
+    
+    # Ask if backup is needed
+    if questionary.confirm("Would you like to backup the existing table?").ask():
+        if not backup_table(engine, schema, table_name):
+            if not questionary.confirm("Backup failed. Continue anyway?").ask():
+                return False
+    
+    if not handle_existing_table(engine, schema, table_name, action):
+        logging.error("Failed to handle existing table")
+        return False
+    return True
 
 def process_excel_file(
     file_path: str,
@@ -297,10 +373,7 @@ def process_excel_file(
         logging.info(f"Source file has {source_rows:,} rows")
         
         # Clean column names
-        df.columns = [
-            re.sub(r'[^a-zA-Z0-9]', '_', col.lower()).strip('_') 
-            for col in df.columns
-        ]
+        df.columns = clean_column_names(df.columns)
         
         # Map and validate data against target schema
         mapped_df, is_valid = validate_and_map_columns(df, TARGET_TABLES[target_table])
@@ -311,25 +384,8 @@ def process_excel_file(
         table_name = TARGET_TABLES[target_table].name
         
         # Check if table exists and get user preference
-        inspector = inspect(engine)
-        table_exists = table_name in inspector.get_table_names(schema=schema)
-
-        if table_exists:
-            action = questionary.select(
-                "Table already exists. What would you like to do?",
-                choices=[action.value for action in TableAction]
-            ).ask()
-            action = TableAction(action)
-            
-            # Ask if backup is needed
-            if questionary.confirm("Would you like to backup the existing table?").ask():
-                if not backup_table(engine, schema, table_name):
-                    if not questionary.confirm("Backup failed. Continue anyway?").ask():
-                        return None
-            
-            if not handle_existing_table(engine, schema, table_name, action):
-                logging.error("Failed to handle existing table")
-                return None
+        if not prepare_existing_table(engine, schema, table_name):
+            return None
 
         # Create or modify table (the CREATE itself happens automatically with to_sql if table doesn't exist)
         with engine.connect() as conn:
@@ -364,17 +420,396 @@ def process_excel_file(
         logging.error(f"Error processing {file_path}: {str(e)}")
         return None
 
+def iter_excel_rows(file_path: str) -> Iterator[tuple]:
+    """Yield the first worksheet's rows as tuples without loading the whole workbook.
+
+    Uses python-calamine when it is installed, otherwise openpyxl in read-only mode.
+    """
+    if CalamineWorkbook is not None:
+        sheet = CalamineWorkbook.from_path(file_path).get_sheet_by_index(0)
+        iter_rows = getattr(sheet, 'iter_rows', None)
+        if iter_rows is not None:
+            yield from iter_rows()
+            return
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        yield from workbook.worksheets[0].iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+def iter_excel_chunks(file_path: str, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """Yield the first worksheet as DataFrames of at most chunk_size rows with cleaned column names."""
+    rows = iter_excel_rows(file_path)
+    header = next(rows, None)
+    if header is None:
+        return
+    columns = clean_column_names(header)
+    while True:
+        batch = list(islice(rows, chunk_size))
+        if not batch:
+            return
+        yield pd.DataFrame(batch, columns=columns)
+
+def create_target_table(cursor: Any, schema: str, target: TargetTable, table_name: Optional[str] = None) -> None:
+    """Create the target table from TargetTable.schema if it doesn't exist."""
+    columns = ", ".join(f'"{col}" {pg_type}' for col, pg_type in target.schema.items())
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {schema}.{table_name or target.name} ({columns})")
+
+def copy_dataframe(cursor: Any, df: pd.DataFrame, schema: str, table_name: str) -> int:
+    """COPY a DataFrame into an existing table. Returns the number of rows written."""
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    columns = ", ".join(f'"{col}"' for col in df.columns)
+    cursor.copy_expert(
+        f"COPY {schema}.{table_name} ({columns}) FROM STDIN WITH (FORMAT csv)",
+        buffer
+    )
+    return cursor.rowcount
+
+def process_excel_file_streaming(
+    file_path: str,
+    target_table: str,
+    engine: Any,
+    schema: str,
+    chunk_size: int = STREAM_CHUNK_SIZE
+) -> Optional[Dict[str, int]]:
+    """Stream a single Excel file into PostgreSQL in bounded-memory chunks.
+
+    Rows are read chunk by chunk, mapped with TargetTable.schema and COPYed into
+    the target table in a single transaction.
+
+    Returns:
+        Optional[Dict[str, int]]: Dictionary with source and target row counts if successful,
+                                  None if failed
+    """
+    try:
+        # Validate file
+        is_valid, validation_msg = validate_excel_file(file_path)
+        if not is_valid:
+            logging.error(validation_msg)
+            return None
+
+        logging.info(f"Streaming file: {file_path}")
+        target = TARGET_TABLES[target_table]
+        chunks = iter_excel_chunks(file_path, chunk_size)
+        first_chunk = next(chunks, None)
+        if first_chunk is None:
+            logging.error("File has no header row")
+            return None
+
+        # Map columns once, from the first chunk's header
+        col_mapping = get_column_mapping(list(first_chunk.columns), target)
+        if col_mapping is None:
+            logging.error("Column mapping validation failed")
+            return None
+
+        table_name = target.name
+        if not prepare_existing_table(engine, schema, table_name):
+            return None
+
+        counts = copy_chunks(engine, schema, target, chain([first_chunk], chunks), col_mapping)
+        logging.info(f"Successfully loaded {counts['target_rows']:,} rows into {schema}.{table_name}")
+        return counts
+
+    except Exception as e:
+        logging.error(f"Error processing {file_path}: {str(e)}")
+        return None
+
+def copy_chunks(
+    engine: Any,
+    schema: str,
+    target: TargetTable,
+    chunks: Iterator[pd.DataFrame],
+    col_mapping: Dict[str, str],
+    show_progress: bool = True
+) -> Dict[str, int]:
+    """Map and COPY each chunk into the target table in a single transaction.
+
+    Row counts are checked against what COPY reports rather than COUNT(*), so
+    the check also holds when other loads append to the same table.
+    """
+    source_rows = 0
+    target_rows = 0
+    raw_conn = engine.raw_connection()
+    try:
+        cursor = raw_conn.cursor()
+        create_target_table(cursor, schema, target)
+        with tqdm(desc="Loading data", unit="rows", disable=not show_progress) as pbar:
+            for chunk in chunks:
+                mapped_df = apply_column_mapping(chunk, target, col_mapping)
+                target_rows += copy_dataframe(cursor, mapped_df, schema, target.name)
+                source_rows += len(chunk)
+                pbar.update(len(chunk))
+
+        # Validate row count
+        if source_rows != target_rows:
+            raise ValueError(
+                f"Row count mismatch! Source: {source_rows:,}, Target: {target_rows:,}"
+            )
+        raw_conn.commit()
+    except Exception:
+        raw_conn.rollback()
+        raise
+    finally:
+        raw_conn.close()
+    return {"source_rows": source_rows, "target_rows": target_rows}
+
+def benchmark_excel_load(
+    file_path: str,
+    target_table: str,
+    engine: Any,
+    schema: str,
+    chunk_size: int = STREAM_CHUNK_SIZE
+) -> None:
+    """Load one file with both paths into scratch tables and compare rows/sec.
+
+    Columns are mapped by name only (no prompts). The streaming path runs first
+    so the peak RSS reported after it is not inflated by the full read.
+    """
+    target = TARGET_TABLES[target_table]
+    results = []
+    raw_conn = engine.raw_connection()
+    try:
+        cursor = raw_conn.cursor()
+
+        # Streaming: chunked read + COPY
+        scratch = f"{target.name}_bench_streaming"
+        start = time.time()
+        cursor.execute(f"DROP TABLE IF EXISTS {schema}.{scratch}")
+        create_target_table(cursor, schema, target, table_name=scratch)
+        rows = 0
+        for chunk in iter_excel_chunks(file_path, chunk_size):
+            col_mapping = {col: col for col in target.schema if col in chunk.columns}
+            rows += copy_dataframe(cursor, apply_column_mapping(chunk, target, col_mapping), schema, scratch)
+        raw_conn.commit()
+        results.append(("streaming (COPY)", rows, time.time() - start,
+                        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+        cursor.execute(f"DROP TABLE IF EXISTS {schema}.{scratch}")
+        raw_conn.commit()
+    finally:
+        raw_conn.close()
+
+    # Current path: full read_excel + to_sql
+    scratch = f"{target.name}_bench_read_excel"
+    start = time.time()
+    df = pd.read_excel(file_path)
+    df.columns = clean_column_names(df.columns)
+    col_mapping = {col: col for col in target.schema if col in df.columns}
+    mapped_df = apply_column_mapping(df, target, col_mapping)
+    with engine.connect() as conn:
+        with conn.begin():
+            mapped_df.to_sql(scratch, conn, schema=schema, if_exists='replace',
+                             index=False, method='multi', chunksize=1000)
+    results.append(("read_excel + to_sql", len(mapped_df), time.time() - start,
+                    resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+    with engine.connect() as conn:
+        with conn.begin():
+            conn.execute(text(f"DROP TABLE IF EXISTS {schema}.{scratch}"))
+
+    logging.info(f"\nBenchmark for {file_path} -> {target_table}:")
+    for label, rows, elapsed, max_rss_kb in results:
+        rate = rows / elapsed if elapsed > 0 else 0
+        logging.info(
+            f"  {label:<22} {rows:,} rows in {elapsed:.2f}s "
+            f"({rate:,.0f} rows/sec, peak RSS {max_rss_kb / 1024:,.0f} MB)"
+        )
+
+@dataclass
+class ManifestEntry:
+    file: str
+    target_table: str  # key in TARGET_TABLES
+    action: TableAction
+    backup: bool = False
+
+def load_manifest(manifest_path: str) -> List[ManifestEntry]:
+    """Read a batch manifest CSV with columns file, target_table, action[, backup].
+
+    action is a TableAction name (create_new, drop_recreate, truncate, append).
+    Relative file paths are resolved against the manifest's directory.
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    entries = []
+    with open(manifest_path, newline='') as f:
+        for line_no, row in enumerate(csv.DictReader(f), start=2):
+            target_table = row['target_table'].strip()
+            if target_table not in TARGET_TABLES:
+                raise ValueError(f"{manifest_path}:{line_no}: unknown target table '{target_table}'")
+            action_name = row['action'].strip().upper()
+            if action_name not in TableAction.__members__:
+                raise ValueError(f"{manifest_path}:{line_no}: unknown action '{row['action']}'")
+            entries.append(ManifestEntry(
+                file=os.path.join(base_dir, row['file'].strip()),
+                target_table=target_table,
+                action=TableAction[action_name],
+                backup=(row.get('backup') or '').strip().lower() in ('1', 'true', 'yes')
+            ))
+    return entries
+
+def auto_column_mapping(source_columns: List[str], target: TargetTable) -> Dict[str, str]:
+    """Non-interactive column mapping: match cleaned source names to the target schema."""
+    col_mapping = {col: col for col in target.schema if col in source_columns}
+    missing = set(target.schema) - set(col_mapping)
+    if missing:
+        logging.warning(f"Missing columns for {target.name}, loading as NULL: {sorted(missing)}")
+    return col_mapping
+
+def prepare_manifest_tables(engine: Any, schema: str, entries: List[ManifestEntry]) -> Dict[str, str]:
+    """Apply backup/table actions once per target table before any file is loaded.
+
+    Workers then only append, so several files can load into the same table
+    concurrently. The first manifest entry for a table decides its action.
+
+    Returns:
+        Dict[str, str]: target table key -> error for tables that couldn't be prepared
+    """
+    failed = {}
+    for target_table in dict.fromkeys(entry.target_table for entry in entries):
+        table_entries = [entry for entry in entries if entry.target_table == target_table]
+        entry = table_entries[0]
+        if any(other.action != entry.action for other in table_entries):
+            logging.warning(f"Conflicting actions for {target_table}; using {entry.action.name}")
+
+        target = TARGET_TABLES[target_table]
+        inspector = inspect(engine)
+        if target.name in inspector.get_table_names(schema=schema):
+            if any(other.backup for other in table_entries) and not backup_table(engine, schema, target.name):
+                failed[target_table] = "Backup failed"
+                continue
+            if not handle_existing_table(engine, schema, target.name, entry.action):
+                failed[target_table] = f"Table exists and action is {entry.action.name}"
+                continue
+
+        raw_conn = engine.raw_connection()
+        try:
+            create_target_table(raw_conn.cursor(), schema, target)
+            raw_conn.commit()
+        finally:
+            raw_conn.close()
+    return failed
+
+def init_batch_worker(connection_string: str) -> None:
+    """Give each batch worker process its own single-connection engine."""
+    global worker_engine
+    worker_engine = create_engine(connection_string, pool_size=1, max_overflow=0)
+
+def load_manifest_entry(args: Tuple[ManifestEntry, str, int]) -> Tuple[str, Optional[Dict[str, int]]]:
+    """Batch worker: stream one manifest file into its (already prepared) table."""
+    entry, schema, chunk_size = args
+    try:
+        if not os.path.exists(entry.file):
+            logging.error(f"File not found: {entry.file}")
+            return entry.file, None
+
+        is_valid, validation_msg = validate_excel_file(entry.file)
+        if not is_valid:
+            logging.error(validation_msg)
+            return entry.file, None
+
+        target = TARGET_TABLES[entry.target_table]
+        chunks = iter_excel_chunks(entry.file, chunk_size)
+        first_chunk = next(chunks, None)
+        if first_chunk is None:
+            logging.error(f"{entry.file} has no header row")
+            return entry.file, None
+
+        col_mapping = auto_column_mapping(list(first_chunk.columns), target)
+        counts = copy_chunks(
+            worker_engine, schema, target, chain([first_chunk], chunks), col_mapping,
+            show_progress=False
+        )
+        logging.info(f"Loaded {counts['target_rows']:,} rows from {entry.file} into {schema}.{target.name}")
+        return entry.file, counts
+
+    except Exception as e:
+        logging.error(f"Error processing {entry.file}: {str(e)}")
+        return entry.file, None
+
+def run_manifest(
+    manifest_path: str,
+    engine: Any,
+    connection_string: str,
+    schema: str,
+    workers: int,
+    chunk_size: int
+) -> Tuple[int, int, List[Tuple[str, Dict[str, int]]]]:
+    """Load every file in a manifest without prompts, in parallel worker processes.
+
+    Returns:
+        Tuple[int, int, List]: success count, total files and per-file row counts
+    """
+    entries = load_manifest(manifest_path)
+    failed_tables = prepare_manifest_tables(engine, schema, entries)
+    for target_table, error in failed_tables.items():
+        logging.error(f"Skipping files for {target_table}: {error}")
+
+    runnable = [entry for entry in entries if entry.target_table not in failed_tables]
+    results = []
+    with mp.Pool(
+        max(1, min(workers, len(runnable) or 1)),
+        initializer=init_batch_worker,
+        initargs=(connection_string,)
+    ) as pool:
+        with tqdm(total=len(runnable), desc="Processing files") as pbar:
+            work = [(entry, schema, chunk_size) for entry in runnable]
+            for file, result in pool.imap_unordered(load_manifest_entry, work):
+                if result:
+                    results.append((file, result))
+                pbar.update(1)
+    return len(results), len(entries), results
+
+def log_summary(success_count: int, total_files: int, results: List[Tuple[str, Dict[str, int]]], partial: bool = False) -> None:
+    """Log the end-of-run summary of per-file row counts."""
+    logging.info("\nProcessing Summary (Partial):" if partial else "\nProcessing Summary:")
+    logging.info(f"Successfully processed {success_count} out of {total_files} files")
+    for file, counts in results:
+        logging.info(f"\n{file}:")
+        logging.info(f"  Source rows: {counts['source_rows']:,}")
+        logging.info(f"  Target rows: {counts['target_rows']:,}")
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Load Excel files into standardized PostgreSQL tables")
+    parser.add_argument('--streaming', action='store_true',
+                        help="Read files in chunks and COPY them instead of read_excel + to_sql")
+    parser.add_argument('--chunk-size', type=int, default=STREAM_CHUNK_SIZE,
+                        help="Rows per chunk in streaming mode")
+    parser.add_argument('--benchmark', nargs=2, metavar=('FILE', 'TARGET_TABLE'),
+                        help="Compare both load paths on one file using scratch tables")
+    parser.add_argument('--manifest', metavar='CSV',
+                        help="Load the files listed in a manifest (file,target_table,action[,backup]) "
+                             "without prompts, in parallel")
+    parser.add_argument('--workers', type=int, default=BATCH_WORKERS,
+                        help="Worker processes/connections for --manifest")
+    return parser.parse_args()
+
 def main():
     """Main function to process Excel files into standardized tables."""
+    args = parse_args()
     # Create database connection
     connection_string = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
     
+    success_count = 0
+    total_files = 0
+    results = []
     try:
         engine = create_engine(connection_string)
         
         # Create schema if it doesn't exist
         with engine.connect() as conn:
             conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {DB_SCHEMA}"))
+
+        if args.benchmark:
+            benchmark_excel_load(args.benchmark[0], args.benchmark[1], engine, DB_SCHEMA, args.chunk_size)
+            return
+
+        if args.manifest:
+            success_count, total_files, results = run_manifest(
+                args.manifest, engine, connection_string, DB_SCHEMA, args.workers, args.chunk_size
+            )
+            log_summary(success_count, total_files, results)
+            return
         
         # Get interactive mapping of source files to target tables
         file_mapping = get_target_table_mapping()
@@ -382,8 +817,6 @@ def main():
             logging.error("No files mapped to target tables")
             return
         
-        success_count = 0
-        results = []
         total_files = sum(len(files) for files in file_mapping.values())
         
         # Process files with progress bar
@@ -392,7 +825,12 @@ def main():
                 for file in files:
                     pbar.set_description(f"Processing {file}")
                     if os.path.exists(file):
-                        result = process_excel_file(file, target_table, engine, DB_SCHEMA)
+                        if args.streaming:
+                            result = process_excel_file_streaming(
+                                file, target_table, engine, DB_SCHEMA, args.chunk_size
+                            )
+                        else:
+                            result = process_excel_file(file, target_table, engine, DB_SCHEMA)
                         if result:
                             success_count += 1
                             results.append((file, result))
@@ -401,24 +839,14 @@ def main():
                     pbar.update(1)
         
         # Print summary
-        logging.info("\nProcessing Summary:")
-        logging.info(f"Successfully processed {success_count} out of {total_files} files")
-        for file, counts in results:
-            logging.info(f"\n{file}:")
-            logging.info(f"  Source rows: {counts['source_rows']:,}")
-            logging.info(f"  Target rows: {counts['target_rows']:,}")
+        log_summary(success_count, total_files, results)
 
     except SQLAlchemyError as e:
         logging.error(f"Database connection error: {str(e)}")
     except Exception as e:
         logging.error(f"Unexpected error: {str(e)}")
         # Print partial summary if an unexpected error occurs
-        logging.info("\nProcessing Summary (Partial):")
-        logging.info(f"Successfully processed {success_count} out of {total_files} files")
-        for file, counts in results:
-            logging.info(f"\n{file}:")
-            logging.info(f"  Source rows: {counts['source_rows']:,}")
-            logging.info(f"  Target rows: {counts['target_rows']:,}")
+        log_summary(success_count, total_files, results, partial=True)
 
 if __name__ == "__main__":
     main()
@@ -1,22 +1,35 @@
 #!/usr/bin/env python3
 
+import argparse
+import csv
+import hashlib
+import io
 import json
 import os
 import glob
 import logging
 import multiprocessing as mp
+import queue
+import threading
 from functools import partial
-from itertools import chain
+from itertools import chain, islice
 from rich.console import Console
 from rich.table import Table
 from rich.prompt import Confirm
 from tqdm import tqdm
 import time
-from datetime import datetime
+from datetime import datetime, timezone
 import psycopg2
 from psycopg2.extras import RealDictCursor
 from psycopg2.pool import SimpleConnectionPool
 
+from dedupe_fhir_keys import TARGETS, DuplicateKeysError, ensure_unique_keys, index_exists
+
+try:
+    import ijson
+except ImportError:  # streaming parse is optional
+    ijson = None
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -38,14 +51,31 @@ DB_CONFIG = {
 }
 
 # Processing configuration
-WORKER_COUNT = os.getenv('WORKER_COUNT', mp.cpu_count())
+WORKER_COUNT = int(os.getenv('WORKER_COUNT', str(mp.cpu_count())))
+# Upper bound on database connections the whole load may hold; each worker
+# process holds exactly one, so this also caps the worker count
+DB_CONNECTION_BUDGET = int(os.getenv('DB_CONNECTION_BUDGET', '16'))
+# Write batches from a background thread so parsing overlaps database I/O
+ASYNC_WRITER = os.getenv('ASYNC_WRITER', 'false').lower() in ('1', 'true', 'yes')
+# Parsed batches a worker may queue ahead of its writer thread
+WRITER_QUEUE_DEPTH = int(os.getenv('WRITER_QUEUE_DEPTH', '2'))
 BATCH_SIZE = int(os.getenv('BATCH_SIZE', '1000'))
+# Insert strategy: 'executemany' (row-by-row INSERT) or 'copy' (COPY ... FROM STDIN)
+LOAD_MODE = os.getenv('LOAD_MODE', 'executemany')
+# Parse bundles incrementally instead of loading the whole file (requires ijson)
+STREAM_PARSE = os.getenv('STREAM_PARSE', 'false').lower() in ('1', 'true', 'yes')
+
+# Record per-file load status in fhir.load_manifest and skip completed files
+CHECKPOINT = os.getenv('CHECKPOINT', 'false').lower() in ('1', 'true', 'yes')
 
 # Initialize connection pool
 pool = None
 
-def init_connection_pool(min_conn=1, max_conn=10):
-    """Initialize the database connection pool."""
+# Per-worker serialization buffer for COPY mode, reused across batches
+copy_buffer = None
+
+def init_connection_pool(min_conn=1, max_conn=1):
+    """Initialize the database connection pool (one connection per worker by default)."""
     global pool
     try:
         pool = SimpleConnectionPool(min_conn, max_conn, **DB_CONFIG)
@@ -82,8 +112,49 @@ def process_bundle(file_path):
         logger.error(f"Error processing file {file_path}: {e}")
         return []
 
-def insert_resources(conn, resources):
-    """Insert a batch of resources into the database."""
+def iter_bundle_resources(file_path):
+    """
+    Yield entry[].resource objects from a FHIR bundle one at a time, using an
+    event-based parser so memory stays flat regardless of the bundle size.
+    """
+    if ijson is None:
+        raise RuntimeError("Streaming parse requires the 'ijson' package")
+    with open(file_path, 'rb') as f:
+        yield from ijson.items(f, 'entry.item.resource', use_float=True)
+
+def iter_batches(iterable, size):
+    """Yield lists of at most size items from any iterable."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+def ensure_resource_keys(conn):
+    """
+    Make fhir.fhir_resource upsertable on (resource_type, fhir_id): add and
+    backfill the fhir_id and content_hash columns and create the unique index
+    ON CONFLICT relies on. Resources without an id keep fhir_id NULL and are
+    always inserted. Duplicates from older loads are not deleted here, since
+    other tables reference them; a DuplicateKeysError is raised instead and
+    dedupe_fhir_keys.py merges them.
+    """
+    ensure_unique_keys(conn, [TARGETS['fhir_resource']])
+
+# Shared by both loaders: only rewrite a resource when its content changed, so
+# unchanged resources cost no write and keep last_updated (and fhir_parser's
+# incremental watermark) untouched
+UPSERT_CONFLICT_SQL = """
+    ON CONFLICT (resource_type, fhir_id) DO UPDATE SET
+        resource_json = EXCLUDED.resource_json,
+        content_hash = EXCLUDED.content_hash,
+        last_updated = EXCLUDED.last_updated
+    WHERE r.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+"""
+
+def insert_resources(conn, resources, commit=True):
+    """Upsert a batch of resources into the database. Returns the number of resources processed."""
     cursor = conn.cursor()
     inserted = 0
     
@@ -97,61 +168,428 @@ def insert_resources(conn, resources):
                 continue
             values.append((
                 resource_type,
+                resource.get('id'),
                 json.dumps(resource),
-                datetime.utcnow()
+                datetime.now(timezone.utc)
             ))
         
         if values:
-            # Use executemany for batch insertion
+            # Use executemany for batch insertion; the hash is taken over the
+            # canonical jsonb text so it matches ensure_resource_keys' backfill
             sql = """
-                INSERT INTO fhir.fhir_resource 
-                (resource_type, resource_json, last_updated)
-                VALUES (%s, %s, %s)
-            """
+                INSERT INTO fhir.fhir_resource AS r
+                (resource_type, fhir_id, resource_json, content_hash, last_updated)
+                SELECT v.resource_type, v.fhir_id, v.resource_json, md5(v.resource_json::text), v.last_updated
+                FROM (VALUES (%s, %s, %s::jsonb, %s::timestamptz))
+                    AS v(resource_type, fhir_id, resource_json, last_updated)
+            """ + UPSERT_CONFLICT_SQL
             cursor.executemany(sql, values)
             inserted = len(values)
+            logger.debug(f"Wrote {cursor.rowcount} of {inserted} resources ({inserted - cursor.rowcount} unchanged)")
         
-        conn.commit()
+        if commit:
+            conn.commit()
         return inserted
-        except psycopg2.Error as e:
-            conn.rollback()
-            logger.error(f"Database error: {e}")
-            raise
-        finally:
-            cursor.close()
+    except psycopg2.Error as e:
+        conn.rollback()
+        logger.error(f"Database error: {e}")
+        raise
+    finally:
+        cursor.close()
+
+def get_copy_buffer():
+    """Return this worker's COPY buffer, emptied and ready for a new batch."""
+    global copy_buffer
+    if copy_buffer is None:
+        copy_buffer = io.StringIO()
+    copy_buffer.seek(0)
+    copy_buffer.truncate(0)
+    return copy_buffer
+
+def copy_resources(conn, resources, commit=True):
+    """
+    Stream a batch of resources into a temporary staging table with COPY FROM
+    STDIN and upsert them from there. Returns the number of resources processed.
+    """
+    cursor = conn.cursor()
+    inserted = 0
 
-def process_file(file_path):
-    """Worker function to process a single file."""
     try:
-        resources = process_bundle(file_path)
-        if not resources:
-            return file_path, 0, ("No resources found", None)
+        # Serialize the batch as CSV into the worker's buffer
+        buffer = get_copy_buffer()
+        writer = csv.writer(buffer)
+        # Offset-aware, so the server doesn't read it in its session TimeZone
+        last_updated = datetime.now(timezone.utc).isoformat()
+        for resource in resources:
+            resource_type = resource.get('resourceType')
+            if not resource_type:
+                logger.warning("Resource missing resourceType, skipping")
+                continue
+            writer.writerow((
+                inserted,
+                resource_type,
+                resource.get('id'),
+                json.dumps(resource, separators=(',', ':')),
+                last_updated
+            ))
+            inserted += 1
+
+        if inserted:
+            buffer.seek(0)
+            cursor.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS fhir_resource_stage (
+                    ord integer,
+                    resource_type varchar(50),
+                    fhir_id varchar(64),
+                    resource_json jsonb,
+                    last_updated timestamptz
+                )
+            """)
+            sql = """
+                COPY fhir_resource_stage
+                (ord, resource_type, fhir_id, resource_json, last_updated)
+                FROM STDIN WITH (FORMAT csv)
+            """
+            cursor.copy_expert(sql, buffer)
+            # A resource repeated within the batch is written once (last copy
+            # wins); ON CONFLICT can't touch the same row twice in a statement
+            cursor.execute("""
+                INSERT INTO fhir.fhir_resource AS r
+                (resource_type, fhir_id, resource_json, content_hash, last_updated)
+                SELECT DISTINCT ON (resource_type, coalesce(fhir_id, 'ord:' || ord))
+                    resource_type, fhir_id, resource_json, md5(resource_json::text), last_updated
+                FROM fhir_resource_stage
+                ORDER BY resource_type, coalesce(fhir_id, 'ord:' || ord), ord DESC
+            """ + UPSERT_CONFLICT_SQL)
+            logger.debug(f"Wrote {cursor.rowcount} of {inserted} resources ({inserted - cursor.rowcount} unchanged or repeated)")
+            cursor.execute("TRUNCATE fhir_resource_stage")
+
+        if commit:
+            conn.commit()
+        return inserted
+    except psycopg2.Error as e:
+        conn.rollback()
+        logger.error(f"Database error: {e}")
+        raise
+    finally:
+        cursor.close()
+
+# Available insert strategies, keyed by LOAD_MODE
+LOADERS = {
+    'executemany': insert_resources,
+    'copy': copy_resources,
+}
+
+def write_batches_async(batches, write, queue_depth=WRITER_QUEUE_DEPTH):
+    """
+    Hand batches to a writer thread through a bounded queue so the caller can
+    parse the next batch while the previous one is being written. Returns the
+    total written; re-raises the writer's first error.
+    """
+    pending = queue.Queue(maxsize=queue_depth)
+    state = {'inserted': 0, 'error': None}
+
+    def writer():
+        while True:
+            batch = pending.get()
+            if batch is None:
+                return
+            # After an error keep draining so the producer never blocks
+            if state['error'] is None:
+                try:
+                    state['inserted'] += write(batch)
+                except Exception as e:
+                    state['error'] = e
+
+    thread = threading.Thread(target=writer, daemon=True)
+    thread.start()
+    try:
+        for batch in batches:
+            if state['error'] is not None:
+                break
+            pending.put(batch)
+    finally:
+        pending.put(None)
+        thread.join()
+    if state['error'] is not None:
+        raise state['error']
+    return state['inserted']
+
+def write_batches(batches, write, async_writer=ASYNC_WRITER):
+    """Write every batch with write(batch), optionally from a background thread."""
+    if async_writer:
+        return write_batches_async(batches, write)
+    return sum(write(batch) for batch in batches)
+
+def process_file(file_path, mode=LOAD_MODE, stream=STREAM_PARSE, async_writer=ASYNC_WRITER, rollback=False):
+    """
+    Worker function to process a single file. With rollback=True nothing is
+    committed (used by the worker-count benchmark).
+    """
+    try:
+        if stream:
+            # Resources are parsed lazily, so at most one batch is held in memory
+            resources = iter_bundle_resources(file_path)
+        else:
+            resources = process_bundle(file_path)
+            if not resources:
+                return file_path, 0, ("No resources found", None)
         
+        load_batch = LOADERS[mode]
         conn = get_connection()
         try:
             # Process resources in batches
-            total_inserted = 0
-            for i in range(0, len(resources), BATCH_SIZE):
-                batch = resources[i:i + BATCH_SIZE]
-                inserted = insert_resources(conn, batch)
-                total_inserted += inserted
+            total_inserted = write_batches(
+                iter_batches(resources, BATCH_SIZE),
+                partial(load_batch, conn, commit=not rollback),
+                async_writer
+            )
+            if rollback:
+                conn.rollback()
+            if stream and total_inserted == 0:
+                return file_path, 0, ("No resources found", None)
             return file_path, total_inserted, (None, None)
         except Exception as e:
+            conn.rollback()
             return file_path, 0, (str(e), e)
         finally:
             return_connection(conn)
     except Exception as e:
         return file_path, 0, (str(e), e)
 
+def ensure_manifest_table(conn):
+    """Create the per-file checkpoint table used by checkpointed loads."""
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS fhir.load_manifest (
+                file_path text PRIMARY KEY,
+                file_size bigint NOT NULL,
+                file_mtime double precision NOT NULL,
+                content_hash text NOT NULL,
+                status text NOT NULL,
+                resource_count integer,
+                error text,
+                updated_at timestamptz NOT NULL DEFAULT now()
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_load_manifest_completed_hash
+            ON fhir.load_manifest (content_hash) WHERE status = 'completed'
+        """)
+    conn.commit()
+
+def file_sha256(file_path):
+    """Content hash of a file, read in 1 MB blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def pending_files(conn, file_paths):
+    """
+    Drop files the manifest already records as completed with the same size
+    and mtime. Everything else (new, changed or failed) still needs loading.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT file_path, file_size, file_mtime
+            FROM fhir.load_manifest
+            WHERE status = 'completed'
+        """)
+        completed = {path: (size, mtime) for path, size, mtime in cursor.fetchall()}
+    pending = []
+    for file_path in file_paths:
+        stat = os.stat(file_path)
+        if completed.get(os.path.abspath(file_path)) != (stat.st_size, stat.st_mtime):
+            pending.append(file_path)
+    return pending
+
+def record_file_status(conn, file_path, stat, content_hash, status, resource_count=None, error=None):
+    """Upsert a file's manifest row (the caller commits)."""
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO fhir.load_manifest
+                (file_path, file_size, file_mtime, content_hash, status, resource_count, error, updated_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, now())
+            ON CONFLICT (file_path) DO UPDATE SET
+                file_size = EXCLUDED.file_size,
+                file_mtime = EXCLUDED.file_mtime,
+                content_hash = EXCLUDED.content_hash,
+                status = EXCLUDED.status,
+                resource_count = EXCLUDED.resource_count,
+                error = EXCLUDED.error,
+                updated_at = now()
+        """, (os.path.abspath(file_path), stat.st_size, stat.st_mtime, content_hash,
+              status, resource_count, error))
+
+def process_file_checkpointed(file_path, mode=LOAD_MODE, stream=STREAM_PARSE, async_writer=ASYNC_WRITER):
+    """
+    Worker function for checkpointed loads. A file's resources and its
+    'completed' manifest row commit in one transaction, so a file is either
+    fully loaded and recorded or not at all, and reruns never insert it twice.
+    Content already loaded from any path is skipped.
+    """
+    try:
+        stat = os.stat(file_path)
+        content_hash = file_sha256(file_path)
+        load_batch = LOADERS[mode]
+        conn = get_connection()
+        try:
+            with conn.cursor() as cursor:
+                # Serialize workers that picked up identical content
+                cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (content_hash,))
+                cursor.execute("""
+                    SELECT resource_count FROM fhir.load_manifest
+                    WHERE content_hash = %s AND status = 'completed'
+                    LIMIT 1
+                """, (content_hash,))
+                already_loaded = cursor.fetchone()
+            if already_loaded:
+                record_file_status(conn, file_path, stat, content_hash, 'completed', already_loaded[0])
+                conn.commit()
+                return file_path, 0, (None, None)
+
+            resources = iter_bundle_resources(file_path) if stream else process_bundle(file_path)
+            total_inserted = write_batches(
+                iter_batches(resources, BATCH_SIZE),
+                partial(load_batch, conn, commit=False),
+                async_writer
+            )
+            if total_inserted == 0:
+                raise ValueError("No resources found")
+
+            record_file_status(conn, file_path, stat, content_hash, 'completed', total_inserted)
+            conn.commit()
+            return file_path, total_inserted, (None, None)
+        except Exception as e:
+            conn.rollback()
+            record_file_status(conn, file_path, stat, content_hash, 'failed', error=str(e))
+            conn.commit()
+            return file_path, 0, (str(e), e)
+        finally:
+            return_connection(conn)
+    except Exception as e:
+        return file_path, 0, (str(e), e)
+
+def benchmark_load_modes(json_files):
+    """
+    Load the given files once per insert strategy inside a transaction that is
+    rolled back, and report resources/second for each strategy side by side.
+    """
+    resources = list(chain.from_iterable(process_bundle(f) for f in json_files))
+    if not resources:
+        console.print("[yellow]No resources found in the benchmark sample.[/yellow]")
+        return
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    results = []
+    try:
+        for mode, load_batch in LOADERS.items():
+            start_time = time.time()
+            inserted = 0
+            for i in range(0, len(resources), BATCH_SIZE):
+                inserted += load_batch(conn, resources[i:i + BATCH_SIZE], commit=False)
+            elapsed_time = time.time() - start_time
+            conn.rollback()
+            results.append((mode, inserted, elapsed_time))
+    finally:
+        conn.close()
+
+    console.print("\n[bold green]Load Mode Benchmark[/bold green]")
+    table = Table(show_header=True)
+    table.add_column("Mode", style="cyan")
+    table.add_column("Resources", style="green")
+    table.add_column("Time", style="green")
+    table.add_column("Speed", style="green")
+    table.add_column("Speedup", style="green")
+
+    baseline_speed = None
+    for mode, inserted, elapsed_time in results:
+        speed = inserted / elapsed_time if elapsed_time > 0 else 0
+        if baseline_speed is None:
+            baseline_speed = speed
+        speedup = f"{speed / baseline_speed:.2f}x" if baseline_speed else "N/A"
+        table.add_row(mode, str(inserted), f"{elapsed_time:.2f} seconds", f"{speed:.2f} resources/second", speedup)
+    console.print(table)
+
+def worker_count(requested, connection_budget):
+    """Workers to start: each holds one connection, so never more than the budget."""
+    workers = max(1, min(requested, connection_budget))
+    if workers < requested:
+        logger.info(f"Capping workers at {workers} to stay within the connection budget of {connection_budget}")
+    return workers
+
+def benchmark_worker_counts(json_files, worker_counts, connection_budget, mode, stream, async_writer):
+    """
+    Load the same files once per worker count (every transaction rolled back)
+    and report throughput, to pick WORKER_COUNT for this machine and database.
+    """
+    results = []
+    for requested in worker_counts:
+        workers = worker_count(requested, connection_budget)
+        load = partial(process_file, mode=mode, stream=stream, async_writer=async_writer, rollback=True)
+        start_time = time.time()
+        inserted = 0
+        with mp.Pool(workers, initializer=init_connection_pool, initargs=(1, 1)) as worker_pool:
+            for file_path, file_inserted, (error, exc) in worker_pool.imap_unordered(load, json_files):
+                if error is not None:
+                    logger.error(f"Failed to process {file_path}: {error}")
+                inserted += file_inserted
+        results.append((workers, inserted, time.time() - start_time))
+
+    console.print("\n[bold green]Worker Count Benchmark[/bold green]")
+    table = Table(show_header=True)
+    table.add_column("Workers", style="cyan")
+    table.add_column("Resources", style="green")
+    table.add_column("Time", style="green")
+    table.add_column("Speed", style="green")
+    table.add_column("Speedup", style="green")
+
+    baseline_speed = None
+    for workers, inserted, elapsed_time in results:
+        speed = inserted / elapsed_time if elapsed_time > 0 else 0
+        if baseline_speed is None:
+            baseline_speed = speed
+        speedup = f"{speed / baseline_speed:.2f}x" if baseline_speed else "N/A"
+        table.add_row(str(workers), str(inserted), f"{elapsed_time:.2f} seconds", f"{speed:.2f} resources/second", speedup)
+    console.print(table)
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Load FHIR bundles into fhir.fhir_resource")
+    parser.add_argument('--mode', choices=sorted(LOADERS), default=LOAD_MODE,
+                        help="Insert strategy (default: LOAD_MODE env var or 'executemany')")
+    parser.add_argument('--benchmark', type=int, metavar='N', default=0,
+                        help="Compare insert strategies on the first N files and roll back")
+    parser.add_argument('--stream', action='store_true', default=STREAM_PARSE,
+                        help="Parse bundles incrementally with ijson (default: STREAM_PARSE env var)")
+    parser.add_argument('--checkpoint', action='store_true', default=CHECKPOINT,
+                        help="Track files in fhir.load_manifest, skip completed ones and load each file atomically")
+    parser.add_argument('--directory', default='.',
+                        help="Directory containing the FHIR bundle JSON files")
+    parser.add_argument('--workers', type=int, default=WORKER_COUNT,
+                        help="Worker processes (default: WORKER_COUNT env var or CPU count)")
+    parser.add_argument('--connection-budget', type=int, default=DB_CONNECTION_BUDGET,
+                        help="Maximum database connections for the whole load; caps --workers")
+    parser.add_argument('--async-writer', action='store_true', default=ASYNC_WRITER,
+                        help="Write batches from a background thread in each worker")
+    parser.add_argument('--sweep-workers', metavar='N[,N...]',
+                        type=lambda value: [int(n) for n in value.split(',')],
+                        help="Benchmark throughput for each worker count (on the first --benchmark files, "
+                             "or all files) and roll back")
+    return parser.parse_args()
+
 def main():
     """Main function to process all FHIR files."""
+    args = parse_args()
     try:
         # Show welcome message
         console.print("\n[bold blue]FHIR Resource Loader[/bold blue]")
         console.print("This script will load FHIR resources from JSON files into the database.\n")
         
         # Get list of JSON files first
-        json_files = glob.glob('*.json')
+        json_files = sorted(glob.glob(os.path.join(args.directory, '*.json')))
         total_files = len(json_files)
         
         if total_files == 0:
@@ -160,24 +598,62 @@ def main():
             
         # Show summary before starting
         console.print(f"[green]Found {total_files} JSON files to process[/green]")
+
+        skipped_files = 0
+        conn = psycopg2.connect(**DB_CONFIG)
+        try:
+            keys_ready = index_exists(conn, TARGETS['fhir_resource'])
+            if args.checkpoint and not (args.benchmark or args.sweep_workers):
+                ensure_manifest_table(conn)
+                pending = pending_files(conn, json_files)
+                skipped_files = total_files - len(pending)
+                json_files = pending
+                console.print(f"[green]{skipped_files} files already loaded, {len(json_files)} remaining[/green]")
+        finally:
+            conn.close()
+        if not json_files:
+            return
+
+        # Benchmarks roll their writes back and must not migrate the table,
+        # but their upserts need the unique key a real load creates
+        if (args.sweep_workers or args.benchmark) and not keys_ready:
+            console.print("[yellow]fhir.fhir_resource has no unique key yet; run a load first.[/yellow]")
+            return
+
+        if args.sweep_workers:
+            sample = json_files[:args.benchmark] if args.benchmark else json_files
+            benchmark_worker_counts(sample, args.sweep_workers, args.connection_budget,
+                                    args.mode, args.stream, args.async_writer)
+            return
+
+        if args.benchmark:
+            benchmark_load_modes(json_files[:args.benchmark])
+            return
         
         # Get user confirmation
         if not Confirm.ask("Do you want to proceed with loading these files?"):
             console.print("[yellow]Operation cancelled by user[/yellow]")
             return
-        
-        init_connection_pool()
+
+        conn = psycopg2.connect(**DB_CONFIG)
+        try:
+            ensure_resource_keys(conn)
+        finally:
+            conn.close()
         
         start_time = time.time()
         total_resources = 0
         failed_files = []
         successful_files = 0
         
-        # Initialize the process pool
-        with mp.Pool(WORKER_COUNT, initializer=init_connection_pool) as pool:
+        # Each worker process opens exactly one connection
+        workers = worker_count(args.workers, args.connection_budget)
+        with mp.Pool(workers, initializer=init_connection_pool, initargs=(1, 1)) as pool:
             # Process files in parallel with progress bar
-            with tqdm(total=total_files, desc="Processing files", unit="file") as pbar:
-                for file_path, inserted, (error, exc) in pool.imap_unordered(process_file, json_files):
+            with tqdm(total=len(json_files), desc="Processing files", unit="file") as pbar:
+                worker = process_file_checkpointed if args.checkpoint else process_file
+                load = partial(worker, mode=args.mode, stream=args.stream, async_writer=args.async_writer)
+                for file_path, inserted, (error, exc) in pool.imap_unordered(load, json_files):
                     pbar.update(1)
                     pbar.set_postfix_str(f"File: {file_path}")
                     
@@ -200,7 +676,13 @@ def main():
         table.add_column("Metric", style="cyan")
         table.add_column("Value", style="green")
         
+        table.add_row("Load Mode", args.mode)
+        table.add_row("Streaming Parse", "yes" if args.stream else "no")
+        table.add_row("Workers / Connections", str(workers))
+        table.add_row("Async Writer", "yes" if args.async_writer else "no")
         table.add_row("Total Files Processed", str(total_files))
+        if args.checkpoint:
+            table.add_row("Skipped (Already Loaded)", str(skipped_files))
         table.add_row("Successful Files", str(successful_files))
         table.add_row("Failed Files", str(len(failed_files)))
         table.add_row("Total Resources Inserted", str(total_resources))
@@ -221,6 +703,8 @@ def main():
                 error_table.add_row(failed_file, error)
             console.print(error_table)
     
+    except DuplicateKeysError as e:
+        console.print(f"[bold red]Nothing was loaded.[/bold red] {e}")
     except Exception as e:
         logger.error(f"An error occurred: {e}")
 
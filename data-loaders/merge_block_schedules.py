@@ -1,73 +1,124 @@
+import os
+import glob
+import shutil
+import tempfile
 import pandas as pd
-import numpy as np
-from typing import Tuple, List
+from typing import Tuple, List, Iterable, Iterator
 
-def load_excel_files() -> Tuple[pd.DataFrame, pd.DataFrame]:
-    """Load both Excel files and return as DataFrames."""
+from excel_cache import read_excel_cached
+
+BLOCK_SCHEDULE_FILES = [
+    'Block Schedule Extracts Final - v2 DATA.xlsx',
+    'Block Schedule Extracts with First Releases - v2 DATA.xlsx',
+]
+
+# A block schedule row is identified by these columns; among duplicates the
+# row with the latest last_change wins
+BLOCK_KEY_COLUMNS = ['block_key', 'room_id', 'start_time', 'snapshot_date']
+DATE_COLUMNS = ['snapshot_date', 'start_time', 'end_time', 'first_change', 'last_change']
+
+# Rows per chunk when reading CSV sources
+MERGE_CHUNK_SIZE = int(os.getenv('MERGE_CHUNK_SIZE', '500000'))
+
+def iter_source_chunks(path: str, chunk_size: int = MERGE_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """Yield a block schedule source in chunks (CSV) or whole (Excel, via the Parquet cache)."""
+    if path.lower().endswith('.csv'):
+        yield from pd.read_csv(path, chunksize=chunk_size)
+    else:
+        yield read_excel_cached(path, date_columns=DATE_COLUMNS)
+
+def key_as_string(series: pd.Series) -> pd.Series:
+    """Cast a key column to string so 1234 and 1234.0 hash the same across sources."""
+    if pd.api.types.is_float_dtype(series) and (series.dropna() % 1 == 0).all():
+        series = series.astype('Int64')
+    return series.astype('string')
+
+def normalize_block_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Lowercase columns, parse date columns and add the _key_hash column."""
+    df.columns = df.columns.str.lower()
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col])
+    for col in BLOCK_KEY_COLUMNS:
+        if col not in df.columns:
+            df[col] = pd.NaT if col in DATE_COLUMNS else pd.NA
+    for col in ('block_key', 'room_id'):
+        df[col] = key_as_string(df[col])
+    if 'last_change' not in df.columns:
+        df['last_change'] = pd.NaT
+    df['_key_hash'] = pd.util.hash_pandas_object(df[BLOCK_KEY_COLUMNS], index=False).to_numpy()
+    return df
+
+def dedupe_latest(df: pd.DataFrame) -> pd.DataFrame:
+    """Keep one row per key hash: the latest last_change, later source rows winning ties."""
+    df = df.sort_values('last_change', kind='stable', na_position='first')
+    df = df.drop_duplicates('_key_hash', keep='last')
+    return df.drop(columns='_key_hash').sort_values(BLOCK_KEY_COLUMNS[::-1], kind='stable', ignore_index=True)
+
+def spill_by_month(frames: Iterable[pd.DataFrame], spill_dir: str) -> List[str]:
+    """Normalize each frame and write its rows to one spill file per snapshot month.
+
+    Returns the union of all source columns, in first-seen order.
+    """
+    columns = []
+    for part, df in enumerate(frames):
+        df = normalize_block_frame(df)
+        months = df['snapshot_date'].dt.strftime('%Y-%m').fillna('unknown')
+        for month, month_df in df.groupby(months, sort=False):
+            month_dir = os.path.join(spill_dir, f"month={month}")
+            os.makedirs(month_dir, exist_ok=True)
+            month_df.to_pickle(os.path.join(month_dir, f"part-{part:06d}.pkl"))
+        columns += [col for col in df.columns if col not in columns and col != '_key_hash']
+    return columns
+
+def merge_block_partitions(frames: Iterable[pd.DataFrame], spill_dir: str = None) -> Iterator[Tuple[str, pd.DataFrame]]:
+    """Merge and dedupe block schedule rows one snapshot month at a time.
+
+    snapshot_date is part of the key, so duplicates never span months and each
+    month can be deduped on its own. Memory is bounded by the largest input
+    frame plus the largest month rather than the whole history.
+
+    Yields:
+        (month, DataFrame) pairs in month order, month being 'YYYY-MM' or 'unknown';
+        every DataFrame has the same columns
+    """
+    owns_spill_dir = spill_dir is None
+    spill_dir = spill_dir or tempfile.mkdtemp(prefix='block_merge_')
     try:
-        df_final = pd.read_excel('Block Schedule Extracts Final - v2 DATA.xlsx')
-        df_releases = pd.read_excel('Block Schedule Extracts with First Releases - v2 DATA.xlsx')
-        return df_final, df_releases
-    except Exception as e:
-        raise Exception(f"Error loading Excel files: {str(e)}")
-
-def analyze_columns(df_final: pd.DataFrame, df_releases: pd.DataFrame) -> None:
-    """Print analysis of columns in both DataFrames."""
-    final_cols = set(df_final.columns)
-    releases_cols = set(df_releases.columns)
-    
-    print("\nColumn Analysis:")
-    print("=" * 50)
-    print(f"Final file columns: {len(final_cols)}")
-    print(f"Releases file columns: {len(releases_cols)}")
-    
-    print("\nColumns unique to Final file:")
-    print(final_cols - releases_cols)
-    
-    print("\nColumns unique to Releases file:")
-    print(releases_cols - final_cols)
-    
-    print("\nCommon columns:")
-    print(final_cols.intersection(releases_cols))
-
-def merge_dataframes(df_final: pd.DataFrame, df_releases: pd.DataFrame) -> pd.DataFrame:
-    """Merge the two DataFrames, keeping all columns from both."""
-    # Combine all unique columns
-    all_columns = list(set(df_final.columns) | set(df_releases.columns))
-    
-    # Ensure both DataFrames have all columns, filling missing ones with NaN
-    for col in all_columns:
-        if col not in df_final.columns:
-            df_final[col] = np.nan
-        if col not in df_releases.columns:
-            df_releases[col] = np.nan
-    
-    # Concatenate the DataFrames
-    df_merged = pd.concat([df_final, df_releases], ignore_index=True)
-    
-    # Drop duplicates if any
-    df_merged = df_merged.drop_duplicates()
-    
-    return df_merged
+        columns = spill_by_month(frames, spill_dir)
+        for month_dir in sorted(glob.glob(os.path.join(spill_dir, 'month=*'))):
+            parts = sorted(glob.glob(os.path.join(month_dir, 'part-*.pkl')))
+            month_df = pd.concat((pd.read_pickle(p) for p in parts), ignore_index=True)
+            yield os.path.basename(month_dir).split('=', 1)[1], dedupe_latest(month_df).reindex(columns=columns)
+    finally:
+        if owns_spill_dir:
+            shutil.rmtree(spill_dir, ignore_errors=True)
+
+def iter_block_schedule_sources(paths: List[str] = BLOCK_SCHEDULE_FILES) -> Iterator[pd.DataFrame]:
+    """Read every block schedule source in order (earlier sources lose last_change ties)."""
+    for path in paths:
+        yield from iter_source_chunks(path)
 
 def main():
-    print("Loading Excel files...")
-    df_final, df_releases = load_excel_files()
-    
-    print("\nInitial row counts:")
-    print(f"Final file: {len(df_final)} rows")
-    print(f"Releases file: {len(df_releases)} rows")
-    
-    analyze_columns(df_final, df_releases)
-    
-    print("\nMerging files...")
-    df_merged = merge_dataframes(df_final, df_releases)
-    
-    print(f"\nFinal merged file: {len(df_merged)} rows")
-    
-    print("\nExporting to CSV...")
-    df_merged.to_csv('merged_block_schedules.csv', index=False)
-    print("Export complete: merged_block_schedules.csv")
+    print("Merging block schedules by snapshot month...")
+    source_rows = 0
+    merged_rows = 0
+    output = 'merged_block_schedules.csv'
+
+    def counted(frames):
+        nonlocal source_rows
+        for df in frames:
+            source_rows += len(df)
+            yield df
+
+    for month, df in merge_block_partitions(counted(iter_block_schedule_sources())):
+        df.to_csv(output, mode='w' if merged_rows == 0 else 'a', header=merged_rows == 0, index=False)
+        merged_rows += len(df)
+        print(f"{month}: {len(df)} rows")
+
+    print(f"\nSource rows: {source_rows}")
+    print(f"Final merged file: {merged_rows} rows ({source_rows - merged_rows} duplicates removed)")
+    print(f"Export complete: {output}")
 
 if __name__ == "__main__":
     main()
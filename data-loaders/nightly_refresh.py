@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
 
 import os
+import json
 import random
+import argparse
+import numpy as np
 import psycopg2
 from psycopg2.extras import execute_values
 from datetime import datetime, timedelta
@@ -16,7 +19,8 @@ DB_USER = os.getenv("DB_USER", "postgres")
 DB_PASS = os.getenv("DB_PASS", "acumenus")
 
 # How many new admissions do we want to add each night?
-NEW_ADMISSIONS_PER_DAY = 15
+# (Raise via the environment for dashboard load testing.)
+NEW_ADMISSIONS_PER_DAY = int(os.getenv("NEW_ADMISSIONS_PER_DAY", "15"))
 
 # Probability that an admitted patient gets discharged in this nightly run
 DISCHARGE_PROBABILITY = 0.25
@@ -27,6 +31,19 @@ TRANSFER_PROBABILITY = 0.10
 # Probability that a new order or event is created for an active admission
 ORDER_EVENT_PROBABILITY = 0.20
 
+# 'rowwise' walks admissions in Python; 'batched' makes the random decisions
+# with NumPy over the whole admitted set and applies them in bulk statements
+REFRESH_MODE = os.getenv("REFRESH_MODE", "rowwise")
+
+MEDICATION_ORDERS = ["High BP medication", "Pain reliever", "Antibiotic"]
+LAB_ORDERS = ["CBC", "CMP", "ABG", "Blood culture"]
+EVENT_SEVERITIES = ["LOW", "MEDIUM", "HIGH"]
+EVENT_TYPES = ["PAIN_ASSESSMENT", "MEDICATION_ISSUE", "FALL_RISK"]
+CHIEF_COMPLAINTS = [
+    'Chest pain', 'Shortness of breath', 'Abdominal pain',
+    'Fever', 'Headache', 'Back pain', 'Trauma'
+]
+
 
 ###############################################################################
 # HELPER FUNCTIONS
@@ -58,39 +75,67 @@ def random_datetime_within(days_back=1):
     return start + timedelta(seconds=random_offset)
 
 
-def pick_random_patient_ids(conn, limit=10):
+def pick_random_patient_encounters(conn, limit=10):
     """
-    Select random patient IDs from your fhir.patient_admission table
-    or from fhir.fhir_resource where resource_type='Patient'.
-    Adjust as needed for your schema.
+    Sample up to `limit` random patients together with one random Encounter
+    each, in a single query. Patients without an Encounter are dropped. The
+    containment filter lets the GIN index on resource_json serve the
+    encounter lookup.
     """
     with conn.cursor() as cur:
         cur.execute("""
-            SELECT id
-            FROM fhir.fhir_resource
-            WHERE resource_type = 'Patient'
-            ORDER BY RANDOM()
-            LIMIT %s;
+            WITH sampled AS (
+                SELECT id
+                FROM fhir.fhir_resource
+                WHERE resource_type = 'Patient'
+                ORDER BY random()
+                LIMIT %s
+            )
+            SELECT p.id, e.id
+            FROM sampled p
+            CROSS JOIN LATERAL (
+                SELECT enc.id
+                FROM fhir.fhir_resource enc
+                WHERE enc.resource_type = 'Encounter'
+                  AND enc.resource_json @> jsonb_build_object(
+                        'subject', jsonb_build_object('reference', 'Patient/' || p.id::text))
+                ORDER BY random()
+                LIMIT 1
+            ) e;
         """, (limit,))
-        return [row[0] for row in cur.fetchall()]
+        return cur.fetchall()
 
 
-def pick_random_encounter_id_for_patient(conn, patient_id):
+def fetch_admitted(conn):
     """
-    Picks one random Encounter resource for a given patient.
-    Adjust the JSON path if your schema differs.
+    Return (admission_ids, patient_ids) of all ADMITTED admissions as
+    object arrays, for vectorized decision making.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT id, patient_id
+            FROM fhir.patient_admission
+            WHERE status = 'ADMITTED'
+        """)
+        admitted = cur.fetchall()
+    if not admitted:
+        return np.empty(0, dtype=object), np.empty(0, dtype=object)
+    admitted = np.array(admitted, dtype=object)
+    return admitted[:, 0], admitted[:, 1]
+
+
+def fetch_care_area_ids(conn, area_type="INPATIENT_UNIT"):
+    """
+    Return every care_area id of the given type, so many random picks can be
+    drawn locally instead of one ORDER BY random() query each.
     """
     with conn.cursor() as cur:
         cur.execute("""
             SELECT id
-            FROM fhir.fhir_resource
-            WHERE resource_type = 'Encounter'
-              AND resource_json->'subject'->>'reference' = %s
-            ORDER BY random()
-            LIMIT 1;
-        """, (f"Patient/{patient_id}",))
-        row = cur.fetchone()
-        return row[0] if row else None
+            FROM fhir.care_area
+            WHERE area_type = %s;
+        """, (area_type,))
+        return [row[0] for row in cur.fetchall()]
 
 
 def pick_random_care_area_id(conn, area_type="INPATIENT_UNIT"):
@@ -121,12 +166,15 @@ def create_new_admissions(conn):
       - Possibly an ED visit if admission_source is ED
       - Possibly create an initial patient_location record
     """
-    patient_ids = pick_random_patient_ids(conn, limit=NEW_ADMISSIONS_PER_DAY)
-    if not patient_ids:
+    # One query for all (patient, encounter) pairs; patients without a
+    # matching Encounter are already filtered out
+    patient_encounters = pick_random_patient_encounters(conn, limit=NEW_ADMISSIONS_PER_DAY)
+    if not patient_encounters:
         return
 
-    care_area_id = pick_random_care_area_id(conn, "INPATIENT_UNIT")
-    if not care_area_id:
+    # Preloaded pool; each admission draws its initial unit from it locally
+    care_area_ids = fetch_care_area_ids(conn, "INPATIENT_UNIT")
+    if not care_area_ids:
         return
 
     # We'll build up lists of rows to insert
@@ -134,12 +182,7 @@ def create_new_admissions(conn):
     locations_data = []
     ed_visits_data = []
 
-    for p_id in patient_ids:
-        encounter_id = pick_random_encounter_id_for_patient(conn, p_id)
-        if not encounter_id:
-            # Skip if no matching Encounter
-            continue
-
+    for p_id, encounter_id in patient_encounters:
         admission_time = random_datetime_within(days_back=1)
         # 70% elective, 30% emergency
         admission_type = "ELECTIVE" if random.random() < 0.7 else "EMERGENCY"
@@ -175,8 +218,9 @@ def create_new_admissions(conn):
             RETURNING id, patient_id, admission_time, discharge_time, admission_type, admission_source, status;
         """
         if admissions_data:
-            execute_values(cur, sql_admission, admissions_data)
-            new_admissions = cur.fetchall()
+            # fetch=True collects RETURNING rows from every page, not just the last
+            new_admissions = execute_values(cur, sql_admission, admissions_data,
+                                            page_size=1000, fetch=True)
         else:
             new_admissions = []
 
@@ -193,7 +237,7 @@ def create_new_admissions(conn):
             locations_data.append((
                 patient_id,         # patient_id
                 admission_id,       # encounter_id or admission_id? Adjust if needed
-                care_area_id,       # care_area_id
+                random.choice(care_area_ids),  # care_area_id
                 'ACTIVE',           # status
                 admission_time,     # start_time
                 None                # end_time
@@ -218,11 +262,7 @@ def create_new_admissions(conn):
                 else:
                     acuity = 5
 
-                chief_complaints = [
-                    'Chest pain', 'Shortness of breath', 'Abdominal pain',
-                    'Fever', 'Headache', 'Back pain', 'Trauma'
-                ]
-                complaint = random.choice(chief_complaints)
+                complaint = random.choice(CHIEF_COMPLAINTS)
 
                 # If we know this is going to be an admission, set disposition to 'ADMIT'
                 # but some might get discharged from ED
@@ -258,7 +298,7 @@ def create_new_admissions(conn):
             VALUES %s;
         """
         if locations_data:
-            execute_values(cur, sql_location, locations_data)
+            execute_values(cur, sql_location, locations_data, page_size=1000)
 
         # Insert ED visits
         sql_ed_visit = """
@@ -277,7 +317,7 @@ def create_new_admissions(conn):
             VALUES %s;
         """
         if ed_visits_data:
-            execute_values(cur, sql_ed_visit, ed_visits_data)
+            execute_values(cur, sql_ed_visit, ed_visits_data, page_size=1000)
 
     print(f"Created {len(admissions_data)} new admissions.")
 
@@ -370,6 +410,78 @@ def discharge_or_transfer_patients(conn):
     print(f"Transferred {len(transfers)} patients.")
 
 
+def discharge_or_transfer_patients_batched(conn, rng):
+    """
+    Batched variant of discharge_or_transfer_patients: the discharge/transfer
+    decisions for the whole admitted set are drawn as NumPy arrays and
+    applied with a fixed number of bulk statements, regardless of census.
+    """
+    admission_ids, _ = fetch_admitted(conn)
+    n = len(admission_ids)
+    if not n:
+        return
+
+    # Same decision rule as the row-wise path: discharge first, otherwise
+    # an independent draw for transfer
+    discharge_mask = rng.random(n) < DISCHARGE_PROBABILITY
+    transfer_mask = ~discharge_mask & (rng.random(n) < TRANSFER_PROBABILITY)
+
+    discharged_ids = admission_ids[discharge_mask].tolist()
+    transferred_ids = admission_ids[transfer_mask].tolist()
+
+    care_area_ids = fetch_care_area_ids(conn, "INPATIENT_UNIT")
+    if transferred_ids and not care_area_ids:
+        transferred_ids = []
+
+    with conn.cursor() as cur:
+        if discharged_ids:
+            discharge_time = datetime.now()
+            cur.execute("""
+                UPDATE fhir.patient_admission
+                   SET discharge_time = %s,
+                       status = 'DISCHARGED'
+                 WHERE id = ANY(%s::uuid[])
+            """, (discharge_time, discharged_ids))
+            cur.execute("""
+                UPDATE fhir.patient_location
+                   SET end_time = %s,
+                       status = 'COMPLETED'
+                 WHERE encounter_id = ANY(%s::uuid[])
+                   AND status = 'ACTIVE'
+            """, (discharge_time, discharged_ids))
+
+        if transferred_ids:
+            new_areas = rng.choice(np.array(care_area_ids, dtype=object), size=len(transferred_ids)).tolist()
+            cur.execute("""
+                UPDATE fhir.patient_location
+                   SET end_time = now(),
+                       status = 'COMPLETED'
+                 WHERE encounter_id = ANY(%s::uuid[])
+                   AND status = 'ACTIVE';
+            """, (transferred_ids,))
+            execute_values(cur, """
+                INSERT INTO fhir.patient_location (
+                    patient_id,
+                    encounter_id,
+                    care_area_id,
+                    status,
+                    start_time,
+                    end_time
+                )
+                SELECT pa.patient_id,
+                       pa.id,
+                       v.care_area_id::uuid,
+                       'ACTIVE',
+                       now(),
+                       NULL
+                FROM (VALUES %s) AS v(admission_id, care_area_id)
+                JOIN fhir.patient_admission pa ON pa.id = v.admission_id::uuid
+            """, list(zip(transferred_ids, new_areas)))
+
+    print(f"Discharged {len(discharged_ids)} patients.")
+    print(f"Transferred {len(transferred_ids)} patients.")
+
+
 def create_new_orders_and_events(conn):
     """
     For some fraction of ADMITTED patients, add a random "order" or "clinical_event".
@@ -416,7 +528,8 @@ def create_new_orders_and_events(conn):
                 event_time = datetime.now()
                 severity = random.choice(["LOW", "MEDIUM", "HIGH"])
                 event_type = random.choice(["PAIN_ASSESSMENT", "MEDICATION_ISSUE", "FALL_RISK"])
-                details = f"Event {event_type} recorded for patient {patient_id}"
+                # event_details is jsonb, so the message is stored as a JSON string
+                details = json.dumps(f"Event {event_type} recorded for patient {patient_id}")
                 event_data.append((
                     admission_id,
                     event_type,
@@ -452,25 +565,121 @@ def create_new_orders_and_events(conn):
                 )
                 VALUES %s
             """
-            # If your schema stores event_details as JSON, adapt accordingly
-            # for now we treat it as text or a JSON field.
             execute_values(cur, sql_insert_event, event_data)
 
     print(f"Created {len(order_data)} orders.")
     print(f"Created {len(event_data)} events.")
 
 
+def create_new_orders_and_events_batched(conn, rng):
+    """
+    Batched variant of create_new_orders_and_events: which admissions get an
+    order and/or event, and their types, are drawn as NumPy arrays over the
+    admitted set and inserted with one execute_values call per table.
+    """
+    admission_ids, patient_ids = fetch_admitted(conn)
+    n = len(admission_ids)
+    if not n:
+        return
+
+    order_mask = rng.random(n) < ORDER_EVENT_PROBABILITY
+    order_idx = np.flatnonzero(order_mask)
+    n_orders = len(order_idx)
+
+    # 50/50 medication vs lab order, each with a random detail
+    is_medication = rng.random(n_orders) < 0.5
+    order_types = np.where(is_medication, "MEDICATION", "LAB")
+    order_details = np.where(
+        is_medication,
+        rng.choice(MEDICATION_ORDERS, size=n_orders),
+        rng.choice(LAB_ORDERS, size=n_orders)
+    )
+
+    # Half of the admissions with an order also get a clinical event
+    event_idx = order_idx[rng.random(n_orders) < 0.5]
+    n_events = len(event_idx)
+    event_types = rng.choice(EVENT_TYPES, size=n_events)
+    severities = rng.choice(EVENT_SEVERITIES, size=n_events)
+
+    now = datetime.now()
+    order_data = list(zip(
+        admission_ids[order_idx].tolist(),
+        order_types.tolist(),
+        [now] * n_orders,
+        order_details.tolist(),
+        ["ACTIVE"] * n_orders
+    ))
+    event_data = [
+        (admission_id, event_type, now, severity,
+         json.dumps(f"Event {event_type} recorded for patient {patient_id}"), "COMPLETED")
+        for admission_id, patient_id, event_type, severity in zip(
+            admission_ids[event_idx].tolist(),
+            patient_ids[event_idx].tolist(),
+            event_types.tolist(),
+            severities.tolist()
+        )
+    ]
+
+    with conn.cursor() as cur:
+        if order_data:
+            execute_values(cur, """
+                INSERT INTO fhir.clinical_order (
+                    admission_id,
+                    order_type,
+                    order_time,
+                    order_details,
+                    status
+                )
+                VALUES %s
+            """, order_data, page_size=1000)
+
+        if event_data:
+            execute_values(cur, """
+                INSERT INTO fhir.clinical_event (
+                    admission_id,
+                    event_type,
+                    event_time,
+                    severity,
+                    event_details,
+                    status
+                )
+                VALUES %s
+            """, event_data, page_size=1000)
+
+    print(f"Created {len(order_data)} orders.")
+    print(f"Created {len(event_data)} events.")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Nightly synthetic ADT refresh")
+    parser.add_argument("--mode", choices=["rowwise", "batched"], default=REFRESH_MODE,
+                        help="How discharges/transfers and orders/events are generated")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed for the batched mode's random generator")
+    return parser.parse_args()
+
+
 def main():
+    args = parse_args()
     conn = get_connection()
     try:
         # 1. Create new admissions for the day
         create_new_admissions(conn)
 
-        # 2. Discharge or transfer some patients
-        discharge_or_transfer_patients(conn)
+        if args.mode == "batched":
+            rng = np.random.default_rng(args.seed)
+
+            # 2. Discharge or transfer some patients
+            discharge_or_transfer_patients_batched(conn, rng)
+
+            # 3. Create new orders and clinical events
+            create_new_orders_and_events_batched(conn, rng)
+        else:
+            # 2. Discharge or transfer some patients
+            discharge_or_transfer_patients(conn)
 
-        # 3. Create new orders and clinical events
-        create_new_orders_and_events(conn)
+            # 3. Create new orders and clinical events
+            create_new_orders_and_events(conn)
 
         # Finally commit all changes
         conn.commit()
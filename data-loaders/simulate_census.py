@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+
+import io
+import csv
+import json
+import time
+import uuid
+import argparse
+import multiprocessing as mp
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from nightly_refresh import (
+    get_connection,
+    fetch_care_area_ids,
+    NEW_ADMISSIONS_PER_DAY,
+    DISCHARGE_PROBABILITY,
+    TRANSFER_PROBABILITY,
+    ORDER_EVENT_PROBABILITY,
+    MEDICATION_ORDERS,
+    LAB_ORDERS,
+    EVENT_TYPES,
+    EVENT_SEVERITIES,
+    CHIEF_COMPLAINTS,
+)
+
+###############################################################################
+# CONFIGURATION
+###############################################################################
+
+# Same acuity distribution as nightly_refresh.create_new_admissions (1-5)
+ACUITY_LEVELS = [1, 2, 3, 4, 5]
+ACUITY_WEIGHTS = [0.05, 0.10, 0.30, 0.35, 0.20]
+
+# Rows buffered per shard before they are COPYed and committed
+FLUSH_ROWS = 50000
+
+# Patient partitions, each with its own child seed. Fixed rather than tied to
+# the CPU count so the same --seed reproduces the same census on any machine;
+# --workers decides how many of them run at once.
+DEFAULT_SHARDS = 16
+
+# Column order of the COPY buffers. Tables are flushed in this order so an
+# admission always lands before the rows that reference it.
+COPY_COLUMNS = {
+    "patient_admission": (
+        "id", "patient_id", "encounter_id", "admission_time", "discharge_time",
+        "admission_type", "admission_source", "expected_los_days", "status",
+    ),
+    "patient_location": (
+        "id", "patient_id", "encounter_id", "care_area_id", "status",
+        "start_time", "end_time",
+    ),
+    "ed_visit": (
+        "id", "admission_id", "arrival_time", "triage_time", "provider_time",
+        "disposition_time", "departure_time", "acuity_level", "chief_complaint",
+        "disposition_type", "status",
+    ),
+    "clinical_order": (
+        "id", "admission_id", "order_type", "order_time", "order_details", "status",
+    ),
+    "clinical_event": (
+        "id", "admission_id", "event_type", "event_time", "severity",
+        "event_details", "status",
+    ),
+}
+
+
+###############################################################################
+# HELPER FUNCTIONS
+###############################################################################
+
+def fetch_patient_encounters(conn):
+    """
+    Return one (patient_id, encounter_id) pair for every Patient that has at
+    least one Encounter, in a stable order so shards are reproducible.
+    Readmissions reuse the patient's encounter; admissions are keyed on
+    (encounter_id, admission_time), and a patient is only readmitted after
+    the previous stay ends, so they never collide.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT DISTINCT ON (p.id) p.id, e.id
+            FROM fhir.fhir_resource p
+            JOIN fhir.fhir_resource e
+              ON e.resource_type = 'Encounter'
+             AND e.resource_json->'subject'->>'reference' = 'Patient/' || p.id::text
+            WHERE p.resource_type = 'Patient'
+            ORDER BY p.id, e.id;
+        """)
+        return cur.fetchall()
+
+
+class CopyWriter:
+    """
+    Accumulates rows per table in CSV buffers and writes them with
+    COPY ... FROM STDIN, one transaction per flush.
+    """
+
+    def __init__(self, conn, flush_rows=FLUSH_ROWS):
+        self.conn = conn
+        self.flush_rows = flush_rows
+        self.buffers = {table: io.StringIO() for table in COPY_COLUMNS}
+        self.writers = {table: csv.writer(buf) for table, buf in self.buffers.items()}
+        self.pending = 0
+        self.counts = {table: 0 for table in COPY_COLUMNS}
+
+    def add(self, table, row):
+        self.writers[table].writerow(row)
+        self.counts[table] += 1
+        self.pending += 1
+
+    def maybe_flush(self):
+        if self.pending >= self.flush_rows:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        with self.conn.cursor() as cur:
+            for table, columns in COPY_COLUMNS.items():
+                buf = self.buffers[table]
+                if not buf.tell():
+                    continue
+                buf.seek(0)
+                cur.copy_expert(
+                    f"COPY fhir.{table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+                    buf
+                )
+                buf.seek(0)
+                buf.truncate(0)
+        self.conn.commit()
+        self.pending = 0
+
+
+###############################################################################
+# SIMULATION
+###############################################################################
+
+def simulate_stay(writer, rng, new_id, patient_id, encounter_id, care_area_ids,
+                  start_date, day, horizon_days):
+    """
+    Simulate one admission from arrival until discharge (or the end of the
+    horizon), applying the nightly_refresh probabilities once per simulated
+    night, and buffer every row it produces.
+    """
+    day_start = start_date + timedelta(days=day)
+    admission_time = day_start + timedelta(seconds=float(rng.random() * 86400))
+    admission_type = "ELECTIVE" if rng.random() < 0.7 else "EMERGENCY"
+    admission_source = "ED" if rng.random() < 0.8 else "DIRECT"
+    expected_los_days = round(float(rng.uniform(1, 5)), 2)
+
+    # Each nightly run discharges with DISCHARGE_PROBABILITY, so the number of
+    # nights until discharge is geometric
+    los_nights = int(rng.geometric(DISCHARGE_PROBABILITY))
+    discharge_day = day + los_nights
+    discharged = discharge_day < horizon_days
+    last_night = discharge_day if discharged else horizon_days - 1
+
+    def night_time(d):
+        return start_date + timedelta(days=d, seconds=float(rng.random() * 86400))
+
+    admission_id = new_id()
+    discharge_time = night_time(discharge_day) if discharged else None
+    writer.add("patient_admission", (
+        admission_id, patient_id, encounter_id, admission_time, discharge_time,
+        admission_type, admission_source, expected_los_days,
+        "DISCHARGED" if discharged else "ADMITTED",
+    ))
+
+    # Location chain: initial unit, then a transfer on any non-discharge night
+    location_start = admission_time
+    care_area_id = care_area_ids[rng.integers(len(care_area_ids))]
+    for night in range(day + 1, min(discharge_day, horizon_days)):
+        if rng.random() < TRANSFER_PROBABILITY:
+            transfer_time = night_time(night)
+            writer.add("patient_location", (
+                new_id(), patient_id, admission_id, care_area_id, "COMPLETED",
+                location_start, transfer_time,
+            ))
+            location_start = transfer_time
+            care_area_id = care_area_ids[rng.integers(len(care_area_ids))]
+    writer.add("patient_location", (
+        new_id(), patient_id, admission_id, care_area_id,
+        "COMPLETED" if discharged else "ACTIVE",
+        location_start, discharge_time,
+    ))
+
+    if admission_source == "ED":
+        triage_time = admission_time + timedelta(minutes=int(rng.integers(5, 31)))
+        provider_time = admission_time + timedelta(minutes=int(rng.integers(30, 121)))
+        disposition_time = admission_time + timedelta(hours=int(rng.integers(2, 7)))
+        departure_time = disposition_time + timedelta(minutes=int(rng.integers(15, 91)))
+        writer.add("ed_visit", (
+            new_id(), admission_id, admission_time, triage_time, provider_time,
+            disposition_time, departure_time,
+            int(rng.choice(ACUITY_LEVELS, p=ACUITY_WEIGHTS)),
+            CHIEF_COMPLAINTS[rng.integers(len(CHIEF_COMPLAINTS))],
+            "ADMIT", "COMPLETED",
+        ))
+
+    # Orders/events: one draw per nightly run that left the patient admitted
+    stay_nights = np.arange(day + 1, discharge_day if discharged else horizon_days)
+    order_nights = stay_nights[rng.random(len(stay_nights)) < ORDER_EVENT_PROBABILITY]
+    for night in order_nights.tolist():
+        order_time = night_time(night)
+        if rng.random() < 0.5:
+            order_type, details = "MEDICATION", MEDICATION_ORDERS[rng.integers(len(MEDICATION_ORDERS))]
+        else:
+            order_type, details = "LAB", LAB_ORDERS[rng.integers(len(LAB_ORDERS))]
+        writer.add("clinical_order", (
+            new_id(), admission_id, order_type, order_time, details, "ACTIVE",
+        ))
+        if rng.random() < 0.5:
+            event_type = EVENT_TYPES[rng.integers(len(EVENT_TYPES))]
+            writer.add("clinical_event", (
+                new_id(), admission_id, event_type, order_time,
+                EVENT_SEVERITIES[rng.integers(len(EVENT_SEVERITIES))],
+                json.dumps(f"Event {event_type} recorded for patient {patient_id}"),
+                "COMPLETED",
+            ))
+
+    return last_night
+
+
+def simulate_shard(shard):
+    """
+    Worker function: simulate the whole horizon for one disjoint slice of
+    patients with its own seeded generator, streaming rows out with COPY.
+    """
+    shard_id, seed_seq, patient_encounters, care_area_ids, start_date, days, admissions_per_day, flush_rows = shard
+    rng = np.random.default_rng(seed_seq)
+
+    def new_id():
+        # Derived from the shard's generator so reruns reproduce the same keys
+        return str(uuid.UUID(bytes=rng.bytes(16), version=4))
+
+    conn = get_connection()
+    writer = CopyWriter(conn, flush_rows)
+    # Last simulated day each patient is still in hospital (-1 = available)
+    busy_until = np.full(len(patient_encounters), -1)
+    try:
+        for day in range(days):
+            available = np.flatnonzero(busy_until < day)
+            n_new = min(int(rng.poisson(admissions_per_day)), len(available))
+            for idx in rng.choice(available, size=n_new, replace=False).tolist():
+                patient_id, encounter_id = patient_encounters[idx]
+                busy_until[idx] = simulate_stay(
+                    writer, rng, new_id, patient_id, encounter_id, care_area_ids,
+                    start_date, day, days
+                )
+            writer.maybe_flush()
+        writer.flush()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return shard_id, writer.counts
+
+
+###############################################################################
+# MAIN LOGIC
+###############################################################################
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Backfill a multi-day synthetic census using the nightly_refresh model"
+    )
+    parser.add_argument("--days", type=int, default=30,
+                        help="Number of days to simulate")
+    parser.add_argument("--start-date", type=lambda s: datetime.strptime(s, "%Y-%m-%d"), default=None,
+                        help="First simulated day, YYYY-MM-DD (default: --days before today)")
+    parser.add_argument("--admissions-per-day", type=float, default=NEW_ADMISSIONS_PER_DAY,
+                        help="Mean new admissions per day across all shards")
+    parser.add_argument("--shards", type=int, default=DEFAULT_SHARDS,
+                        help="Independent patient partitions, each with its own seed")
+    parser.add_argument("--workers", type=int, default=mp.cpu_count(),
+                        help="Worker processes")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Root seed; the same seed and shard count reproduce the same data")
+    parser.add_argument("--flush-rows", type=int, default=FLUSH_ROWS,
+                        help="Rows buffered per shard before each COPY/commit")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    start_date = args.start_date or (
+        datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        - timedelta(days=args.days)
+    )
+
+    conn = get_connection()
+    try:
+        patient_encounters = fetch_patient_encounters(conn)
+        care_area_ids = sorted(fetch_care_area_ids(conn, "INPATIENT_UNIT"))
+    finally:
+        conn.close()
+
+    if not patient_encounters or not care_area_ids:
+        print("ERROR: need Patient/Encounter resources and INPATIENT_UNIT care areas to simulate.")
+        return
+
+    n_shards = max(1, min(args.shards, len(patient_encounters)))
+    seeds = np.random.SeedSequence(args.seed).spawn(n_shards)
+    shards = [
+        (shard_id, seeds[shard_id], [tuple(pe) for pe in part], care_area_ids,
+         start_date, args.days, args.admissions_per_day / n_shards, args.flush_rows)
+        for shard_id, part in enumerate(np.array_split(np.array(patient_encounters, dtype=object), n_shards))
+    ]
+
+    print(f"Simulating {args.days} days from {start_date:%Y-%m-%d} "
+          f"for {len(patient_encounters)} patients in {n_shards} shards.")
+
+    started = time.time()
+    totals = {table: 0 for table in COPY_COLUMNS}
+    with mp.Pool(max(1, min(args.workers, n_shards))) as pool:
+        for shard_id, counts in pool.imap_unordered(simulate_shard, shards):
+            for table, n in counts.items():
+                totals[table] += n
+            print(f"Shard {shard_id} done: {sum(counts.values())} rows.")
+
+    elapsed = time.time() - started
+    total_rows = sum(totals.values())
+    for table, n in totals.items():
+        print(f"Created {n} {table} rows.")
+    print(f"Wrote {total_rows} rows in {elapsed:.1f}s "
+          f"({total_rows / elapsed if elapsed > 0 else 0:.0f} rows/second).")
+
+
+if __name__ == "__main__":
+    main()
@@ -65,9 +65,12 @@ CREATE TABLE fhir.fhir_resource (
 	resource_type varchar(50) NOT NULL,
 	resource_json jsonb NOT NULL,
 	last_updated timestamptz DEFAULT CURRENT_TIMESTAMP NOT NULL,
+	fhir_id varchar(64) NULL,
+	content_hash bpchar(32) NULL,
 	CONSTRAINT fhir_resource_pkey PRIMARY KEY (id)
 );
 CREATE INDEX idx_fhir_resource_last_updated ON fhir.fhir_resource USING btree (last_updated);
+CREATE UNIQUE INDEX uq_fhir_resource_type_fhir_id ON fhir.fhir_resource USING btree (resource_type, fhir_id);
 CREATE INDEX idx_fhir_resource_resource_json ON fhir.fhir_resource USING gin (resource_json);
 CREATE INDEX idx_fhir_resource_type ON fhir.fhir_resource USING btree (resource_type);
 
@@ -1,25 +1,61 @@
 import uuid
+import json
+import asyncio
+import anyio
 from datetime import datetime
-import requests
 import ast
-from aiohttp import BasicAuth
+from aiohttp import BasicAuth, ClientError, ClientSession, ClientTimeout, TCPConnector
 from urllib.parse import urljoin
 from core.logger import get_configured_logger
 from core.settings import settings
 from schemas.exceptions.base import ResourceNotFoundException
+from utils.concurrency import gather_bounded
 
-class AirflowRestClient(requests.Session):
-    def __init__(self, *args, **kwargs):
-        super(AirflowRestClient, self).__init__(*args, **kwargs)
+# Responses worth retrying: rate limiting and transient server/proxy errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Only requests that are safe to repeat are retried; a retried dag run POST could start the run twice
+RETRY_METHODS = {'GET', 'HEAD', 'PATCH', 'DELETE'}
 
+
+class AirflowResponse(object):
+    """
+    Status and body of an Airflow API response, read fully before its connection is returned to the pool
+    """
+    def __init__(self, status_code: int, content: bytes, headers: dict):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class AirflowRestClient(object):
+    # aiohttp session shared by every client instance, opened in the app lifespan
+    _async_session = None
+
+    def __init__(self):
         self.base_url = settings.AIRFLOW_WEBSERVER_HOST
-        self.auth = (settings.AIRFLOW_ADMIN_CREDENTIALS.get('username'), settings.AIRFLOW_ADMIN_CREDENTIALS.get('password'))
+        self.auth = BasicAuth(settings.AIRFLOW_ADMIN_CREDENTIALS.get('username'), settings.AIRFLOW_ADMIN_CREDENTIALS.get('password'))
         self.logger = get_configured_logger(self.__class__.__name__)
 
         self.max_page_size = 100
         self.min_page_size = 1
         self.min_page = 0
 
+        self.max_retries = settings.AIRFLOW_REQUEST_RETRIES
+        self.retry_backoff = settings.AIRFLOW_RETRY_BACKOFF_SECONDS
+        self.fan_out_limit = settings.AIRFLOW_FAN_OUT_LIMIT
+        # Overrides the session timeout for endpoints returning task payloads; connecting is still bounded
+        self.payload_timeout = ClientTimeout(
+            total=settings.AIRFLOW_PAYLOAD_TIMEOUT_SECONDS,
+            sock_connect=settings.AIRFLOW_REQUEST_TIMEOUT_SECONDS
+        )
+
 
     def _validate_pagination_params(self, page, page_size):
         page = max(page, self.min_page)
@@ -27,93 +63,128 @@ class AirflowRestClient(requests.Session):
 
         return page, page_size
 
+    @classmethod
+    def open_async_session(cls) -> ClientSession:
+        """
+        Long-lived pooled session for every Airflow request, with keep-alive connections
+        """
+        if cls._async_session is None or cls._async_session.closed:
+            cls._async_session = ClientSession(
+                connector=TCPConnector(
+                    limit=settings.AIRFLOW_MAX_CONNECTIONS,
+                    keepalive_timeout=settings.AIRFLOW_KEEPALIVE_SECONDS
+                ),
+                timeout=ClientTimeout(total=settings.AIRFLOW_REQUEST_TIMEOUT_SECONDS),
+            )
+        return cls._async_session
 
-    def request(self, method, resource, **kwargs):
-        try:
-            url = urljoin(self.base_url, resource)
-            return super(AirflowRestClient, self).request(method, url, **kwargs)
-        except Exception as e:
-            self.logger.exception(e)
-            raise e
+    @classmethod
+    async def close_async_session(cls):
+        if cls._async_session is not None and not cls._async_session.closed:
+            await cls._async_session.close()
+        cls._async_session = None
 
-    async def _request_async(self, session, method, resource, **kwargs):
+    async def request(self, method, resource, **kwargs) -> AirflowResponse:
+        """
+        Request method, retried with exponential backoff on timeouts, connection errors and RETRY_STATUSES
+        when the method is safe to repeat
+        """
+        session = self.open_async_session()
+        url = urljoin(self.base_url, resource)
+        attempts = self.max_retries + 1 if method.upper() in RETRY_METHODS else 1
+        for attempt in range(attempts):
+            last_attempt = attempt == attempts - 1
+            try:
+                async with session.request(method, url, auth=self.auth, **kwargs) as response:
+                    content = await response.read()
+                    if response.status not in RETRY_STATUSES or last_attempt:
+                        return AirflowResponse(response.status, content, dict(response.headers))
+            except (ClientError, asyncio.TimeoutError) as e:
+                if last_attempt:
+                    self.logger.exception(f'API {method} Request error. Url: {resource}. Params {kwargs}')
+                    raise e
+            await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+
+    async def _request_async(self, method, resource, **kwargs):
         """
         Request method
-        Args:
-            session (aiohttp.ClientSession): aiohttp session instance
         Returns:
-            data (dict): data returned by the API
+            data (dict): data returned by the API, None if the request failed
         """
         try:
-            url = urljoin(self.base_url, resource)
-            auth = BasicAuth(*self.auth)
-            response = await session.request(method, url, auth=auth, **kwargs)
-            response.raise_for_status()
+            response = await self.request(method, resource, **kwargs)
         except Exception:
-            self.logger.exception(f'API {method} Request error. Url: {resource}. Params {kwargs}')
+            # Already logged by request
             return None
+        if response.status_code >= 400:
+            self.logger.error(f'API {method} Request error {response.status_code}. Url: {resource}. Params {kwargs}')
+            return None
+        return response.json()
 
-        data = await response.json()
-        return data
-
-    def run_dag(self, dag_id):
+    async def run_dag(self, dag_id):
         resource = f"api/v1/dags/{dag_id}/dagRuns"
         dag_run_uuid = str(uuid.uuid4())
         payload = {
             "dag_run_id": f"rest-client-{dag_run_uuid}",
             "logical_date": datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
         }
-        response = self.request(
+        response = await self.request(
             method="post",
             resource=resource,
             json=payload
         )
         return response
 
-    def delete_dag(self, dag_id):
+    async def delete_dag(self, dag_id):
         resource = f"api/v1/dags/{dag_id}"
-        response = self.request(
+        response = await self.request(
             method="delete",
             resource=resource,
         )
         return response
 
-    def update_dag(self, dag_id, payload):
+    async def update_dag(self, dag_id, payload):
         resource = f"api/v1/dags/{dag_id}"
-        response = self.request(
+        response = await self.request(
             method='patch',
             resource=resource,
             json=payload
         )
         return response
 
-    def get_dag_by_id(self, dag_id):
+    async def get_dag_by_id(self, dag_id):
         resource = f"api/v1/dags/{dag_id}"
-        response = self.request(
+        response = await self.request(
             method='get',
             resource=resource,
         )
         return response
 
-    async def get_dag_by_id_async(self, session, dag_id):
+    async def get_dag_by_id_async(self, dag_id):
         resource = f"api/v1/dags/{dag_id}"
-        response = await self._request_async(session, 'GET', resource)
+        response = await self._request_async('GET', resource)
         return {
             'dag_id': dag_id,
             'response': response
         }
 
-    def get_all_dag_tasks(self, dag_id):
+    async def get_dags_by_id_async(self, dag_ids):
+        """
+        Fetch many dags, at most fan_out_limit requests at a time
+        """
+        return await gather_bounded(self.get_dag_by_id_async, dag_ids, limit=self.fan_out_limit)
+
+    async def get_all_dag_tasks(self, dag_id):
         resource = f"api/v1/dags/{dag_id}/tasks"
-        response = self.request(
+        response = await self.request(
             method='get',
             resource=resource,
         )
         return response
 
-    def list_import_errors(self, limit: int = 100, offset: int = 0):
+    async def list_import_errors(self, limit: int = 100, offset: int = 0):
         resource = "api/v1/importErrors"
-        response = self.request(
+        response = await self.request(
             method='get',
             resource=resource,
             params={
@@ -123,53 +194,63 @@ class AirflowRestClient(requests.Session):
         )
         return response
 
-    def get_all_workflow_runs(self, dag_id: str, page: int, page_size: int, descending: bool = False):
+    async def get_all_workflow_runs(self, dag_id: str, page: int, page_size: int, descending: bool = False):
         page, page_size = self._validate_pagination_params(page, page_size)
         offset = page * page_size
         order_by = "-execution_date" if descending else "execution_date"
         resource = f"api/v1/dags/{dag_id}/dagRuns?limit={page_size}&offset={offset}&order_by={order_by}"
-        response = self.request(
+        response = await self.request(
             method='get',
             resource=resource,
         )
         return response
 
-    def get_all_run_tasks_instances(self, dag_id: str, dag_run_id: str, page: int, page_size: int):
+    async def get_dag_run(self, dag_id: str, dag_run_id: str):
+        resource = f"api/v1/dags/{dag_id}/dagRuns/{dag_run_id}"
+        response = await self.request(
+            method='get',
+            resource=resource,
+        )
+        return response
+
+    async def get_all_run_tasks_instances(self, dag_id: str, dag_run_id: str, page: int, page_size: int):
         page, page_size = self._validate_pagination_params(page, page_size)
         offset = page * page_size
         resource = f"api/v1/dags/{dag_id}/dagRuns/{dag_run_id}/taskInstances?limit={page_size}&offset={offset}"
-        response = self.request(
+        response = await self.request(
             method='get',
             resource=resource,
         )
         return response
 
-    def get_task_logs(self, dag_id: str, dag_run_id: str, task_id: str, task_try_number: int):
+    async def get_task_logs(self, dag_id: str, dag_run_id: str, task_id: str, task_try_number: int):
         resource = f"/api/v1/dags/{dag_id}/dagRuns/{dag_run_id}/taskInstances/{task_id}/logs/{task_try_number}"
-        response = self.request(
+        response = await self.request(
             method='get',
             resource=resource,
+            timeout=self.payload_timeout,
         )
         if response.status_code == 404:
             raise ResourceNotFoundException("Task result not found.")
         return response
 
-    def get_task_result(self, dag_id: str, dag_run_id: str, task_id: str, task_try_number: int):
+    async def get_task_result(self, dag_id: str, dag_run_id: str, task_id: str, task_try_number: int):
         # ref: https://airflow.apache.org/docs/apache-airflow/stable/stable-rest-api-ref.html#operation/get_xcom_entries
         resource = f"/api/v1/dags/{dag_id}/dagRuns/{dag_run_id}/taskInstances/{task_id}/xcomEntries/return_value"
-        response = self.request(
+        response = await self.request(
             method='get',
             resource=resource,
+            timeout=self.payload_timeout,
         )
         if response.status_code == 404:
             raise ResourceNotFoundException("Task result not found.")
         if response.status_code != 200:
             raise BaseException("Error while trying to get task result base64_content")
-        response_dict =  ast.literal_eval(response.json()["value"])
+        # XCom payloads can be large; parse them in a worker thread to keep the event loop free
+        response_dict = await anyio.to_thread.run_sync(lambda: ast.literal_eval(response.json()["value"]))
         # Get base64_content and file_type
         result_dict = dict()
         if "display_result" in response_dict:
             result_dict["base64_content"] = response_dict["display_result"].get("base64_content", None)
             result_dict["file_type"] = response_dict["display_result"].get("file_type", None)
         return result_dict
-
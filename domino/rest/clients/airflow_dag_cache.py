@@ -0,0 +1,163 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from clients.airflow_client import AirflowRestClient
+from core.logger import get_configured_logger
+from core.settings import settings
+from schemas.exceptions.base import BaseException
+from utils.concurrency import gather_bounded
+
+
+@dataclass
+class DagStateSnapshot:
+    dags: dict = field(default_factory=dict)
+    import_error_dag_ids: set = field(default_factory=set)
+    refreshed_at: float = 0.0
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.refreshed_at
+
+
+class AirflowDagStateCache(object):
+    """
+    In-memory snapshot of every Airflow DAG and import error, shared by all requests.
+
+    The snapshot is rebuilt from the paginated /dags and /importErrors listings,
+    by a background task started in the app lifespan and on demand when a
+    reader finds it older than the TTL.
+    """
+    def __init__(self, ttl: float = None, refresh_interval: float = None):
+        self.airflow_client = AirflowRestClient()
+        self.ttl = ttl if ttl is not None else settings.AIRFLOW_DAG_CACHE_TTL_SECONDS
+        self.refresh_interval = refresh_interval if refresh_interval is not None else settings.AIRFLOW_DAG_CACHE_REFRESH_SECONDS
+        self.page_size = 100
+        self.logger = get_configured_logger(self.__class__.__name__)
+
+        self._snapshot = None
+        self._refresh_lock = None
+        self._refresh_task = None
+        # Set while refreshes keep failing, so an outage is logged once
+        self._outage = False
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.last_refresh_duration = None
+
+    async def start(self):
+        self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                self._log_refresh_failure('Background refresh of Airflow DAG states failed')
+            await asyncio.sleep(self.refresh_interval)
+
+    def _log_refresh_failure(self, message: str):
+        """
+        Log the first failure of an outage with its traceback; further failures
+        until a refresh succeeds are logged at debug level.
+        """
+        if self._outage:
+            self.logger.debug(message, exc_info=True)
+            return
+        self._outage = True
+        self.logger.exception(f'{message}; repeated failures are logged at debug level until Airflow recovers')
+
+    async def _get_page(self, resource: str, params: dict, offset: int) -> dict:
+        content = await self.airflow_client._request_async(
+            'GET', resource, params={**params, 'limit': self.page_size, 'offset': offset}
+        )
+        if content is None:
+            raise BaseException(f"Error when trying to fetch {resource} from airflow webserver.")
+        return content
+
+    async def _list_all(self, resource: str, key: str, params: dict = None):
+        """Read every page of an Airflow collection endpoint; pages after the first are fetched concurrently."""
+        params = params or {}
+        first_page = await self._get_page(resource, params, 0)
+        offsets = range(self.page_size, first_page['total_entries'], self.page_size)
+        pages = await gather_bounded(
+            lambda offset: self._get_page(resource, params, offset),
+            offsets,
+            limit=self.airflow_client.fan_out_limit
+        )
+        return [item for page in [first_page, *pages] for item in page[key]]
+
+    async def refresh(self) -> DagStateSnapshot:
+        started_at = time.monotonic()
+        try:
+            dags, import_errors = await asyncio.gather(
+                self._list_all('api/v1/dags', 'dags', params={'only_active': 'false'}),
+                self._list_all('api/v1/importErrors', 'import_errors')
+            )
+        except Exception:
+            self.refresh_errors += 1
+            raise
+
+        self._snapshot = DagStateSnapshot(
+            dags={dag['dag_id']: dag for dag in dags},
+            import_error_dag_ids={e.get('filename').split('dags/')[1].split('.py')[0] for e in import_errors},
+            refreshed_at=time.monotonic()
+        )
+        self.refreshes += 1
+        if self._outage:
+            self._outage = False
+            self.logger.info('Airflow DAG states refreshed again after failed refreshes')
+        self.last_refresh_duration = self._snapshot.refreshed_at - started_at
+        return self._snapshot
+
+    async def get_snapshot(self) -> DagStateSnapshot:
+        """
+        Current snapshot, refreshed first if it is older than the TTL. If that
+        refresh fails the previous snapshot is served rather than failing the request.
+        """
+        if self._snapshot and self._snapshot.age <= self.ttl:
+            self.hits += 1
+            return self._snapshot
+
+        self.misses += 1
+        if self._refresh_lock is None:
+            self._refresh_lock = asyncio.Lock()
+        async with self._refresh_lock:
+            # Another request may have refreshed while this one waited
+            if self._snapshot and self._snapshot.age <= self.ttl:
+                return self._snapshot
+            try:
+                return await self.refresh()
+            except Exception:
+                self._log_refresh_failure('Error when trying to refresh Airflow DAG states')
+                if self._snapshot:
+                    return self._snapshot
+                raise BaseException("Error when trying to fetch dags from airflow webserver.")
+
+    def metrics(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else None,
+            'refreshes': self.refreshes,
+            'refresh_errors': self.refresh_errors,
+            'last_refresh_duration_seconds': self.last_refresh_duration,
+            'staleness_seconds': self._snapshot.age if self._snapshot else None,
+            'ttl_seconds': self.ttl,
+            'dags': len(self._snapshot.dags) if self._snapshot else 0,
+        }
+
+
+dag_state_cache = AirflowDagStateCache()
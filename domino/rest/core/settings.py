@@ -85,6 +85,26 @@ class Settings(BaseSettings):
     }
     AIRFLOW_WEBSERVER_HOST: str = os.environ.get('AIRFLOW_WEBSERVER_HOST', "http://airflow-webserver:8080/")
 
+    # Airflow requests: connection pool, keep-alive, per-request timeout, retries and fan-out concurrency
+    AIRFLOW_MAX_CONNECTIONS: int = int(os.environ.get('AIRFLOW_MAX_CONNECTIONS', 20))
+    AIRFLOW_KEEPALIVE_SECONDS: float = float(os.environ.get('AIRFLOW_KEEPALIVE_SECONDS', 30))
+    AIRFLOW_REQUEST_TIMEOUT_SECONDS: float = float(os.environ.get('AIRFLOW_REQUEST_TIMEOUT_SECONDS', 10))
+    # Task results (XCom) and logs can be large, so their requests get a longer total timeout
+    AIRFLOW_PAYLOAD_TIMEOUT_SECONDS: float = float(os.environ.get('AIRFLOW_PAYLOAD_TIMEOUT_SECONDS', 300))
+    AIRFLOW_REQUEST_RETRIES: int = int(os.environ.get('AIRFLOW_REQUEST_RETRIES', 2))
+    AIRFLOW_RETRY_BACKOFF_SECONDS: float = float(os.environ.get('AIRFLOW_RETRY_BACKOFF_SECONDS', 0.5))
+    AIRFLOW_FAN_OUT_LIMIT: int = int(os.environ.get('AIRFLOW_FAN_OUT_LIMIT', 10))
+
+    # Shared DAG state snapshot used to list workflows
+    AIRFLOW_DAG_CACHE_TTL_SECONDS: float = float(os.environ.get('AIRFLOW_DAG_CACHE_TTL_SECONDS', 30))
+    AIRFLOW_DAG_CACHE_REFRESH_SECONDS: float = float(os.environ.get('AIRFLOW_DAG_CACHE_REFRESH_SECONDS', 10))
+
+    # Workflow run reports: concurrent task result fetches, and number of finished runs and total
+    # bytes of their base64 payloads kept in memory (per worker process)
+    REPORT_FETCH_CONCURRENCY: int = int(os.environ.get('REPORT_FETCH_CONCURRENCY', 8))
+    REPORT_CACHE_MAX_RUNS: int = int(os.environ.get('REPORT_CACHE_MAX_RUNS', 64))
+    REPORT_CACHE_MAX_BYTES: int = int(os.environ.get('REPORT_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
     # Default repositories
     DEFAULT_STORAGE_REPOSITORY: dict = dict(
         name="default_storage_repository",
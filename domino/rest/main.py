@@ -12,6 +12,8 @@ from routers.secret_router import router as secret_router
 from routers.health_check_router import router as health_check_router
 from core.settings import settings
 from utils.populate_first_user import populate_first_user
+from clients.airflow_client import AirflowRestClient
+from clients.airflow_dag_cache import dag_state_cache
 from contextlib import asynccontextmanager
 
 
@@ -24,7 +26,11 @@ Documentation for Domino API
 async def lifespan(app: FastAPI):
     if settings.CREATE_DEFAULT_USER:
         await populate_first_user()
+    AirflowRestClient.open_async_session()
+    await dag_state_cache.start()
     yield
+    await dag_state_cache.stop()
+    await AirflowRestClient.close_async_session()
 
 def configure_app():
     app = FastAPI(
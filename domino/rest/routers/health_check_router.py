@@ -1,7 +1,12 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, status, Depends
+from clients.airflow_dag_cache import dag_state_cache
+from auth.permission_authorizer import Authorizer
+from schemas.errors.base import UnauthorizedError
 
 router = APIRouter(prefix="/health-check")
 
+authorizer = Authorizer()
+
 
 @router.get(
     path="",
@@ -12,4 +17,19 @@ def health_check():
         response = {"status": "ok"}
         return response
     except (BaseException) as e:
-        raise HTTPException(status_code=e.status_code, detail=e.message)
\ No newline at end of file
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+
+@router.get(
+    path="/airflow-dag-cache",
+    status_code=200,
+    responses={
+        status.HTTP_401_UNAUTHORIZED: {"model": UnauthorizedError},
+    },
+    dependencies=[Depends(authorizer.auth_wrapper)]
+)
+def airflow_dag_cache_metrics():
+    """
+    Hit ratio and staleness of the shared Airflow DAG state snapshot.
+    Unlike the liveness check above, this requires an authenticated user.
+    """
+    return dag_state_cache.metrics()
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, HTTPException, status, Depends, Response
+from fastapi.responses import StreamingResponse
 from schemas.context.auth_context import AuthorizationContextData
 from typing import List
 from services.workflow_service import WorkflowService
@@ -103,14 +104,14 @@ async def list_workflows(
     },
     status_code=200,
 )
-def get_workflow(
+async def get_workflow(
     workspace_id: int,
     workflow_id: int,
     auth_context: AuthorizationContextData = Depends(read_authorizer.authorize)
 ) -> GetWorkflowResponse:
     """Get a workflow information"""
     try:
-        return workflow_service.get_workflow(
+        return await workflow_service.get_workflow(
             workspace_id=workspace_id,
             workflow_id=workflow_id,
             auth_context=auth_context
@@ -154,13 +155,13 @@ async def delete_workflow(
         status.HTTP_404_NOT_FOUND: {"model": ResourceNotFoundError}
     }
 )
-def run_workflow(
+async def run_workflow(
     workspace_id: int,
     workflow_id: int,
     auth_context: AuthorizationContextData = Depends(write_authorizer.authorize)
 ):
     try:
-        return workflow_service.run_workflow(
+        return await workflow_service.run_workflow(
             workflow_id=workflow_id
         )
     except (BaseException, ForbiddenException, ResourceNotFoundException, ConflictException) as e:
@@ -176,7 +177,7 @@ def run_workflow(
         status.HTTP_404_NOT_FOUND: {"model": ResourceNotFoundError}
     }
 )
-def list_workflow_runs(
+async def list_workflow_runs(
     workspace_id: int,
     workflow_id: int,
     page: int = 0,
@@ -184,7 +185,7 @@ def list_workflow_runs(
     auth_context: AuthorizationContextData = Depends(read_authorizer.authorize)
 ) -> GetWorkflowRunsResponse:
     try:
-        return workflow_service.list_workflow_runs(
+        return await workflow_service.list_workflow_runs(
             workflow_id=workflow_id,
             page=page,
             page_size=page_size
@@ -202,7 +203,7 @@ def list_workflow_runs(
         status.HTTP_404_NOT_FOUND: {"model": ResourceNotFoundError}
     }
 )
-def list_run_tasks(
+async def list_run_tasks(
     workspace_id: int,
     workflow_id: int,
     workflow_run_id: str,
@@ -211,7 +212,7 @@ def list_run_tasks(
     auth_context: AuthorizationContextData = Depends(read_authorizer.authorize)
 ) -> GetWorkflowRunTasksResponse:
     try:
-        return workflow_service.list_run_tasks(
+        return await workflow_service.list_run_tasks(
             workflow_id=workflow_id,
             workflow_run_id=workflow_run_id,
             page=page,
@@ -230,20 +231,50 @@ def list_run_tasks(
         status.HTTP_404_NOT_FOUND: {"model": ResourceNotFoundError}
     }
 )
-def generate_report(
+async def generate_report(
     workspace_id: int,
     workflow_id: int,
     workflow_run_id: str,
     auth_context: AuthorizationContextData = Depends(read_authorizer.authorize)
 ) -> GetWorkflowResultReportResponse:
     try:
-        return workflow_service.generate_report(
+        return await workflow_service.generate_report(
             workflow_id=workflow_id,
             workflow_run_id=workflow_run_id,
         )
     except (BaseException, ForbiddenException, ResourceNotFoundException) as e:
         raise HTTPException(status_code=e.status_code, detail=e.message)
 
+@router.get(
+    "/{workflow_id}/runs/{workflow_run_id}/tasks/report/stream",
+    status_code=200,
+    response_class=StreamingResponse,
+    responses={
+        status.HTTP_200_OK: {"content": {"application/x-ndjson": {}}},
+        status.HTTP_500_INTERNAL_SERVER_ERROR: {"model": SomethingWrongError},
+        status.HTTP_403_FORBIDDEN: {"model": ForbiddenError},
+        status.HTTP_404_NOT_FOUND: {"model": ResourceNotFoundError}
+    }
+)
+async def stream_report(
+    workspace_id: int,
+    workflow_id: int,
+    workflow_run_id: str,
+    auth_context: AuthorizationContextData = Depends(read_authorizer.authorize)
+):
+    """
+    Stream the workflow run report as NDJSON, one task per line in end date order.
+    Lines carry no base64 content; fetch it from the task result content endpoint.
+    """
+    try:
+        lines = await workflow_service.stream_report(
+            workflow_id=workflow_id,
+            workflow_run_id=workflow_run_id,
+        )
+        return StreamingResponse(lines, media_type="application/x-ndjson")
+    except (BaseException, ForbiddenException, ResourceNotFoundException) as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+
 @router.get(
     "/{workflow_id}/runs/{workflow_run_id}/tasks/{task_id}/{task_try_number}/logs",
     status_code=200,
@@ -254,7 +285,7 @@ def generate_report(
         status.HTTP_404_NOT_FOUND: {"model": ResourceNotFoundError}
     }
 )
-def get_task_logs(
+async def get_task_logs(
     workspace_id: int,
     workflow_id: int,
     workflow_run_id: str,
@@ -267,7 +298,7 @@ def get_task_logs(
     Get workflow run task parsed logs lines.
     """
     try:
-        return workflow_service.get_task_logs(
+        return await workflow_service.get_task_logs(
             workflow_id=workflow_id,
             workflow_run_id=workflow_run_id,
             task_id=task_id,
@@ -287,7 +318,7 @@ def get_task_logs(
         status.HTTP_404_NOT_FOUND: {"model": ResourceNotFoundError}
     }
 )
-def get_task_result(
+async def get_task_result(
     workspace_id: int,
     workflow_id: int,
     workflow_run_id: str,
@@ -300,11 +331,46 @@ def get_task_result(
     Get workflow run task parsed logs lines.
     """
     try:
-        return workflow_service.get_task_result(
+        return await workflow_service.get_task_result(
             workflow_id=workflow_id,
             workflow_run_id=workflow_run_id,
             task_id=task_id,
             task_try_number=task_try_number
         )
     except (BaseException, ForbiddenException, ResourceNotFoundException) as e:
-        raise HTTPException(status_code=e.status_code, detail=e.message)
\ No newline at end of file
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+
+
+@router.get(
+    "/{workflow_id}/runs/{workflow_run_id}/tasks/{task_id}/{task_try_number}/result/content",
+    status_code=200,
+    response_class=Response,
+    responses={
+        status.HTTP_200_OK: {"content": {"application/octet-stream": {}}},
+        status.HTTP_500_INTERNAL_SERVER_ERROR: {"model": SomethingWrongError},
+        status.HTTP_403_FORBIDDEN: {"model": ForbiddenError},
+        status.HTTP_404_NOT_FOUND: {"model": ResourceNotFoundError}
+    }
+)
+async def get_task_result_content(
+    workspace_id: int,
+    workflow_id: int,
+    workflow_run_id: str,
+    task_id: str,
+    task_try_number: int,
+    auth_context: AuthorizationContextData = Depends(read_authorizer.authorize)
+):
+    """
+    Get workflow run task display result as decoded bytes, with its content type.
+    HTML and SVG results are sent as sandboxed attachments, never rendered inline.
+    """
+    try:
+        content, media_type, headers = await workflow_service.get_task_result_content(
+            workflow_id=workflow_id,
+            workflow_run_id=workflow_run_id,
+            task_id=task_id,
+            task_try_number=task_try_number
+        )
+        return Response(content=content, media_type=media_type, headers=headers)
+    except (BaseException, ForbiddenException, ResourceNotFoundException) as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
@@ -214,11 +214,26 @@ class GetWorkflowResultReport(BaseModel):
     end_date: Optional[datetime] = None
     execution_date: Optional[datetime] = None
     task_id: str
+    try_number: Optional[int] = None
     state: Optional[WorkflowRunTaskState] = None
 
 class GetWorkflowResultReportResponse(BaseModel):
     data: List[GetWorkflowResultReport]
 
+class GetWorkflowResultReportStreamItem(BaseModel):
+    """Report item without its payload, which is served by the task result content endpoint"""
+    file_type: Optional[str] = None
+    has_content: bool = False
+    piece_name: Optional[str] = None
+    dag_id: str
+    duration: Optional[float] = None
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+    execution_date: Optional[datetime] = None
+    task_id: str
+    try_number: Optional[int] = None
+    state: Optional[WorkflowRunTaskState] = None
+
 class GetWorkflowRunTaskLogsResponse(BaseModel):
     data: List[str]
 
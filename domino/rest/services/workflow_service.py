@@ -1,10 +1,12 @@
 import re
 from math import ceil
-from aiohttp import ClientSession
 import asyncio
+import anyio
+from functools import partial
 from copy import deepcopy
 from uuid import uuid4
 import io
+import base64
 from datetime import datetime, timezone
 from repository.piece_repository import PieceRepository
 from schemas.context.auth_context import AuthorizationContextData
@@ -24,14 +26,18 @@ from schemas.responses.workflow import (
     GetWorkflowRunTasksResponseData,
     GetWorkflowRunTasksResponse,
     GetWorkflowResultReportResponse,
+    GetWorkflowResultReport,
+    GetWorkflowResultReportStreamItem,
     GetWorkflowRunTaskLogsResponse,
     GetWorkflowRunTaskResultResponse,
-    WorkflowStatus
+    WorkflowStatus,
+    WorkflowRunState
 )
 from schemas.responses.base import PaginationSet
 from schemas.exceptions.base import ConflictException, ForbiddenException, ResourceNotFoundException, BadRequestException
 from repository.workflow_repository import WorkflowRepository
 from clients.airflow_client import AirflowRestClient
+from clients.airflow_dag_cache import dag_state_cache
 from clients.local_files_client import LocalFilesClient
 from clients.github_rest_client import GithubRestClient
 from database.models import Workflow, WorkflowPieceRepositoryAssociative
@@ -39,9 +45,50 @@ from repository.piece_repository_repository import PieceRepositoryRepository
 from repository.workflow_repository import WorkflowRepository
 from repository.secret_repository import SecretRepository
 from services.secret_service import SecretService
+from utils.concurrency import gather_bounded, iter_bounded
+from utils.lru_cache import LRUCache
+
+
+# Runs in these states never change again, so their reports can be cached
+TERMINAL_RUN_STATES = {WorkflowRunState.success.value, WorkflowRunState.failed.value}
+
+# Content types of the display result file types produced by pieces.
+# The response appends "; charset=utf-8" to text/* types itself
+DISPLAY_RESULT_MEDIA_TYPES = {
+    "png": "image/png",
+    "jpeg": "image/jpeg",
+    "bmp": "image/bmp",
+    "gif": "image/gif",
+    "tiff": "image/tiff",
+    "svg": "image/svg+xml",
+    "txt": "text/plain",
+    "json": "application/json",
+    "md": "text/markdown",
+    "pdf": "application/pdf",
+    "html": "text/html",
+    "plotly_json": "application/json",
+}
+# Piece output is not controlled by the API, so file types a browser would run scripts from
+# are served as sandboxed downloads instead of being rendered inline on the API origin
+ACTIVE_RESULT_FILE_TYPES = {"html", "svg"}
+
+
+def report_payload_bytes(report: GetWorkflowResultReportResponse) -> int:
+    """
+    Size of a cached report, counted as its base64 payloads, which dwarf the rest of each item
+    """
+    return sum(len(item.base64_content or "") for item in report.data)
 
 
 class WorkflowService(object):
+    # Reports of finished runs keyed by (dag_id, dag_run_id), shared by all service instances.
+    # Bounded by payload bytes too, since a single run's results can be hundreds of MB
+    report_cache = LRUCache(
+        max_size=settings.REPORT_CACHE_MAX_RUNS,
+        max_bytes=settings.REPORT_CACHE_MAX_BYTES,
+        sizeof=report_payload_bytes
+    )
+
     def __init__(self) -> None:
         # Clients
         self.file_system_client = LocalFilesClient()
@@ -137,16 +184,21 @@ class WorkflowService(object):
             )
             return response
         except (BaseException, ConflictException, ForbiddenException, ResourceNotFoundException) as custom_exception:
-            asyncio.run(self.delete_workflow(workflow_id=workflow.id, workspace_id=workspace_id))
+            # Sync route running in a worker thread: clean up on the app event loop, where the Airflow session lives
+            anyio.from_thread.run(partial(self.delete_workflow, workflow_id=workflow.id, workspace_id=workspace_id))
             raise custom_exception
 
+    async def _find_workflow(self, workflow_id):
+        """
+        The repositories are synchronous, so async methods query them from a worker thread
+        """
+        return await anyio.to_thread.run_sync(partial(self.workflow_repository.find_by_id, id=workflow_id))
+
     async def get_airflow_dags_by_id_gather_chunk(self, dag_ids):
         """
-        Creates a session, create run_program list by each dag_id and call asyncio gather
+        Fetch each dag_id through the shared Airflow session with bounded concurrency
         """
-        async with ClientSession() as session:
-            res = await asyncio.gather(*[self.airflow_client.get_dag_by_id_async(session, dag_id) for dag_id in dag_ids])
-        return res
+        return await self.airflow_client.get_dags_by_id_async(dag_ids)
 
     async def list_workflows(
         self,
@@ -155,42 +207,35 @@ class WorkflowService(object):
         page_size: int,
         filters: ListWorkflowsFilters,
     ):
-        workflows = self.workflow_repository.find_by_workspace_id(
+        workflows = await anyio.to_thread.run_sync(partial(
+            self.workflow_repository.find_by_workspace_id,
             workspace_id=workspace_id,
             page=page,
             page_size=page_size,
             filters=filters.model_dump(exclude_none=True),
             descending=True
-        )
-
-        workflow_uuid_map = {
-            workflow.uuid_name: workflow
-            for workflow, _ in workflows
-        }
-
-        # TODO - Create chunks of N dag_ids if necessary
-        airflow_dags_responses = await self.get_airflow_dags_by_id_gather_chunk(list(workflow_uuid_map.keys()))
-
-        max_total_errors_limit = 100
-        import_errors_response = self.airflow_client.list_import_errors(limit=max_total_errors_limit)
-        if import_errors_response.status_code != 200:
-            raise BaseException("Error when trying to fetch import errors from airflow webserver.")
+        ))
 
-        import_errors_response_content = import_errors_response.json()
-        if import_errors_response_content['total_entries'] >= max_total_errors_limit:
-            # TODO handle to many import errors
-            raise BaseException("To many import errors in airflow webserver.")
+        # DAG states come from the shared snapshot instead of one Airflow request per workflow
+        snapshot = await dag_state_cache.get_snapshot()
 
-        import_errors_uuids = [e.get('filename').split('dags/')[1].split('.py')[0] for e in import_errors_response_content['import_errors']]
+        # Dags created after the snapshot was taken are fetched individually
+        missing_dag_ids = [
+            workflow.uuid_name for workflow, _ in workflows
+            if workflow.uuid_name not in snapshot.dags and workflow.uuid_name not in snapshot.import_error_dag_ids
+        ]
+        missing_dags = {
+            dag_info['dag_id']: dag_info['response']
+            for dag_info in await self.get_airflow_dags_by_id_gather_chunk(missing_dag_ids)
+        }
 
         # Add more info to model if necessary
         data = []
-        for dag_info in airflow_dags_responses:
-            dag_uuid = dag_info['dag_id']
-            dag_data = workflow_uuid_map[dag_uuid]
-            response = dag_info['response']
+        for dag_data, _ in workflows:
+            dag_uuid = dag_data.uuid_name
+            response = snapshot.dags.get(dag_uuid) or missing_dags.get(dag_uuid)
 
-            is_dag_broken = dag_uuid in import_errors_uuids
+            is_dag_broken = dag_uuid in snapshot.import_error_dag_ids
 
             schedule = 'none'
             is_active = False
@@ -247,15 +292,15 @@ class WorkflowService(object):
 
         return response
 
-    def get_workflow(self, workspace_id: int, workflow_id: str, auth_context: AuthorizationContextData) -> GetWorkflowResponse:
-        workflow = self.workflow_repository.find_by_id(id=workflow_id)
+    async def get_workflow(self, workspace_id: int, workflow_id: str, auth_context: AuthorizationContextData) -> GetWorkflowResponse:
+        workflow = await self._find_workflow(workflow_id)
         if not workflow:
             raise ResourceNotFoundException()
 
         if workflow.workspace_id != workspace_id:
             raise ForbiddenException()
 
-        airflow_dag_info = self.airflow_client.get_dag_by_id(dag_id=workflow.uuid_name)
+        airflow_dag_info = await self.airflow_client.get_dag_by_id(dag_id=workflow.uuid_name)
 
         if airflow_dag_info.status_code == 404:
             airflow_dag_info = {
@@ -515,8 +560,8 @@ class WorkflowService(object):
             all_pieces.append(v["piece"])
         return list(dict.fromkeys(all_pieces))
 
-    def run_workflow(self, workflow_id: int):
-        workflow = self.workflow_repository.find_by_id(id=workflow_id)
+    async def run_workflow(self, workflow_id: int):
+        workflow = await self._find_workflow(workflow_id)
         if not workflow:
             raise ResourceNotFoundException("Workflow not found")
 
@@ -533,7 +578,7 @@ class WorkflowService(object):
         payload = {
             "is_paused": False
         }
-        update_response = self.airflow_client.update_dag(
+        update_response = await self.airflow_client.update_dag(
             dag_id=airflow_workflow_id,
             payload=payload
         )
@@ -545,7 +590,7 @@ class WorkflowService(object):
             self.logger.error(update_response.json())
             raise BaseException("Error while trying to run workflow")
 
-        run_dag_response = self.airflow_client.run_dag(dag_id=airflow_workflow_id)
+        run_dag_response = await self.airflow_client.run_dag(dag_id=airflow_workflow_id)
         if run_dag_response.status_code != 200:
             self.logger.error(f"Error while trying to run workflow {workflow_id}")
             self.logger.error(run_dag_response.json())
@@ -553,42 +598,49 @@ class WorkflowService(object):
 
     async def delete_workspace_workflows(self, workspace_id: int):
         # TODO: improve this? Maybe running in a worker and not in the main thread? Pagination may take a while if there are a lot of workflows.
-        workflows = self.workflow_repository.find_by_workspace_id(workspace_id=workspace_id, paginate=False, count=False)
+        workflows = await anyio.to_thread.run_sync(partial(
+            self.workflow_repository.find_by_workspace_id, workspace_id=workspace_id, paginate=False, count=False
+        ))
 
-        await asyncio.gather(*[self.delete_workflow_files(workflow_uuid=workflow.uuid_name) for workflow in workflows])
-        self.workflow_repository.delete_by_workspace_id(workspace_id=workspace_id)
+        # One at a time, as before: concurrent commits to the workflows repository would conflict
+        for workflow in workflows:
+            await self.delete_workflow_files(workflow_uuid=workflow.uuid_name)
+        await anyio.to_thread.run_sync(partial(self.workflow_repository.delete_by_workspace_id, workspace_id=workspace_id))
 
     async def delete_workflow_files(self, workflow_uuid):
+        # Both clients block, so they run in a worker thread
         if settings.DEPLOY_MODE == 'local-compose':
-            self.file_system_client.delete_file(
+            await anyio.to_thread.run_sync(partial(
+                self.file_system_client.delete_file,
                 path=f"{settings.DOMINO_LOCAL_WORKFLOWS_REPOSITORY}/{workflow_uuid}.py"
-            )
+            ))
             return
 
-        self.github_rest_client.delete_file(
+        await anyio.to_thread.run_sync(partial(
+            self.github_rest_client.delete_file,
             repo_name=settings.DOMINO_GITHUB_WORKFLOWS_REPOSITORY,
             file_path=f"workflows/{workflow_uuid}.py"
-        )
+        ))
 
     async def delete_workflow(self, workflow_id: str, workspace_id: int):
-        workflow = self.workflow_repository.find_by_id(id=workflow_id)
+        workflow = await self._find_workflow(workflow_id)
         if not workflow:
             raise ResourceNotFoundException("Workflow not found!")
         if workflow.workspace_id != workspace_id:
             raise ForbiddenException("Workflow does not belong to workspace!")
         try:
             await self.delete_workflow_files(workflow_uuid=workflow.uuid_name)
-            self.airflow_client.delete_dag(dag_id=workflow.uuid_name)
-            self.workflow_repository.delete(id=workflow_id)
+            await self.airflow_client.delete_dag(dag_id=workflow.uuid_name)
+            await anyio.to_thread.run_sync(partial(self.workflow_repository.delete, id=workflow_id))
         except Exception as e: # TODO improve exception handling
             self.logger.exception(e)
-            self.workflow_repository.delete(id=workflow_id)
+            await anyio.to_thread.run_sync(partial(self.workflow_repository.delete, id=workflow_id))
             raise e
 
-    def workflow_details(self, workflow_id: str):
+    async def workflow_details(self, workflow_id: str):
         try:
-            all_tasks_response = self.airflow_client.get_all_workflow_tasks(workflow_id=workflow_id).json()
-            all_workflow_runs = self.airflow_client.get_all_workflow_runs(workflow_id=workflow_id).json()
+            all_tasks_response = (await self.airflow_client.get_all_workflow_tasks(workflow_id=workflow_id)).json()
+            all_workflow_runs = (await self.airflow_client.get_all_workflow_runs(workflow_id=workflow_id)).json()
 
             response_payload = {
                 "n_tasks": all_tasks_response["total_entries"],
@@ -604,14 +656,14 @@ class WorkflowService(object):
             self.logger.exception(e)
             raise e
 
-    def list_workflow_runs(self, workflow_id: int, page: int, page_size: int):
-        workflow = self.workflow_repository.find_by_id(id=workflow_id)
+    async def list_workflow_runs(self, workflow_id: int, page: int, page_size: int):
+        workflow = await self._find_workflow(workflow_id)
         if not workflow:
             raise ResourceNotFoundException("Workflow not found")
 
         airflow_workflow_id = workflow.uuid_name
 
-        response = self.airflow_client.get_all_workflow_runs(
+        response = await self.airflow_client.get_all_workflow_runs(
             dag_id=airflow_workflow_id,
             page=page,
             page_size=page_size,
@@ -672,14 +724,14 @@ class WorkflowService(object):
         )
         return response
 
-    def list_run_tasks(self, workflow_id: int, workflow_run_id: str, page: int, page_size: int):
-        workflow = self.workflow_repository.find_by_id(id=workflow_id)
+    async def list_run_tasks(self, workflow_id: int, workflow_run_id: str, page: int, page_size: int):
+        workflow = await self._find_workflow(workflow_id)
         if not workflow:
             raise ResourceNotFoundException("Workflow not found")
 
         airflow_workflow_id = workflow.uuid_name
 
-        response = self.airflow_client.get_all_run_tasks_instances(
+        response = await self.airflow_client.get_all_run_tasks_instances(
             dag_id=airflow_workflow_id,
             dag_run_id=workflow_run_id,
             page=page,
@@ -718,76 +770,202 @@ class WorkflowService(object):
         )
         return response
 
-    def generate_report(self, workflow_id: int, workflow_run_id: str):
-        page_size = 100
-        page=0
-        workflow = self.workflow_repository.find_by_id(id=workflow_id)
-        if not workflow:
-            raise ResourceNotFoundException("Workflow not found")
-
-        airflow_workflow_id = workflow.uuid_name
-
-        response = self.airflow_client.get_all_run_tasks_instances(
-            dag_id=airflow_workflow_id,
-            dag_run_id=workflow_run_id,
-            page=page,
+    async def _list_all_run_tasks(self, dag_id: str, dag_run_id: str, page_size: int = 100):
+        """
+        All task instances of a run sorted by end_date; pages after the first are fetched concurrently
+        """
+        response = await self.airflow_client.get_all_run_tasks_instances(
+            dag_id=dag_id,
+            dag_run_id=dag_run_id,
+            page=0,
             page_size=page_size
         )
-
+        if response.status_code != 200:
+            raise BaseException("Error while trying to get workflow run tasks")
         response_data = response.json()
-
         if not response_data:
             return []
 
         total_tasks = response_data.get("total_entries")
         all_run_tasks = response_data["task_instances"]
-
-        while len(all_run_tasks) < total_tasks:
-            page+=1
-            response = self.airflow_client.get_all_run_tasks_instances(
-                dag_id=airflow_workflow_id,
-                dag_run_id=workflow_run_id,
+        responses = await gather_bounded(
+            lambda page: self.airflow_client.get_all_run_tasks_instances(
+                dag_id=dag_id,
+                dag_run_id=dag_run_id,
                 page=page,
                 page_size=page_size
-            )
+            ),
+            range(1, ceil(total_tasks / page_size)),
+            limit=settings.REPORT_FETCH_CONCURRENCY
+        )
+        for response in responses:
+            if response.status_code != 200:
+                raise BaseException("Error while trying to get workflow run tasks")
             all_run_tasks.extend(response.json().get("task_instances"))
 
-        sorted_all_run_tasks = sorted(all_run_tasks, key=lambda item: datetime.strptime(item["end_date"], "%Y-%m-%dT%H:%M:%S.%f%z"))
+        return sorted(all_run_tasks, key=lambda item: datetime.strptime(item["end_date"], "%Y-%m-%dT%H:%M:%S.%f%z"))
+
+    async def _get_task_report_item(self, workflow: Workflow, dag_run_id: str, task: dict):
+        """
+        Report item of a task, or None if it has no result.
+        The second value is False when the result could not be fetched, so the report must not be cached.
+        """
+        try:
+            task_result = await self.airflow_client.get_task_result(
+                dag_id=workflow.uuid_name,
+                dag_run_id=dag_run_id,
+                task_id=task["task_id"],
+                task_try_number=task["try_number"]
+            )
+        except asyncio.CancelledError:
+            raise
+        except ResourceNotFoundException as e:
+            self.logger.info(f"Skipping task {task['task_id']} due to exception: {e}")
+            return None, True
+        except BaseException as e:
+            # Handle the exception as needed
+            self.logger.info(f"Skipping task {task['task_id']} due to exception: {e}")
+            return None, False
+
+        node = workflow.ui_schema.get("nodes", {}).get(task["task_id"], {})
+        piece_name = node.get("data", {}).get("style", {}).get("label", None) or \
+                    node.get("data", {}).get("name", None)
+
+        item = dict(
+            base64_content=task_result.get("base64_content"),
+            file_type=task_result.get("file_type"),
+            piece_name=piece_name,
+            dag_id=task.get("dag_id"),
+            duration=task.get("duration"),
+            start_date=task.get("start_date"),
+            end_date=task.get("end_date"),
+            execution_date=task.get("execution_date"),
+            task_id=task.get("task_id"),
+            try_number=task.get("try_number"),
+            state=task.get("state"),
+        )
+        return item, True
+
+    async def _open_report_items(self, workflow: Workflow, workflow_run_id: str):
+        """
+        Async iterator over the report items of a run in end_date order.
+        Everything that can fail for the run as a whole (unknown run, Airflow errors) is raised here,
+        before the first item is requested, so callers can still answer with an error status.
+        """
+        airflow_workflow_id = workflow.uuid_name
+        cached_report = self.report_cache.get((airflow_workflow_id, workflow_run_id))
+        if cached_report is not None:
+            async def iter_cached_items():
+                for item in cached_report.data:
+                    yield item
+            return iter_cached_items()
+
+        # The run state is read before any task result, so a run seen as finished here
+        # had already finished when its results were fetched
+        dag_run_response = await self.airflow_client.get_dag_run(dag_id=airflow_workflow_id, dag_run_id=workflow_run_id)
+        if dag_run_response.status_code == 404:
+            raise ResourceNotFoundException("Workflow run not found")
+        if dag_run_response.status_code != 200:
+            raise BaseException("Error while trying to get workflow run")
+        is_run_finished = dag_run_response.json().get("state") in TERMINAL_RUN_STATES
+        sorted_all_run_tasks = await self._list_all_run_tasks(dag_id=airflow_workflow_id, dag_run_id=workflow_run_id)
+
+        return self._iter_report_items(workflow, workflow_run_id, sorted_all_run_tasks, cacheable=is_run_finished)
+
+    async def _iter_report_items(self, workflow: Workflow, workflow_run_id: str, tasks: list, cacheable: bool):
+        """
+        Yield the report items of the tasks, each as soon as its result is fetched.
+        Items are only kept while the report can still be cached: the run is finished and their
+        payloads fit in the cache. The report is cached once every item is yielded.
+        """
+        items = [] if cacheable else None
+        items_bytes = 0
+        is_report_complete = True
+        # iter_bounded keeps the end_date order of the tasks
+        async for item, complete in iter_bounded(
+            lambda task: self._get_task_report_item(workflow=workflow, dag_run_id=workflow_run_id, task=task),
+            tasks,
+            limit=settings.REPORT_FETCH_CONCURRENCY
+        ):
+            is_report_complete = is_report_complete and complete
+            if item is None:
+                continue
+            item = GetWorkflowResultReport(**item)
+            if items is not None:
+                items_bytes += len(item.base64_content or "")
+                if items_bytes <= settings.REPORT_CACHE_MAX_BYTES:
+                    items.append(item)
+                else:
+                    items = None
+            yield item
 
-        result_list = []
+        if items is not None and is_report_complete:
+            self.report_cache.set((workflow.uuid_name, workflow_run_id), GetWorkflowResultReportResponse(data=items))
 
-        for task in sorted_all_run_tasks:
-            try:
-                task_result = self.airflow_client.get_task_result(
-                    dag_id=airflow_workflow_id,
-                    dag_run_id=workflow_run_id,
-                    task_id=task["task_id"],
-                    task_try_number=task["try_number"]
-                )
+    async def generate_report(self, workflow_id: int, workflow_run_id: str):
+        workflow = await self._find_workflow(workflow_id)
+        if not workflow:
+            raise ResourceNotFoundException("Workflow not found")
 
-                node = workflow.ui_schema.get("nodes", {}).get(task["task_id"], {})
-                piece_name = node.get("data", {}).get("style", {}).get("label", None) or \
-                            node.get("data", {}).get("name", None)
-
-                result_list.append(
-                    dict(
-                        base64_content=task_result.get("base64_content"),
-                        file_type=task_result.get("file_type"),
-                        piece_name=piece_name,
-                        dag_id=task.get("dag_id"),
-                        duration=task.get("duration"),
-                        start_date=task.get("start_date"),
-                        end_date=task.get("end_date"),
-                        execution_date=task.get("execution_date"),
-                        task_id=task.get("task_id"),
-                        state=task.get("state"),
-                    )
+        report_items = await self._open_report_items(workflow=workflow, workflow_run_id=workflow_run_id)
+        items = [item async for item in report_items]
+        return GetWorkflowResultReportResponse(data=items)
+
+    async def stream_report(self, workflow_id: int, workflow_run_id: str):
+        """
+        NDJSON lines of the report items without their base64 payloads.
+        The workflow, run and task list are fetched before streaming starts so their errors still get a status code.
+        """
+        workflow = await self._find_workflow(workflow_id)
+        if not workflow:
+            raise ResourceNotFoundException("Workflow not found")
+
+        report_items = await self._open_report_items(workflow=workflow, workflow_run_id=workflow_run_id)
+
+        async def iter_lines():
+            async for item in report_items:
+                stream_item = GetWorkflowResultReportStreamItem(
+                    **item.model_dump(exclude={"base64_content"}),
+                    has_content=item.base64_content is not None
                 )
-            except BaseException as e:
-                # Handle the exception as needed
-                self.logger.info(f"Skipping task {task['task_id']} due to exception: {e}")
+                yield stream_item.model_dump_json() + "\n"
+
+        return iter_lines()
+
+    async def get_task_result_content(self, workflow_id: int, workflow_run_id: str, task_id: str, task_try_number: int):
+        """
+        Decoded display result of a task, its media type and the response headers to serve it with.
+        Served from the cached report when there is one.
+        """
+        workflow = await self._find_workflow(workflow_id)
+        if not workflow:
+            raise ResourceNotFoundException("Workflow not found")
 
-        return GetWorkflowResultReportResponse(data=result_list)
+        cached_report = self.report_cache.get((workflow.uuid_name, workflow_run_id))
+        cached_items = [
+            item for item in (cached_report.data if cached_report else [])
+            if item.task_id == task_id and item.try_number == task_try_number
+        ]
+        if cached_items:
+            result_dict = dict(base64_content=cached_items[0].base64_content, file_type=cached_items[0].file_type)
+        else:
+            result_dict = await self.airflow_client.get_task_result(
+                dag_id=workflow.uuid_name,
+                dag_run_id=workflow_run_id,
+                task_id=task_id,
+                task_try_number=task_try_number
+            )
+        if not result_dict.get("base64_content"):
+            raise ResourceNotFoundException("Task result has no content.")
+
+        content = await anyio.to_thread.run_sync(base64.b64decode, result_dict["base64_content"])
+        file_type = result_dict.get("file_type")
+        media_type = DISPLAY_RESULT_MEDIA_TYPES.get(file_type, "application/octet-stream")
+        headers = {"X-Content-Type-Options": "nosniff"}
+        if file_type in ACTIVE_RESULT_FILE_TYPES:
+            headers["Content-Disposition"] = f'attachment; filename="{task_id}.{file_type}"'
+            headers["Content-Security-Policy"] = "sandbox"
+        return content, media_type, headers
 
     @staticmethod
     def parse_log(log_text: str):
@@ -858,13 +1036,13 @@ class WorkflowService(object):
 
         return output_lines
 
-    def get_task_logs(self, workflow_id=int, workflow_run_id=str, task_id=str, task_try_number=int):
-        workflow = self.workflow_repository.find_by_id(id=workflow_id)
+    async def get_task_logs(self, workflow_id=int, workflow_run_id=str, task_id=str, task_try_number=int):
+        workflow = await self._find_workflow(workflow_id)
         if not workflow:
             raise ResourceNotFoundException("Workflow not found")
 
         airflow_workflow_id = workflow.uuid_name
-        response = self.airflow_client.get_task_logs(
+        response = await self.airflow_client.get_task_logs(
             dag_id=airflow_workflow_id,
             dag_run_id=workflow_run_id,
             task_id=task_id,
@@ -873,20 +1051,19 @@ class WorkflowService(object):
         if response.status_code != 200:
             raise BaseException("Error while trying to get task logs")
 
-        parsed_log = self.parse_log(
-            response.text
-        )
+        # Logs can be long and parsing them is CPU bound, so it runs in a worker thread
+        parsed_log = await anyio.to_thread.run_sync(self.parse_log, response.text)
 
         return GetWorkflowRunTaskLogsResponse(
             data=parsed_log
         )
 
-    def get_task_result(self, workflow_id=int, workflow_run_id=str, task_id=str, task_try_number=int):
-        workflow = self.workflow_repository.find_by_id(id=workflow_id)
+    async def get_task_result(self, workflow_id=int, workflow_run_id=str, task_id=str, task_try_number=int):
+        workflow = await self._find_workflow(workflow_id)
         if not workflow:
             raise ResourceNotFoundException("Workflow not found")
         airflow_workflow_id = workflow.uuid_name
-        result_dict = self.airflow_client.get_task_result(
+        result_dict = await self.airflow_client.get_task_result(
             dag_id=airflow_workflow_id,
             dag_run_id=workflow_run_id,
             task_id=task_id,
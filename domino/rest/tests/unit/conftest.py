@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(scope="session", autouse=True)
+def teardown_user_test():
+    """The unit tests in this package run without the API, so there is no test user to remove"""
+    yield
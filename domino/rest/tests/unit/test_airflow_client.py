@@ -0,0 +1,105 @@
+import asyncio
+import pytest
+from aiohttp import ClientConnectionError
+
+from clients.airflow_client import AirflowRestClient
+
+
+class FakeResponse:
+    def __init__(self, status: int):
+        self.status = status
+        self.headers = {}
+
+    async def read(self):
+        return b'{}'
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    """Stands in for the shared aiohttp session, replaying one outcome per request"""
+    closed = False
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return FakeResponse(outcome)
+
+
+@pytest.fixture
+def fake_session():
+    def install(outcomes):
+        session = FakeSession(outcomes)
+        AirflowRestClient._async_session = session
+        return session
+
+    yield install
+    AirflowRestClient._async_session = None
+
+
+@pytest.fixture
+def airflow_client():
+    client = AirflowRestClient()
+    client.max_retries = 2
+    client.retry_backoff = 0
+    return client
+
+
+class TestAirflowClientRetryPolicy:
+    @staticmethod
+    def test_get_is_retried_until_success(fake_session, airflow_client: AirflowRestClient):
+        session = fake_session([503, 502, 200])
+        response = asyncio.run(airflow_client.request('get', 'api/v1/dags'))
+
+        assert response.status_code == 200
+        assert len(session.calls) == 3
+
+    @staticmethod
+    def test_get_returns_last_response_when_retries_are_exhausted(fake_session, airflow_client: AirflowRestClient):
+        session = fake_session([503, 503, 503])
+        response = asyncio.run(airflow_client.request('get', 'api/v1/dags'))
+
+        assert response.status_code == 503
+        assert len(session.calls) == airflow_client.max_retries + 1
+
+    @staticmethod
+    def test_non_retry_status_is_returned_immediately(fake_session, airflow_client: AirflowRestClient):
+        session = fake_session([404])
+        response = asyncio.run(airflow_client.request('get', 'api/v1/dags/missing'))
+
+        assert response.status_code == 404
+        assert len(session.calls) == 1
+
+    @staticmethod
+    def test_post_is_not_retried(fake_session, airflow_client: AirflowRestClient):
+        session = fake_session([503])
+        response = asyncio.run(airflow_client.request('post', 'api/v1/dags/dag_id/dagRuns'))
+
+        assert response.status_code == 503
+        assert len(session.calls) == 1
+
+    @staticmethod
+    def test_connection_errors_are_retried_for_safe_methods(fake_session, airflow_client: AirflowRestClient):
+        session = fake_session([ClientConnectionError(), asyncio.TimeoutError(), 200])
+        response = asyncio.run(airflow_client.request('get', 'api/v1/dags'))
+
+        assert response.status_code == 200
+        assert len(session.calls) == 3
+
+    @staticmethod
+    def test_connection_errors_are_raised_for_unsafe_methods(fake_session, airflow_client: AirflowRestClient):
+        session = fake_session([ClientConnectionError()])
+        with pytest.raises(ClientConnectionError):
+            asyncio.run(airflow_client.request('post', 'api/v1/dags/dag_id/dagRuns'))
+
+        assert len(session.calls) == 1
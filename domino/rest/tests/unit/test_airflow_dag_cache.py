@@ -0,0 +1,158 @@
+import asyncio
+import pytest
+from unittest.mock import Mock
+
+from clients.airflow_dag_cache import AirflowDagStateCache
+from schemas.exceptions.base import BaseException
+
+
+class FakeAirflowListing:
+    """Replaces AirflowDagStateCache._list_all, serving fixed dags and import errors"""
+    def __init__(self, dags=None, import_errors=None):
+        self.dags = dags if dags is not None else [{'dag_id': 'dag_a'}, {'dag_id': 'dag_b'}]
+        self.import_errors = import_errors if import_errors is not None else [{'filename': '/opt/airflow/dags/dag_c.py'}]
+        self.failing = False
+        self.calls = 0
+
+    async def __call__(self, resource, key, params=None):
+        self.calls += 1
+        await asyncio.sleep(0)
+        if self.failing:
+            raise BaseException("Airflow is down")
+        return self.dags if key == 'dags' else self.import_errors
+
+
+@pytest.fixture
+def listing():
+    return FakeAirflowListing()
+
+
+def make_cache(listing: FakeAirflowListing, ttl: float) -> AirflowDagStateCache:
+    cache = AirflowDagStateCache(ttl=ttl, refresh_interval=60)
+    cache._list_all = listing
+    cache.logger = Mock()
+    return cache
+
+
+class TestAirflowDagStateCache:
+    @staticmethod
+    def test_refresh_builds_snapshot(listing: FakeAirflowListing):
+        cache = make_cache(listing, ttl=60)
+        snapshot = asyncio.run(cache.refresh())
+
+        assert set(snapshot.dags) == {'dag_a', 'dag_b'}
+        assert snapshot.import_error_dag_ids == {'dag_c'}
+        assert cache.refreshes == 1
+
+    @staticmethod
+    def test_fresh_snapshot_is_served_without_refresh(listing: FakeAirflowListing):
+        cache = make_cache(listing, ttl=60)
+
+        async def read_twice():
+            first = await cache.get_snapshot()
+            second = await cache.get_snapshot()
+            return first, second
+
+        first, second = asyncio.run(read_twice())
+
+        assert first is second
+        assert cache.misses == 1
+        assert cache.hits == 1
+        assert cache.refreshes == 1
+
+    @staticmethod
+    def test_stale_snapshot_is_refreshed(listing: FakeAirflowListing):
+        cache = make_cache(listing, ttl=0)
+
+        async def read_twice():
+            await cache.get_snapshot()
+            await asyncio.sleep(0.01)
+            return await cache.get_snapshot()
+
+        asyncio.run(read_twice())
+
+        assert cache.misses == 2
+        assert cache.refreshes == 2
+
+    @staticmethod
+    def test_concurrent_readers_share_one_refresh(listing: FakeAirflowListing):
+        cache = make_cache(listing, ttl=60)
+
+        async def read_concurrently():
+            return await asyncio.gather(*[cache.get_snapshot() for _ in range(5)])
+
+        snapshots = asyncio.run(read_concurrently())
+
+        assert all(snapshot is snapshots[0] for snapshot in snapshots)
+        assert cache.refreshes == 1
+
+    @staticmethod
+    def test_failed_refresh_serves_previous_snapshot(listing: FakeAirflowListing):
+        cache = make_cache(listing, ttl=0)
+
+        async def refresh_then_fail():
+            first = await cache.get_snapshot()
+            listing.failing = True
+            await asyncio.sleep(0.01)
+            return first, await cache.get_snapshot()
+
+        first, second = asyncio.run(refresh_then_fail())
+
+        assert second is first
+        assert cache.refresh_errors == 1
+        assert cache.metrics()['staleness_seconds'] > 0
+
+    @staticmethod
+    def test_failed_refresh_without_snapshot_raises(listing: FakeAirflowListing):
+        listing.failing = True
+        cache = make_cache(listing, ttl=60)
+
+        with pytest.raises(BaseException):
+            asyncio.run(cache.get_snapshot())
+        assert cache.refresh_errors == 1
+
+    @staticmethod
+    def test_outage_is_logged_once_until_recovery(listing: FakeAirflowListing):
+        cache = make_cache(listing, ttl=60)
+        listing.failing = True
+
+        async def fail_twice_then_recover():
+            for _ in range(2):
+                with pytest.raises(BaseException):
+                    await cache.refresh()
+                cache._log_refresh_failure('refresh failed')
+            listing.failing = False
+            await cache.refresh()
+            listing.failing = True
+            with pytest.raises(BaseException):
+                await cache.refresh()
+            cache._log_refresh_failure('refresh failed')
+
+        asyncio.run(fail_twice_then_recover())
+
+        # One traceback per outage, repeated failures at debug level
+        assert cache.logger.exception.call_count == 2
+        assert cache.logger.debug.call_count == 1
+        assert cache.logger.info.call_count == 1
+
+    @staticmethod
+    def test_metrics(listing: FakeAirflowListing):
+        cache = make_cache(listing, ttl=60)
+        empty_metrics = cache.metrics()
+
+        async def read_three_times():
+            for _ in range(3):
+                await cache.get_snapshot()
+
+        asyncio.run(read_three_times())
+        metrics = cache.metrics()
+
+        assert empty_metrics['hit_ratio'] is None
+        assert empty_metrics['staleness_seconds'] is None
+        assert metrics['hits'] == 2
+        assert metrics['misses'] == 1
+        assert metrics['hit_ratio'] == pytest.approx(2 / 3)
+        assert metrics['refreshes'] == 1
+        assert metrics['dags'] == 2
+        assert metrics['ttl_seconds'] == 60
+        assert metrics['staleness_seconds'] < 60
@@ -0,0 +1,116 @@
+import asyncio
+import pytest
+
+from utils.concurrency import gather_bounded, iter_bounded
+
+
+class InFlightCounter:
+    """Async callable that records how many calls ran at once and how each one ended"""
+    def __init__(self, delay: float = 0.01, fail_on=None):
+        self.delay = delay
+        self.fail_on = fail_on
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.started = []
+        self.finished = []
+        self.cancelled = []
+
+    async def __call__(self, item):
+        self.started.append(item)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if item == self.fail_on:
+                await asyncio.sleep(0)
+                raise ValueError(item)
+            await asyncio.sleep(self.delay)
+            self.finished.append(item)
+            return item * 10
+        except asyncio.CancelledError:
+            self.cancelled.append(item)
+            raise
+        finally:
+            self.in_flight -= 1
+
+
+class TestConcurrency:
+    @staticmethod
+    def test_gather_bounded_keeps_order_and_limit():
+        func = InFlightCounter()
+        results = asyncio.run(gather_bounded(func, range(10), limit=3))
+
+        assert results == [item * 10 for item in range(10)]
+        assert func.max_in_flight == 3
+
+    @staticmethod
+    def test_gather_bounded_runs_at_least_one_call():
+        func = InFlightCounter()
+        results = asyncio.run(gather_bounded(func, [1, 2], limit=0))
+
+        assert results == [10, 20]
+        assert func.max_in_flight == 1
+
+    @staticmethod
+    def test_gather_bounded_cancels_pending_calls_on_error():
+        func = InFlightCounter(fail_on=0)
+
+        async def run():
+            with pytest.raises(ValueError):
+                await gather_bounded(func, range(5), limit=2)
+            # Let the cancellations be delivered
+            await asyncio.sleep(0.05)
+
+        asyncio.run(run())
+
+        # Every call that started and did not fail was cancelled, and the rest never ran
+        assert 1 in func.cancelled
+        assert set(func.started) - {0} == set(func.cancelled)
+        assert len(func.started) < 5
+
+    @staticmethod
+    def test_iter_bounded_yields_in_order_within_limit():
+        # Later items finish first, results still come out in item order
+        func = InFlightCounter()
+
+        async def slow_first(item):
+            await asyncio.sleep(0.01 * (5 - item))
+            return await func(item)
+
+        async def collect():
+            return [result async for result in iter_bounded(slow_first, range(5), limit=2)]
+
+        assert asyncio.run(collect()) == [0, 10, 20, 30, 40]
+        assert func.max_in_flight <= 2
+
+    @staticmethod
+    def test_iter_bounded_cancels_pending_calls_when_consumer_stops():
+        func = InFlightCounter()
+
+        async def take_first():
+            results = iter_bounded(func, range(5), limit=2)
+            first = await results.__anext__()
+            await results.aclose()
+            await asyncio.sleep(0.05)
+            return first
+
+        assert asyncio.run(take_first()) == 0
+        assert 4 not in func.started or 4 in func.cancelled
+        assert len(func.started) - len(func.cancelled) <= 2
+
+    @staticmethod
+    def test_iter_bounded_cancels_pending_calls_on_error():
+        func = InFlightCounter(fail_on=1)
+
+        async def collect():
+            results = []
+            with pytest.raises(ValueError):
+                async for result in iter_bounded(func, range(5), limit=2):
+                    results.append(result)
+            await asyncio.sleep(0.05)
+            return results
+
+        assert asyncio.run(collect()) == [0]
+        # Calls still running when the error surfaced were cancelled, none is left behind
+        assert func.cancelled
+        assert set(func.started) == set(func.finished) | set(func.cancelled) | {1}
+        assert func.in_flight == 0
@@ -0,0 +1,64 @@
+from utils.lru_cache import LRUCache
+
+
+class TestLRUCache:
+    @staticmethod
+    def test_evicts_least_recently_used():
+        cache = LRUCache(max_size=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        # Reading "a" makes "b" the least recently used
+        assert cache.get("a") == 1
+        cache.set("c", 3)
+
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+        assert len(cache) == 2
+
+    @staticmethod
+    def test_get_missing_key_returns_default():
+        cache = LRUCache(max_size=1)
+
+        assert cache.get("missing") is None
+        assert cache.get("missing", 0) == 0
+
+    @staticmethod
+    def test_set_existing_key_replaces_value():
+        cache = LRUCache(max_size=2)
+        cache.set("a", 1)
+        cache.set("a", 2)
+
+        assert cache.get("a") == 2
+        assert len(cache) == 1
+
+    @staticmethod
+    def test_evicts_until_within_max_bytes():
+        cache = LRUCache(max_size=10, max_bytes=10, sizeof=len)
+        cache.set("a", "xxxx")
+        cache.set("b", "xxxx")
+        cache.set("c", "xxxx")
+
+        assert "a" not in cache
+        assert len(cache) == 2
+        assert cache.size_bytes == 8
+
+    @staticmethod
+    def test_rejects_entry_larger_than_max_bytes():
+        cache = LRUCache(max_size=10, max_bytes=10, sizeof=len)
+        cache.set("a", "xxxx")
+
+        assert cache.set("b", "x" * 11) is False
+        assert "b" not in cache
+        assert "a" in cache
+
+    @staticmethod
+    def test_replacing_or_popping_updates_size():
+        cache = LRUCache(max_size=10, max_bytes=10, sizeof=len)
+        cache.set("a", "xxxx")
+        cache.set("a", "xx")
+        assert cache.size_bytes == 2
+
+        assert cache.pop("a") == "xx"
+        assert cache.size_bytes == 0
+        assert len(cache) == 0
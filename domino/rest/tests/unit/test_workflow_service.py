@@ -0,0 +1,213 @@
+import asyncio
+import base64
+import json
+import pytest
+from types import SimpleNamespace
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import routers.workflow_router as workflow_router
+from clients.airflow_client import AirflowResponse
+from core.settings import settings
+from services.workflow_service import WorkflowService
+from utils.lru_cache import LRUCache
+
+
+WORKFLOW = SimpleNamespace(
+    id=1,
+    uuid_name="dag_a",
+    ui_schema={"nodes": {"task_png": {"data": {"name": "PlotPiece"}}}},
+)
+RUN_URL = "/workspaces/1/workflows/1/runs/run_1/tasks"
+
+
+def encode(content: bytes) -> str:
+    return base64.b64encode(content).decode()
+
+
+def task_instance(task_id: str, second: int) -> dict:
+    return dict(
+        task_id=task_id,
+        dag_id=WORKFLOW.uuid_name,
+        try_number=1,
+        state="success",
+        duration=1.0,
+        start_date=f"2024-01-01T00:00:0{second - 1}.000000+00:00",
+        end_date=f"2024-01-01T00:00:0{second}.000000+00:00",
+        execution_date="2024-01-01T00:00:00.000000+00:00",
+    )
+
+
+class FakeAirflowClient:
+    """Serves one dag run with its task instances and their display results"""
+    def __init__(self):
+        self.run_status = 200
+        self.run_state = "success"
+        self.tasks_status = 200
+        # Listed out of end_date order, the report sorts them
+        self.tasks = [task_instance("task_html", 3), task_instance("task_png", 1), task_instance("task_log", 2)]
+        self.results = {
+            "task_png": dict(base64_content=encode(b"\x89PNG"), file_type="png"),
+            "task_log": dict(),
+            "task_html": dict(base64_content=encode(b"<script>alert(1)</script>"), file_type="html"),
+        }
+        self.result_calls = 0
+
+    async def get_dag_run(self, dag_id, dag_run_id):
+        return AirflowResponse(self.run_status, json.dumps({"state": self.run_state}).encode(), {})
+
+    async def get_all_run_tasks_instances(self, dag_id, dag_run_id, page, page_size):
+        body = {"task_instances": self.tasks[page * page_size:(page + 1) * page_size], "total_entries": len(self.tasks)}
+        return AirflowResponse(self.tasks_status, json.dumps(body).encode(), {})
+
+    async def get_task_result(self, dag_id, dag_run_id, task_id, task_try_number):
+        self.result_calls += 1
+        return self.results[task_id]
+
+
+@pytest.fixture
+def airflow():
+    return FakeAirflowClient()
+
+
+@pytest.fixture
+def service(airflow: FakeAirflowClient, monkeypatch):
+    service = WorkflowService()
+    service.airflow_client = airflow
+
+    async def find_workflow(workflow_id):
+        return WORKFLOW if workflow_id == WORKFLOW.id else None
+
+    service._find_workflow = find_workflow
+    monkeypatch.setattr(WorkflowService, "report_cache", LRUCache(max_size=10))
+    return service
+
+
+@pytest.fixture
+def api(service: WorkflowService, monkeypatch):
+    monkeypatch.setattr(workflow_router, "workflow_service", service)
+    app = FastAPI()
+    app.include_router(workflow_router.router)
+    app.dependency_overrides[workflow_router.read_authorizer.authorize] = lambda: None
+    # Service errors the routers don't map reach the client as plain 500 responses
+    return TestClient(app, raise_server_exceptions=False)
+
+
+class TestWorkflowReportStream:
+    @staticmethod
+    def test_stream_is_ndjson_in_end_date_order(api: TestClient):
+        response = api.get(f"{RUN_URL}/report/stream")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        assert [line["task_id"] for line in lines] == ["task_png", "task_log", "task_html"]
+        assert [line["has_content"] for line in lines] == [True, False, True]
+        assert lines[0]["piece_name"] == "PlotPiece"
+        assert lines[0]["file_type"] == "png"
+
+    @staticmethod
+    def test_stream_never_contains_base64_content(api: TestClient):
+        response = api.get(f"{RUN_URL}/report/stream")
+
+        assert "base64_content" not in response.text
+        assert encode(b"\x89PNG") not in response.text
+
+    @staticmethod
+    def test_unknown_workflow_is_not_found(api: TestClient):
+        response = api.get("/workspaces/1/workflows/2/runs/run_1/tasks/report/stream")
+
+        assert response.status_code == 404
+
+    @staticmethod
+    def test_unknown_run_is_not_found_before_streaming(api: TestClient, airflow: FakeAirflowClient):
+        airflow.run_status = 404
+        response = api.get(f"{RUN_URL}/report/stream")
+
+        assert response.status_code == 404
+        assert airflow.result_calls == 0
+
+    @staticmethod
+    def test_airflow_error_is_reported_before_streaming(api: TestClient, airflow: FakeAirflowClient):
+        airflow.tasks_status = 500
+        response = api.get(f"{RUN_URL}/report/stream")
+
+        assert response.status_code == 500
+        assert airflow.result_calls == 0
+
+    @staticmethod
+    def test_finished_run_report_is_cached(api: TestClient, service: WorkflowService, airflow: FakeAirflowClient):
+        first = api.get(f"{RUN_URL}/report/stream")
+        second = api.get(f"{RUN_URL}/report/stream")
+
+        assert (WORKFLOW.uuid_name, "run_1") in service.report_cache
+        assert airflow.result_calls == 3
+        assert second.text == first.text
+
+    @staticmethod
+    def test_running_run_report_is_not_kept(api: TestClient, service: WorkflowService, airflow: FakeAirflowClient):
+        airflow.run_state = "running"
+        api.get(f"{RUN_URL}/report/stream")
+
+        assert len(service.report_cache) == 0
+
+    @staticmethod
+    def test_report_over_cache_budget_is_not_kept(service: WorkflowService, monkeypatch):
+        monkeypatch.setattr(settings, "REPORT_CACHE_MAX_BYTES", 10)
+        report = asyncio.run(service.generate_report(workflow_id=WORKFLOW.id, workflow_run_id="run_1"))
+
+        # The report itself is still complete, it just isn't cached
+        assert [item.task_id for item in report.data] == ["task_png", "task_log", "task_html"]
+        assert len(service.report_cache) == 0
+
+
+class TestTaskResultContent:
+    @staticmethod
+    def content_url(task_id: str) -> str:
+        return f"{RUN_URL}/{task_id}/1/result/content"
+
+    @staticmethod
+    def test_image_is_served_inline(api: TestClient):
+        response = api.get(TestTaskResultContent.content_url("task_png"))
+
+        assert response.status_code == 200
+        assert response.content == b"\x89PNG"
+        assert response.headers["content-type"] == "image/png"
+        assert response.headers["x-content-type-options"] == "nosniff"
+        assert "content-disposition" not in response.headers
+
+    @staticmethod
+    @pytest.mark.parametrize("file_type, media_type", [
+        ("html", "text/html; charset=utf-8"),
+        ("svg", "image/svg+xml"),
+    ])
+    def test_active_content_is_a_sandboxed_attachment(api: TestClient, airflow: FakeAirflowClient, file_type, media_type):
+        airflow.results["task_html"] = dict(base64_content=encode(b"<svg onload=alert(1)/>"), file_type=file_type)
+        response = api.get(TestTaskResultContent.content_url("task_html"))
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == media_type
+        assert response.headers["content-disposition"] == f'attachment; filename="task_html.{file_type}"'
+        assert response.headers["content-security-policy"] == "sandbox"
+        assert response.headers["x-content-type-options"] == "nosniff"
+
+    @staticmethod
+    def test_unknown_file_type_is_served_as_octet_stream(api: TestClient, airflow: FakeAirflowClient):
+        airflow.results["task_png"] = dict(base64_content=encode(b"data"), file_type="parquet")
+        response = api.get(TestTaskResultContent.content_url("task_png"))
+
+        assert response.headers["content-type"] == "application/octet-stream"
+
+    @staticmethod
+    def test_task_without_content_is_not_found(api: TestClient):
+        response = api.get(TestTaskResultContent.content_url("task_log"))
+
+        assert response.status_code == 404
+
+    @staticmethod
+    def test_cached_report_is_used(api: TestClient, airflow: FakeAirflowClient):
+        api.get(f"{RUN_URL}/report/stream")
+        response = api.get(TestTaskResultContent.content_url("task_png"))
+
+        assert response.content == b"\x89PNG"
+        assert airflow.result_calls == 3
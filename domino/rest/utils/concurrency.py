@@ -0,0 +1,46 @@
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Iterable, List, TypeVar
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+async def gather_bounded(func: Callable[[T], Awaitable[R]], items: Iterable[T], limit: int) -> List[R]:
+    """
+    Await func(item) for every item with at most `limit` calls in flight.
+    Results are returned in the order of items, like asyncio.gather. If a call
+    raises, the calls still pending are cancelled before the error propagates.
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def run(item: T) -> R:
+        async with semaphore:
+            return await func(item)
+
+    tasks = [asyncio.ensure_future(run(item)) for item in items]
+    try:
+        return await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def iter_bounded(func: Callable[[T], Awaitable[R]], items: Iterable[T], limit: int) -> AsyncIterator[R]:
+    """
+    Like gather_bounded, but yields each result, in the order of items, as soon as it
+    and every result before it are available. Calls still pending when the consumer
+    stops iterating are cancelled.
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def run(item: T) -> R:
+        async with semaphore:
+            return await func(item)
+
+    tasks = [asyncio.ensure_future(run(item)) for item in items]
+    try:
+        for task in tasks:
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,56 @@
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+
+class LRUCache(object):
+    """
+    Mapping that keeps at most max_size entries, evicting the least recently used.
+    With max_bytes, the summed sizeof() of the entries is bounded as well; a single
+    entry larger than max_bytes is not stored.
+    """
+    def __init__(self, max_size: int, max_bytes: int = None, sizeof: Callable[[Any], int] = None):
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.size_bytes = 0
+        # key -> (value, size in bytes)
+        self._data = OrderedDict()
+
+    def _entry_size(self, value: Any) -> int:
+        if self.max_bytes is None or self.sizeof is None:
+            return 0
+        return self.sizeof(value)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        if key not in self._data:
+            return default
+        self._data.move_to_end(key)
+        return self._data[key][0]
+
+    def set(self, key: Hashable, value: Any) -> bool:
+        """
+        Store value under key. Returns False if it is too large to be cached.
+        """
+        size = self._entry_size(value)
+        self.pop(key)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return False
+        self._data[key] = (value, size)
+        self.size_bytes += size
+        while len(self._data) > self.max_size or (self.max_bytes is not None and self.size_bytes > self.max_bytes):
+            _, (_, evicted_size) = self._data.popitem(last=False)
+            self.size_bytes -= evicted_size
+        return True
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        if key not in self._data:
+            return default
+        value, size = self._data.pop(key)
+        self.size_bytes -= size
+        return value
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
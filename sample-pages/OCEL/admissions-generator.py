@@ -164,16 +164,17 @@ def generate_admission_data(num_admissions=28):
     
     return df, stats, admission_times
 
-# Generate the data
-df, stats, admission_times = generate_admission_data(28)
+if __name__ == '__main__':
+    # Generate the data
+    df, stats, admission_times = generate_admission_data(28)
 
-# Print some sample data and statistics
-print("\nSample of generated admission events:")
-print(df.head().to_string())
+    # Print some sample data and statistics
+    print("\nSample of generated admission events:")
+    print(df.head().to_string())
 
-print("\nAdmission Process Statistics:")
-for key, value in stats.items():
-    print(f"{key}: {value}")
+    print("\nAdmission Process Statistics:")
+    for key, value in stats.items():
+        print(f"{key}: {value}")
 
-# Export to CSV for process mining
-df.to_csv('admission_operations.csv', index=False)
\ No newline at end of file
+    # Export to CSV for process mining
+    df.to_csv('admission_operations.csv', index=False)
@@ -0,0 +1,285 @@
+"""
+Vectorized synthetic event generators for the admission and nursing process flows.
+
+Same process model as admissions-generator.py and nursing-operations-generator.py,
+but every random draw is made for all cases at once from a numpy Generator, so
+millions of cases can be produced and written in chunks to CSV or Parquet.
+
+Usage:
+    python event_generators.py admission 1000000 --output admission_operations.parquet
+    python event_generators.py nursing 28 --output nursing_operations.csv
+"""
+
+import os
+import argparse
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet output is optional; CSV always works
+    pa = pq = None
+
+CHUNK_CASES = 100000
+
+ADMISSION_CORE_ACTIVITIES = [
+    'Patient Arrival',
+    'Registration',
+    'Initial Triage',
+    'Vital Signs',
+    'Provider Assessment',
+    'Admission Decision',
+    'Bed Request',
+    'Bed Assignment',
+    'Unit Notification',
+    'Patient Transport',
+    'Unit Arrival'
+]
+ADMISSION_ADDITIONAL_ACTIVITIES = [
+    'Lab Work',
+    'Imaging',
+    'Specialty Consultation',
+    'Social Work Assessment',
+    'Care Management Review',
+    'Insurance Verification',
+    'Medication History'
+]
+ADMISSION_TYPES = ['Direct Admit', 'Emergency Department', 'Transfer', 'Surgical Admission', 'Observation']
+ADMISSION_WEIGHTS = [0.15, 0.45, 0.1, 0.2, 0.1]
+UNITS = ['Medical', 'Surgical', 'Telemetry', 'ICU']
+UNIT_CAPACITY = np.array([0.85, 0.75, 0.90, 0.95])
+UNIT_AVG_DELAY = np.array([20, 15, 25, 30])
+
+NURSING_CORE_ACTIVITIES = [
+    'Admission',
+    'Initial Assessment',
+    'Vital Signs',
+    'Doctor Round',
+    'Medication Administration',
+    'Nursing Assessment',
+    'Care Plan Update'
+]
+NURSING_ADDITIONAL_ACTIVITIES = [
+    'Blood Draw',
+    'IV Change',
+    'Physical Therapy',
+    'Imaging',
+    'Specialist Consultation',
+    'Pain Assessment',
+    'Family Meeting'
+]
+# 3 urgent and 4 delayed cases out of the original 28
+URGENT_FRACTION = 3 / 28
+DELAYED_FRACTION = 4 / 28
+
+
+def today():
+    return datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def case_ids(prefix, start, n):
+    """'A001', 'A002', ... numbered from start + 1."""
+    return prefix + pd.Series(np.arange(start + 1, start + n + 1)).astype(str).str.zfill(3).to_numpy()
+
+
+def minutes_after(base_date, minutes):
+    return np.datetime64(base_date, 'm') + np.asarray(minutes, dtype='int64').astype('timedelta64[m]')
+
+
+def sample_without_replacement(rng, n, pool_size, counts):
+    """
+    Per row, pick counts[i] distinct indices from range(pool_size). Returns the
+    (row, index) pairs of the picks.
+    """
+    ranks = rng.random((n, pool_size)).argsort(axis=1).argsort(axis=1)
+    rows, picks = np.nonzero(ranks < counts[:, None])
+    return rows, picks
+
+
+def event_frame(ids, activities, minutes, base_date, units, resources, durations, **extra):
+    return pd.DataFrame({
+        'case_id': ids,
+        'activity': activities,
+        'timestamp': minutes_after(base_date, minutes),
+        'unit': units,
+        'resource': resources,
+        'duration_mins': durations,
+        **extra,
+    })
+
+
+def generate_admission_events(num_cases, rng=None, base_date=None, case_offset=0):
+    """Admission process events for num_cases admissions, sorted by timestamp and case."""
+    rng = rng if rng is not None else np.random.default_rng(42)
+    base_date = base_date or today()
+    n = num_cases
+    ids = case_ids('A', case_offset, n)
+
+    admission_type = rng.choice(len(ADMISSION_TYPES), size=n, p=ADMISSION_WEIGHTS)
+    surgical = admission_type == ADMISSION_TYPES.index('Surgical Admission')
+    emergency = admission_type == ADMISSION_TYPES.index('Emergency Department')
+    transfer = admission_type == ADMISSION_TYPES.index('Transfer')
+
+    # Surgical arrivals cluster around 8 AM, ED any time, others around 2 PM
+    hour = np.where(surgical, np.trunc(rng.normal(8, 1, n)),
+                    np.where(emergency, rng.integers(0, 24, n), np.trunc(rng.normal(14, 3, n))))
+    hour = np.clip(hour, 0, 23).astype('int64')
+    arrival = hour * 60 + rng.integers(0, 60, n)
+
+    # Surgical -> Surgical unit, ED -> Medical/Telemetry/ICU, others -> any unit
+    unit = np.where(surgical, UNITS.index('Surgical'),
+                    np.where(emergency, np.array([0, 2, 3])[rng.integers(0, 3, n)], rng.integers(0, 4, n)))
+    unit_delay = np.trunc(rng.normal(UNIT_AVG_DELAY[unit] * UNIT_CAPACITY[unit], 10)).astype('int64')
+
+    # Core activities: one column per activity, cumulative delays give the times
+    delays = rng.integers(10, 31, (n, len(ADMISSION_CORE_ACTIVITIES)))
+    delays[:, ADMISSION_CORE_ACTIVITIES.index('Bed Assignment')] += unit_delay
+    provider = ADMISSION_CORE_ACTIVITIES.index('Provider Assessment')
+    delays[:, provider] += np.where(emergency, rng.integers(15, 46, n), 0)
+    times = arrival[:, None] + delays.cumsum(axis=1)
+    n_core = len(ADMISSION_CORE_ACTIVITIES)
+    unit_names = np.array(UNITS)[unit]
+    type_names = np.array(ADMISSION_TYPES)[admission_type]
+    core = event_frame(
+        np.repeat(ids, n_core),
+        np.tile(ADMISSION_CORE_ACTIVITIES, n),
+        times.ravel(),
+        base_date,
+        np.repeat(unit_names, n_core),
+        np.char.add('Staff_', np.char.zfill(rng.integers(1, 16, n * n_core).astype(str), 2)),
+        delays.ravel(),
+        admission_type=np.repeat(type_names, n_core),
+    )
+
+    # 2-4 additional activities (one more for ED and transfers) between arrival and unit arrival
+    counts = rng.integers(2, 5, n) + (emergency | transfer)
+    rows, picks = sample_without_replacement(rng, n, len(ADMISSION_ADDITIONAL_ACTIVITIES), counts)
+    span = np.maximum(times[:, -1] - arrival, 30)
+    additional = event_frame(
+        ids[rows],
+        np.array(ADMISSION_ADDITIONAL_ACTIVITIES)[picks],
+        arrival[rows] + rng.integers(30, span[rows] + 1),
+        base_date,
+        unit_names[rows],
+        np.char.add('Staff_', np.char.zfill(rng.integers(1, 16, len(rows)).astype(str), 2)),
+        rng.integers(15, 46, len(rows)),
+        admission_type=type_names[rows],
+    )
+
+    df = pd.concat([core, additional], ignore_index=True)
+    return df.sort_values(['timestamp', 'case_id'], kind='stable', ignore_index=True)
+
+
+def generate_nursing_events(num_cases, rng=None, base_date=None, case_offset=0):
+    """Nursing operations events for num_cases patients, sorted by timestamp and case."""
+    rng = rng if rng is not None else np.random.default_rng(42)
+    base_date = base_date or today()
+    n = num_cases
+    ids = case_ids('P', case_offset, n)
+
+    unit_names = np.array(UNITS)[rng.integers(0, len(UNITS), n)]
+    admission = rng.integers(0, 24, n) * 60 + rng.integers(0, 60, n)
+
+    n_core = len(NURSING_CORE_ACTIVITIES)
+    times = admission[:, None] + rng.integers(15, 46, (n, n_core)).cumsum(axis=1)
+    core = event_frame(
+        np.repeat(ids, n_core),
+        np.tile(NURSING_CORE_ACTIVITIES, n),
+        times.ravel(),
+        base_date,
+        np.repeat(unit_names, n_core),
+        np.char.add('Nurse_', np.char.zfill(rng.integers(1, 11, n * n_core).astype(str), 2)),
+        rng.integers(10, 31, n * n_core),
+    )
+
+    counts = rng.integers(2, 6, n)
+    rows, picks = sample_without_replacement(rng, n, len(NURSING_ADDITIONAL_ACTIVITIES), counts)
+    additional = event_frame(
+        ids[rows],
+        np.array(NURSING_ADDITIONAL_ACTIVITIES)[picks],
+        admission[rows] + rng.integers(60, 1381, len(rows)),
+        base_date,
+        unit_names[rows],
+        np.char.add('Nurse_', np.char.zfill(rng.integers(1, 11, len(rows)).astype(str), 2)),
+        rng.integers(15, 46, len(rows)),
+    )
+    df = pd.concat([core, additional], ignore_index=True)
+
+    # Process variants: urgent cases run 40% shorter (min 5 mins), delayed ones 50% longer
+    order = rng.permutation(n)
+    n_urgent = round(n * URGENT_FRACTION)
+    n_delayed = round(n * DELAYED_FRACTION)
+    urgent = np.isin(df['case_id'], ids[order[:n_urgent]])
+    delayed = np.isin(df['case_id'], ids[order[n_urgent:n_urgent + n_delayed]])
+    durations = df['duration_mins'].to_numpy()
+    df['duration_mins'] = np.where(urgent, np.maximum(5, (durations * 0.6).astype('int64')),
+                                   np.where(delayed, (durations * 1.5).astype('int64'), durations))
+
+    return df.sort_values(['timestamp', 'case_id'], kind='stable', ignore_index=True)
+
+
+GENERATORS = {
+    'admission': generate_admission_events,
+    'nursing': generate_nursing_events,
+}
+
+
+def iter_event_chunks(process, num_cases, chunk_cases=CHUNK_CASES, seed=42, base_date=None):
+    """
+    Yield event DataFrames for num_cases cases, chunk_cases at a time. Each
+    chunk has its own generator spawned from seed, so output is reproducible
+    for a given seed and chunk size. Rows are sorted within each chunk.
+    """
+    generate = GENERATORS[process]
+    base_date = base_date or today()
+    n_chunks = max(1, -(-num_cases // chunk_cases))
+    for i, seed_seq in enumerate(np.random.SeedSequence(seed).spawn(n_chunks)):
+        start = i * chunk_cases
+        yield generate(min(chunk_cases, num_cases - start), np.random.default_rng(seed_seq), base_date, start)
+
+
+def write_events(process, num_cases, output, chunk_cases=CHUNK_CASES, seed=42):
+    """Generate events chunk by chunk into a .csv or .parquet file. Returns the number of events."""
+    total = 0
+    if output.endswith('.parquet'):
+        if pq is None:
+            raise RuntimeError("Parquet output requires the 'pyarrow' package")
+        writer = None
+        try:
+            for df in iter_event_chunks(process, num_cases, chunk_cases, seed):
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(output, table.schema)
+                writer.write_table(table)
+                total += len(df)
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        if os.path.exists(output):
+            os.remove(output)
+        for df in iter_event_chunks(process, num_cases, chunk_cases, seed):
+            df.to_csv(output, mode='a', header=total == 0, index=False)
+            total += len(df)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic admission or nursing process events")
+    parser.add_argument('process', choices=sorted(GENERATORS))
+    parser.add_argument('num_cases', type=int, nargs='?', default=28)
+    parser.add_argument('--output', help="Output .csv or .parquet (default: <process>_operations.csv)")
+    parser.add_argument('--chunk-cases', type=int, default=CHUNK_CASES, help="Cases generated per chunk")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    output = args.output or f"{args.process}_operations.csv"
+    total = write_events(args.process, args.num_cases, output, args.chunk_cases, args.seed)
+    print(f"Wrote {total} events for {args.num_cases} cases to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,9 +3,6 @@ import numpy as np
 from datetime import datetime, timedelta
 import random
 
-# Set random seed for reproducibility
-np.random.seed(42)
-
 def generate_patient_data(num_patients=28):
     # Start timestamp for today
     base_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
@@ -117,19 +114,23 @@ def generate_patient_data(num_patients=28):
     
     return df, stats
 
-# Generate the data
-df, stats = generate_patient_data(28)
+if __name__ == '__main__':
+    # Set random seed for reproducibility
+    np.random.seed(42)
+
+    # Generate the data
+    df, stats = generate_patient_data(28)
 
-# Print some sample data and statistics
-print("\nSample of generated events:")
-print(df.head().to_string())
+    # Print some sample data and statistics
+    print("\nSample of generated events:")
+    print(df.head().to_string())
 
-print("\nProcess Statistics:")
-for key, value in stats.items():
-    print(f"{key}: {value}")
+    print("\nProcess Statistics:")
+    for key, value in stats.items():
+        print(f"{key}: {value}")
 
-# Convert to format suitable for PM4Py
-event_log = df.to_dict('records')
+    # Convert to format suitable for PM4Py
+    event_log = df.to_dict('records')
 
-# You could also export to CSV for PM4Py
-df.to_csv('nursing_operations.csv', index=False)
\ No newline at end of file
+    # You could also export to CSV for PM4Py
+    df.to_csv('nursing_operations.csv', index=False)
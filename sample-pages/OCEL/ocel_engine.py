@@ -0,0 +1,559 @@
+"""
+DataFrame-based OCEL 2.0 conversion engine.
+
+The admission and discharge converters build one dict entry per event in a
+Python loop and dump the whole log with json.dump. This engine applies the
+same object/change rules column-wise to chunks of events and streams events,
+objects, event-object relations and object changes to a writer as it goes,
+so memory is bounded by the chunk size plus the set of object ids seen.
+
+Usage:
+    python ocel_engine.py admission events.csv --format sqlite --output admission.sqlite
+    python ocel_engine.py discharge events.jsonl --format jsonl --output discharge_ocel/
+"""
+
+import os
+import re
+import json
+import sqlite3
+import argparse
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+CHUNK_SIZE = 100000
+
+# Initial object attribute rows in the OCEL 2.0 SQLite layout use the epoch
+OBJECT_INITIAL_TIME = "1970-01-01T00:00:00"
+
+
+@dataclass
+class ObjectRule:
+    """How events create and relate to objects of one type (all functions are vectorized)."""
+    object_type: str
+    qualifier: str
+    ids: Callable[[pd.DataFrame], pd.Series]
+    attributes: Callable[[pd.DataFrame], Dict[str, object]]
+    when: Optional[Callable[[pd.DataFrame], pd.Series]] = None
+
+
+@dataclass
+class ChangeRule:
+    """An object attribute change recorded by matching events."""
+    object_type: str
+    field: str
+    ids: Callable[[pd.DataFrame], pd.Series]
+    values: Callable[[pd.DataFrame], object]
+    when: Callable[[pd.DataFrame], pd.Series]
+
+
+@dataclass
+class ConversionSpec:
+    name: str
+    event_attributes: List[str]
+    objects: List[ObjectRule]
+    changes: List[ChangeRule] = field(default_factory=list)
+
+
+def case_suffix(df):
+    return df["case_id"].str[1:]
+
+
+def shift(df):
+    return np.where(df["_ts"].dt.hour.between(8, 19), "day", "night")
+
+
+ADMISSION_SPEC = ConversionSpec(
+    name="admission",
+    event_attributes=["admission_type", "unit", "duration_mins", "resource"],
+    objects=[
+        ObjectRule(
+            "admission", "case",
+            ids=lambda df: df["case_id"],
+            attributes=lambda df: {
+                "admission_type": df["admission_type"],
+                "priority": np.where(df["admission_type"] == "Direct Admit", "routine", "urgent"),
+            },
+        ),
+        ObjectRule(
+            "patient", "patient",
+            ids=lambda df: "P" + case_suffix(df),
+            attributes=lambda df: {
+                "id": "P" + case_suffix(df),
+                "acuity": np.where(df["admission_type"].isin(["Emergency Department", "Transfer"]), "high", "normal"),
+            },
+        ),
+        ObjectRule(
+            "bed", "assigned bed",
+            ids=lambda df: "B" + df["unit"].str[:1] + case_suffix(df),
+            attributes=lambda df: {
+                "unit": df["unit"],
+                "bed_type": np.where(df["admission_type"] == "Transfer", "isolation", "standard"),
+            },
+            when=lambda df: df["activity"] == "Bed Assignment",
+        ),
+        ObjectRule(
+            "staff", "resource",
+            ids=lambda df: df["resource"],
+            attributes=lambda df: {
+                "role": np.where(df["resource"].str.contains("Nurse", regex=False), "nurse", "physician"),
+                "shift": shift(df),
+            },
+        ),
+    ],
+    changes=[
+        ChangeRule(
+            "bed", "assign",
+            ids=lambda df: "B" + df["unit"].str[:1] + case_suffix(df),
+            values=lambda df: df["case_id"],
+            when=lambda df: df["activity"] == "Bed Assignment",
+        ),
+    ],
+)
+
+# Same mapping as OCELdischarge-process-converter.determine_staff_role
+STAFF_ROLES = {
+    "Discharge Order Written": "physician",
+    "Medication Reconciliation": "pharmacist",
+    "Patient Education": "nurse",
+    "Final Nursing Assessment": "nurse",
+    "Discharge Summary Documentation": "physician",
+    "Patient Transport": "transport",
+    "Social Work Consult": "social_worker",
+}
+
+DISCHARGE_SPEC = ConversionSpec(
+    name="discharge",
+    event_attributes=["disposition", "unit", "duration_mins", "resource"],
+    objects=[
+        ObjectRule(
+            "discharge", "case",
+            ids=lambda df: df["case_id"],
+            attributes=lambda df: {
+                "disposition": df["disposition"],
+                "status": "in_progress",
+                "estimated_time": df["timestamp"],
+            },
+        ),
+        ObjectRule(
+            "patient", "patient",
+            ids=lambda df: "P" + case_suffix(df),
+            attributes=lambda df: {
+                "id": "P" + case_suffix(df),
+                "acuity": np.where(
+                    df["disposition"].isin(["Skilled Nursing Facility", "Rehabilitation Facility"]), "high", "normal"
+                ),
+            },
+        ),
+        ObjectRule(
+            "medication", "reconciled medication",
+            ids=lambda df: "M" + case_suffix(df),
+            attributes=lambda df: {"type": "discharge_meds", "reconciliation_status": "completed"},
+            when=lambda df: df["activity"] == "Medication Reconciliation",
+        ),
+        ObjectRule(
+            "transportation", "transport",
+            ids=lambda df: "T" + case_suffix(df),
+            attributes=lambda df: {
+                "type": np.where(df["disposition"] == "Home", "wheelchair", "stretcher"),
+                "status": "scheduled",
+                "scheduled_time": df["timestamp"],
+            },
+            when=lambda df: df["activity"] == "Patient Transport Arranged",
+        ),
+        ObjectRule(
+            "documentation", "documentation",
+            ids=lambda df: "DOC" + case_suffix(df),
+            attributes=lambda df: {
+                "type": "discharge_summary",
+                "status": "completed",
+                "completion_time": df["timestamp"],
+            },
+            when=lambda df: df["activity"] == "Discharge Summary Documentation",
+        ),
+        ObjectRule(
+            "staff", "resource",
+            ids=lambda df: df["resource"],
+            attributes=lambda df: {
+                "role": df["activity"].map(STAFF_ROLES).fillna("staff"),
+                "shift": shift(df),
+                "department": df["unit"],
+            },
+        ),
+    ],
+    changes=[
+        ChangeRule(
+            "medication", "reconcile",
+            ids=lambda df: "M" + case_suffix(df),
+            values=lambda df: "completed",
+            when=lambda df: df["activity"] == "Medication Reconciliation",
+        ),
+        ChangeRule(
+            "discharge", "status",
+            ids=lambda df: df["case_id"],
+            values=lambda df: "completed",
+            when=lambda df: df["activity"] == "Physical Discharge",
+        ),
+    ],
+)
+
+SPECS = {spec.name: spec for spec in (ADMISSION_SPEC, DISCHARGE_SPEC)}
+
+
+def column(value):
+    """Arrays/Series become plain arrays; scalars stay scalars and broadcast."""
+    if isinstance(value, (pd.Series, pd.Index, np.ndarray)):
+        return np.asarray(value)
+    return value
+
+
+def type_map_name(ocel_type):
+    """OCEL 2.0 SQLite table suffix for a type, e.g. 'Bed Assignment' -> 'BedAssignment'."""
+    return re.sub(r"[^0-9A-Za-z]", "", str(ocel_type).title())
+
+
+###############################################################################
+# WRITERS
+###############################################################################
+
+class OcelWriter(ABC):
+    """Receives the converted tables chunk by chunk."""
+
+    def existing_object_ids(self) -> Dict[str, set]:
+        """Object ids already in the output (append mode), keyed by object type."""
+        return {}
+
+    @abstractmethod
+    def write_events(self, df):
+        """Append a chunk of events."""
+
+    @abstractmethod
+    def write_objects(self, object_type, df):
+        """Append new objects of one type."""
+
+    @abstractmethod
+    def write_relations(self, df):
+        """Append event-object relations."""
+
+    @abstractmethod
+    def write_changes(self, object_type, df):
+        """Append attribute changes of one object type."""
+
+    def flush(self):
+        """Make everything written so far durable."""
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class JsonLinesWriter(OcelWriter):
+    """One JSON lines file per table in an output directory."""
+
+    def __init__(self, out_dir, append=False):
+        os.makedirs(out_dir, exist_ok=True)
+        self.out_dir = out_dir
+        self.append = append
+        self.files = {
+            name: open(os.path.join(out_dir, f"{name}.jsonl"), "a" if append else "w")
+            for name in ("events", "objects", "event_object", "object_changes")
+        }
+
+    def existing_object_ids(self):
+        ids = {}
+        if self.append:
+            with open(os.path.join(self.out_dir, "objects.jsonl")) as f:
+                for line in f:
+                    obj = json.loads(line)
+                    ids.setdefault(obj["ocel_type"], set()).add(obj["ocel_id"])
+        return ids
+
+    def _write(self, name, df):
+        if df.empty:
+            return
+        text = df.to_json(orient="records", lines=True, date_format="iso")
+        self.files[name].write(text if text.endswith("\n") else text + "\n")
+
+    def write_events(self, df):
+        self._write("events", df)
+
+    def write_objects(self, object_type, df):
+        self._write("objects", df)
+
+    def write_relations(self, df):
+        self._write("event_object", df)
+
+    def write_changes(self, object_type, df):
+        self._write("object_changes", df)
+
+    def flush(self):
+        for f in self.files.values():
+            f.flush()
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+
+
+class ParquetWriter(OcelWriter):
+    """A Parquet dataset (directory of part files) per table; objects/changes split by type."""
+
+    def __init__(self, out_dir, append=False):
+        self.out_dir = out_dir
+        self.append = append
+        self.parts = {}
+
+    def existing_object_ids(self):
+        ids = {}
+        objects_dir = os.path.join(self.out_dir, "objects")
+        if self.append and os.path.isdir(objects_dir):
+            for object_type in os.listdir(objects_dir):
+                existing = pd.read_parquet(os.path.join(objects_dir, object_type), columns=["ocel_id"])
+                ids[object_type] = set(existing["ocel_id"])
+        return ids
+
+    def _write(self, name, df):
+        if df.empty:
+            return
+        table_dir = os.path.join(self.out_dir, name)
+        os.makedirs(table_dir, exist_ok=True)
+        if name not in self.parts:
+            # Continue numbering after parts from earlier (appended) runs
+            self.parts[name] = len([f for f in os.listdir(table_dir) if f.endswith(".parquet")])
+        part = self.parts[name]
+        df.to_parquet(os.path.join(table_dir, f"part-{part:05d}.parquet"), index=False)
+        self.parts[name] = part + 1
+
+    def write_events(self, df):
+        self._write("events", df)
+
+    def write_objects(self, object_type, df):
+        self._write(f"objects/{object_type}", df)
+
+    def write_relations(self, df):
+        self._write("event_object", df)
+
+    def write_changes(self, object_type, df):
+        self._write(f"object_changes/{object_type}", df)
+
+
+class SqliteWriter(OcelWriter):
+    """
+    OCEL 2.0 SQLite layout: event/object index tables, one event_<Type> and
+    object_<Type> table per type, event_object relations and the map tables.
+    """
+
+    def __init__(self, path, append=False):
+        if os.path.exists(path) and not append:
+            os.remove(path)
+        self.conn = sqlite3.connect(path)
+        self.event_types = self._map_types("event_map_type")
+        self.object_types = self._map_types("object_map_type")
+
+    def _map_types(self, table):
+        if not self.conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (table,)).fetchone():
+            return {}
+        return dict(self.conn.execute(f"SELECT ocel_type, ocel_type_map FROM {table}").fetchall())
+
+    def existing_object_ids(self):
+        ids = {}
+        if self.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'object'").fetchone():
+            for ocel_id, ocel_type in self.conn.execute("SELECT ocel_id, ocel_type FROM object"):
+                ids.setdefault(ocel_type, set()).add(ocel_id)
+        return ids
+
+    def _append(self, table, df):
+        existing = [row[1] for row in self.conn.execute(f'PRAGMA table_info("{table}")')]
+        if existing:
+            for col in df.columns:
+                if col not in existing:
+                    self.conn.execute(f'ALTER TABLE "{table}" ADD COLUMN "{col}"')
+        df.to_sql(table, self.conn, if_exists="append", index=False)
+
+    def write_events(self, df):
+        df = df.assign(ocel_time=df["ocel_time"].dt.strftime("%Y-%m-%dT%H:%M:%S"))
+        self._append("event", df[["ocel_id", "ocel_type"]])
+        for ocel_type, type_df in df.groupby("ocel_type", sort=False):
+            self.event_types.setdefault(ocel_type, type_map_name(ocel_type))
+            self._append(f"event_{self.event_types[ocel_type]}", type_df.drop(columns="ocel_type"))
+
+    def write_objects(self, object_type, df):
+        self.object_types.setdefault(object_type, type_map_name(object_type))
+        self._append("object", df[["ocel_id", "ocel_type"]])
+        attrs = df.drop(columns="ocel_type").assign(ocel_time=OBJECT_INITIAL_TIME, ocel_changed_field=None)
+        self._append(f"object_{self.object_types[object_type]}", attrs)
+
+    def write_relations(self, df):
+        self._append("event_object", df)
+
+    def write_changes(self, object_type, df):
+        self.object_types.setdefault(object_type, type_map_name(object_type))
+        rows = pd.DataFrame({
+            "ocel_id": df["ocel_id"],
+            "ocel_time": df["ocel_time"].dt.strftime("%Y-%m-%dT%H:%M:%S"),
+            "ocel_changed_field": df["ocel_changed_field"],
+        })
+        for changed_field, field_df in df.groupby("ocel_changed_field", sort=False):
+            self._append(
+                f"object_{self.object_types[object_type]}",
+                rows.loc[field_df.index].assign(**{changed_field: field_df["ocel_value"].to_numpy()}),
+            )
+
+    def flush(self):
+        self._write_map_types()
+        self.conn.commit()
+
+    def _write_map_types(self):
+        for table, types in (("event_map_type", self.event_types), ("object_map_type", self.object_types)):
+            pd.DataFrame(list(types.items()), columns=["ocel_type", "ocel_type_map"]).to_sql(
+                table, self.conn, if_exists="replace", index=False
+            )
+
+    def close(self):
+        self.conn.execute("CREATE TABLE IF NOT EXISTS object_object "
+                          "(ocel_source_id TEXT, ocel_target_id TEXT, ocel_qualifier TEXT)")
+        self._write_map_types()
+        self.conn.commit()
+        self.conn.close()
+
+
+WRITERS = {
+    "jsonl": JsonLinesWriter,
+    "parquet": ParquetWriter,
+    "sqlite": SqliteWriter,
+}
+
+
+###############################################################################
+# CONVERSION
+###############################################################################
+
+def iter_event_chunks(path, chunk_size=CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """Read events from CSV or JSON lines in chunks, or from a JSON array (the sample format)."""
+    if path.endswith(".csv"):
+        yield from pd.read_csv(path, chunksize=chunk_size)
+    elif path.endswith(".jsonl"):
+        yield from pd.read_json(path, lines=True, chunksize=chunk_size)
+    else:
+        with open(path) as f:
+            events = json.load(f)
+        for start in range(0, len(events), chunk_size):
+            yield pd.DataFrame(events[start:start + chunk_size])
+
+
+def convert_chunks(
+    chunks: Iterable[pd.DataFrame],
+    spec: ConversionSpec,
+    writer: OcelWriter,
+    seen: Optional[Dict[str, set]] = None
+) -> Dict[str, int]:
+    """
+    Convert event chunks with a spec and stream the OCEL tables to writer.
+
+    Events keep their event_id column when the input has one; otherwise ids
+    continue across chunks (e0, e1, ...). An object's attributes are taken
+    from the first event that creates it (including objects the writer already
+    holds when appending); later events only add relations and changes.
+    Pass the same seen dict to successive calls on one writer to avoid
+    re-reading the writer's object ids. Returns row counts per table.
+    """
+    if seen is None:
+        seen = writer.existing_object_ids()
+    for rule in spec.objects:
+        seen.setdefault(rule.object_type, set())
+    counts = {"events": 0, "objects": 0, "relations": 0, "changes": 0}
+
+    for chunk in chunks:
+        chunk = chunk.reset_index(drop=True)
+        chunk["_ts"] = pd.to_datetime(chunk["timestamp"])
+        if "event_id" in chunk:
+            event_ids = chunk["event_id"].astype(str)
+        else:
+            event_ids = pd.Series("e" + (np.arange(len(chunk)) + counts["events"]).astype(str), index=chunk.index)
+
+        events = pd.DataFrame({
+            "ocel_id": event_ids.to_numpy(),
+            "ocel_type": chunk["activity"].to_numpy(),
+            "ocel_time": chunk["_ts"],
+        })
+        for attr in spec.event_attributes:
+            events[attr] = chunk[attr].to_numpy() if attr in chunk else None
+        writer.write_events(events)
+        counts["events"] += len(events)
+
+        relations = []
+        for rule in spec.objects:
+            matched = chunk[rule.when(chunk)] if rule.when else chunk
+            if matched.empty:
+                continue
+            object_ids = rule.ids(matched)
+            relations.append(pd.DataFrame({
+                "ocel_event_id": event_ids[matched.index].to_numpy(),
+                "ocel_object_id": object_ids.to_numpy(),
+                "ocel_qualifier": rule.qualifier,
+            }))
+
+            new = ~object_ids.duplicated() & ~object_ids.isin(seen[rule.object_type])
+            if new.any():
+                creators = matched[new.to_numpy()]
+                objects = pd.DataFrame({
+                    "ocel_id": object_ids[new].to_numpy(),
+                    "ocel_type": rule.object_type,
+                    **{name: column(value) for name, value in rule.attributes(creators).items()},
+                })
+                seen[rule.object_type].update(objects["ocel_id"])
+                writer.write_objects(rule.object_type, objects)
+                counts["objects"] += len(objects)
+
+        if relations:
+            relations = pd.concat(relations, ignore_index=True)
+            writer.write_relations(relations)
+            counts["relations"] += len(relations)
+
+        for rule in spec.changes:
+            matched = chunk[rule.when(chunk)]
+            if matched.empty:
+                continue
+            changes = pd.DataFrame({
+                "ocel_id": rule.ids(matched).to_numpy(),
+                "ocel_type": rule.object_type,
+                "ocel_time": matched["_ts"].reset_index(drop=True),
+                "ocel_changed_field": rule.field,
+                "ocel_value": column(rule.values(matched)),
+            })
+            writer.write_changes(rule.object_type, changes)
+            counts["changes"] += len(changes)
+
+    return counts
+
+
+def convert_file(spec_name, input_path, output_format, output_path, chunk_size=CHUNK_SIZE):
+    """Convert an event file to OCEL 2.0 with the named spec ('admission' or 'discharge')."""
+    with WRITERS[output_format](output_path) as writer:
+        return convert_chunks(iter_event_chunks(input_path, chunk_size), SPECS[spec_name], writer)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert process events to OCEL 2.0 in bounded memory")
+    parser.add_argument("process", choices=sorted(SPECS), help="Conversion rules to apply")
+    parser.add_argument("input", help="Events as .csv, .jsonl or a JSON array")
+    parser.add_argument("--format", choices=sorted(WRITERS), default="sqlite", help="Output format")
+    parser.add_argument("--output", required=True, help="SQLite file, or directory for jsonl/parquet")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Events per chunk")
+    args = parser.parse_args()
+
+    counts = convert_file(args.process, args.input, args.format, args.output, args.chunk_size)
+    print(", ".join(f"{n} {table}" for table, n in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
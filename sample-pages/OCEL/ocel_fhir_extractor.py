@@ -0,0 +1,277 @@
+"""
+Incremental OCEL 2.0 export of real ADT data.
+
+Reads fhir.patient_admission, fhir.patient_location and fhir.ed_visit as one
+time-ordered event stream through server-side cursors, one time window at a
+time, converts it with ocel_engine and appends it to the output. The end of
+the last exported window is kept in <output>.state.json, so each run only
+exports events that happened since the previous one.
+
+Event times are not write times: the nightly refresh backdates admissions
+(and the location and ED rows derived from them) by up to a day. Each run
+therefore re-reads LOOKBACK before the saved end and skips the event ids it
+already exported there, which the state file also records.
+
+Usage:
+    python ocel_fhir_extractor.py --output adt.sqlite
+    python ocel_fhir_extractor.py --output adt_ocel/ --format jsonl --since 2024-01-01
+"""
+
+import os
+import json
+import argparse
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import psycopg2
+
+from ocel_engine import ChangeRule, ConversionSpec, ObjectRule, WRITERS, convert_chunks
+
+DB_HOST = os.getenv("DB_HOST", "localhost")
+DB_PORT = os.getenv("DB_PORT", "5432")
+DB_NAME = os.getenv("DB_NAME", "OAP")
+DB_USER = os.getenv("DB_USER", "postgres")
+DB_PASS = os.getenv("DB_PASSWORD", "acumenus")
+
+# Rows fetched per round trip from the server-side cursor (one engine chunk)
+FETCH_SIZE = 50000
+# Each window is read with its own cursor and committed to the output on its own
+WINDOW = timedelta(days=7)
+# Events newer than now - LAG are left for the next run, so rows still being
+# written when the export runs are not skipped
+LAG = timedelta(minutes=5)
+# Events are re-read this far behind the saved end, to pick up rows written
+# after the last run with an event time before it. Must cover the largest
+# backdating of any writer (nightly_refresh: one day).
+LOOKBACK = timedelta(days=2)
+
+# One row per ADT event. patient_location.encounter_id references
+# patient_admission.id. Event ids are derived from the source row so
+# re-exports never collide.
+ADT_EVENTS_SQL = """
+    SELECT * FROM (
+        SELECT 'adm:' || a.id || ':admit' AS event_id, a.id::text AS case_id,
+               'Admission' AS activity, a.admission_time AS "timestamp",
+               a.patient_id::text AS patient_id, a.admission_type, a.admission_source,
+               NULL::text AS care_area_id, NULL::text AS area_type,
+               NULL::text AS ed_visit_id, NULL::int AS acuity_level,
+               NULL::text AS chief_complaint, NULL::text AS disposition_type
+        FROM fhir.patient_admission a
+        UNION ALL
+        SELECT 'adm:' || a.id || ':discharge', a.id::text,
+               'Discharge', a.discharge_time,
+               a.patient_id::text, a.admission_type, a.admission_source,
+               NULL, NULL, NULL, NULL, NULL, NULL
+        FROM fhir.patient_admission a
+        WHERE a.discharge_time IS NOT NULL
+        UNION ALL
+        SELECT 'loc:' || l.id || ':' || v.suffix, a.id::text,
+               v.activity, v.ts,
+               l.patient_id::text, a.admission_type, a.admission_source,
+               l.care_area_id::text, ca.area_type, NULL, NULL, NULL, NULL
+        FROM fhir.patient_location l
+        JOIN fhir.patient_admission a ON a.id = l.encounter_id
+        JOIN fhir.care_area ca ON ca.id = l.care_area_id
+        CROSS JOIN LATERAL (VALUES
+            ('Transfer In', l.start_time, 'in'),
+            ('Transfer Out', l.end_time, 'out')
+        ) AS v(activity, ts, suffix)
+        WHERE v.ts IS NOT NULL
+        UNION ALL
+        SELECT 'ed:' || e.id || ':' || v.suffix, a.id::text,
+               v.activity, v.ts,
+               a.patient_id::text, a.admission_type, a.admission_source,
+               NULL, NULL, e.id::text, e.acuity_level, e.chief_complaint, e.disposition_type
+        FROM fhir.ed_visit e
+        JOIN fhir.patient_admission a ON a.id = e.admission_id
+        CROSS JOIN LATERAL (VALUES
+            ('ED Arrival', e.arrival_time, 'arrival'),
+            ('ED Triage', e.triage_time, 'triage'),
+            ('ED Provider Seen', e.provider_time, 'provider'),
+            ('ED Disposition', e.disposition_time, 'disposition'),
+            ('ED Departure', e.departure_time, 'departure')
+        ) AS v(activity, ts, suffix)
+        WHERE v.ts IS NOT NULL
+    ) events
+    WHERE "timestamp" >= %(start)s AND "timestamp" < %(end)s
+    ORDER BY "timestamp", event_id
+"""
+
+ADT_SPEC = ConversionSpec(
+    name="adt",
+    event_attributes=["admission_type", "admission_source", "area_type",
+                      "acuity_level", "chief_complaint", "disposition_type"],
+    objects=[
+        ObjectRule(
+            "admission", "case",
+            ids=lambda df: df["case_id"],
+            attributes=lambda df: {
+                "admission_type": df["admission_type"],
+                "admission_source": df["admission_source"],
+                "status": "ADMITTED",
+            },
+        ),
+        ObjectRule(
+            "patient", "patient",
+            ids=lambda df: df["patient_id"],
+            attributes=lambda df: {"id": df["patient_id"]},
+        ),
+        ObjectRule(
+            "care_area", "location",
+            ids=lambda df: df["care_area_id"],
+            attributes=lambda df: {"area_type": df["area_type"]},
+            when=lambda df: df["care_area_id"].notna(),
+        ),
+        ObjectRule(
+            "ed_visit", "ed visit",
+            ids=lambda df: df["ed_visit_id"],
+            attributes=lambda df: {
+                "acuity_level": df["acuity_level"],
+                "chief_complaint": df["chief_complaint"],
+            },
+            when=lambda df: df["ed_visit_id"].notna(),
+        ),
+    ],
+    changes=[
+        ChangeRule(
+            "admission", "status",
+            ids=lambda df: df["case_id"],
+            values=lambda df: "DISCHARGED",
+            when=lambda df: df["activity"] == "Discharge",
+        ),
+        ChangeRule(
+            "patient", "care_area_id",
+            ids=lambda df: df["patient_id"],
+            values=lambda df: df["care_area_id"],
+            when=lambda df: df["activity"] == "Transfer In",
+        ),
+    ],
+)
+
+
+def get_connection():
+    return psycopg2.connect(host=DB_HOST, port=DB_PORT, dbname=DB_NAME, user=DB_USER, password=DB_PASS)
+
+
+def state_path(output):
+    return output.rstrip("/") + ".state.json"
+
+
+def load_state(output):
+    """
+    End of the last exported window and the ids (with event times) of the
+    events exported within LOOKBACK before it, or (None, {}) on the first run.
+    """
+    path = state_path(output)
+    if not os.path.exists(path):
+        return None, {}
+    with open(path) as f:
+        state = json.load(f)
+    recent = {event_id: datetime.fromisoformat(ts) for event_id, ts in state.get("recent_events", {}).items()}
+    return datetime.fromisoformat(state["exported_until"]), recent
+
+
+def save_state(output, exported_until, recent):
+    path = state_path(output)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({
+            "exported_until": exported_until.isoformat(),
+            "recent_events": {event_id: ts.isoformat() for event_id, ts in recent.items()},
+        }, f)
+    os.replace(tmp_path, path)
+
+
+def skip_exported(chunks, exported):
+    """Drop events whose id is in exported and record the remaining ones in it."""
+    for df in chunks:
+        df = df[~df["event_id"].isin(exported.keys())]
+        if df.empty:
+            continue
+        exported.update(zip(df["event_id"], df["timestamp"]))
+        yield df
+
+
+def first_event_time(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT min(admission_time) FROM fhir.patient_admission")
+        return cur.fetchone()[0]
+
+
+def iter_window_chunks(conn, start, end, fetch_size=FETCH_SIZE):
+    """Stream one window of ADT events as DataFrames through a named (server-side) cursor."""
+    with conn.cursor(name="ocel_adt_events") as cur:
+        cur.itersize = fetch_size
+        cur.execute(ADT_EVENTS_SQL, {"start": start, "end": end})
+        columns = None
+        while True:
+            rows = cur.fetchmany(fetch_size)
+            if not rows:
+                return
+            if columns is None:
+                columns = [desc[0] for desc in cur.description]
+            yield pd.DataFrame(rows, columns=columns)
+
+
+def export_since_last_run(output, output_format="sqlite", since=None, window=WINDOW, fetch_size=FETCH_SIZE,
+                          lookback=LOOKBACK):
+    """
+    Append every ADT event between the saved state (or since, or the first
+    admission) and now - LAG to the output, window by window. With saved
+    state, reading starts lookback earlier and already exported events are
+    skipped. The state is saved after each window, so an interrupted export
+    resumes where it stopped. Returns the total row counts per OCEL table.
+    """
+    end = datetime.now(timezone.utc) - LAG
+    totals = {"events": 0, "objects": 0, "relations": 0, "changes": 0}
+    conn = get_connection()
+    try:
+        exported_until, exported = load_state(output)
+        start = exported_until - lookback if exported_until else since or first_event_time(conn)
+        if start is None:
+            print("No admissions to export.")
+            return totals
+        if start.tzinfo is None:
+            start = start.replace(tzinfo=timezone.utc)
+
+        with WRITERS[output_format](output, append=os.path.exists(output)) as writer:
+            seen = writer.existing_object_ids()
+            while start < end:
+                window_end = min(start + window, end)
+                chunks = skip_exported(iter_window_chunks(conn, start, window_end, fetch_size), exported)
+                counts = convert_chunks(chunks, ADT_SPEC, writer, seen)
+                conn.commit()
+                writer.flush()
+                cutoff = window_end - lookback
+                exported = {event_id: ts for event_id, ts in exported.items() if ts >= cutoff}
+                save_state(output, window_end, exported)
+                for table, n in counts.items():
+                    totals[table] += n
+                print(f"{start:%Y-%m-%d %H:%M} - {window_end:%Y-%m-%d %H:%M}: {counts['events']} events")
+                start = window_end
+    finally:
+        conn.close()
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export ADT events from the fhir schema as OCEL 2.0, incrementally")
+    parser.add_argument("--output", required=True, help="SQLite file, or directory for jsonl/parquet")
+    parser.add_argument("--format", choices=sorted(WRITERS), default="sqlite", help="Output format")
+    parser.add_argument("--since", type=datetime.fromisoformat, default=None,
+                        help="Start of the first export when there is no saved state (ISO date/time)")
+    parser.add_argument("--window-days", type=float, default=WINDOW.days,
+                        help="Days of events read per server-side cursor")
+    parser.add_argument("--fetch-size", type=int, default=FETCH_SIZE, help="Rows per fetch / conversion chunk")
+    parser.add_argument("--lookback-hours", type=float, default=LOOKBACK.total_seconds() / 3600,
+                        help="Hours before the saved end that are re-read for late-written events")
+    args = parser.parse_args()
+
+    totals = export_since_last_run(args.output, args.format, args.since,
+                                   timedelta(days=args.window_days), args.fetch_size,
+                                   timedelta(hours=args.lookback_hours))
+    print(", ".join(f"{n} {table}" for table, n in totals.items()))
+
+
+if __name__ == "__main__":
+    main()